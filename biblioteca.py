@@ -1,5 +1,28 @@
 import os
+import sys
+import csv
 import json
+import zipfile
+import bisect
+import threading
+import heapq
+import itertools
+import functools
+import time
+import datetime
+import hashlib
+import codecs
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from operator import itemgetter, methodcaller, sub
+
+# numpy (requirements.txt) agrega as colunas do relatório em laços vetorizados; sem ele, o relatório usa Counter
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 """
 Limpa a tela do terminal, dependendo do sistema operacional.
@@ -21,11 +44,23 @@ Returns:
     str: A escolha válida do usuário.
 """
 def entrada_valida(mensagem: str, opcoes_validas: list[str]) -> str:
+    # até quando as respostas desta conversa são ignoradas por excesso de respostas inválidas
+    bloqueio = 0.0
     while True:
         escolha = input(mensagem).strip()
+        agora = time.monotonic()
+        if agora < bloqueio:
+            print(f"{MENSAGEM_SOBRECARGA} (aguarde {bloqueio - agora:.0f} s)")
+            continue
         if escolha in opcoes_validas:
             return escolha
         print(f"Opção inválida. Escolha entre: {', '.join(opcoes_validas)}.")
+        # respostas inválidas em sequência gastam as fichas de repetição da conversa; sem fichas, as próximas
+        # respostas são ignoradas até a ficha voltar, sem travar o atendimento das outras conversas
+        espera = limita_repeticoes(obter_controle_admissao(), chave_conversa())
+        if espera:
+            print(MENSAGEM_SOBRECARGA)
+            bloqueio = agora + espera
 
 """
 Busca um paciente pelo CPF.
@@ -44,7 +79,11 @@ def buscar_usuario_por_cpf(cpf: str, pacientes: list[dict]) -> dict | None:
     return None
 
 """
-Solicita um CPF e busca o paciente correspondente.
+Solicita um CPF, um telefone ou parte do nome e busca o paciente correspondente.
+Números são procurados no mapa CPF -> paciente (se tiverem 11 dígitos) e no índice de telefones, os dois
+mantidos por obter_indice_telefones; um celular com DDD (que também tem 11 dígitos) encontra o paciente sem
+precisar do CPF. Se o número for o CPF de um paciente e o telefone de outro, o usuário escolhe qual dos dois.
+Se for digitado um nome, os pacientes mais parecidos são listados para escolha.
 
 Args:
     pacientes (list[dict]): Lista de pacientes cadastrados.
@@ -54,13 +93,34 @@ Returns:
 """
 def buscar_usuario_por_cpf_interativo(pacientes: list[dict]) -> dict | None:
     while True:
-        cpf = input("Digite o CPF do Paciente (11 dígitos): ").strip()
-        if cpf.isdigit() and len(cpf) == 11:
-            usuario = buscar_usuario_por_cpf(cpf, pacientes)
+        texto = input("Digite o CPF do Paciente (11 dígitos), o telefone com DDD ou o nome: ").strip()
+        digitos = "".join(c for c in texto if c.isdigit())
+        # números podem vir formatados, ex.: "123.456.789-01" ou "(11) 99222-2222"
+        if digitos and all(c.isdigit() or c in " .-()+" for c in texto):
+            obter_indice_telefones(pacientes)
+            por_cpf = _cache_indice_telefones["pacientes"].get(digitos) if len(digitos) == 11 else None
+            por_telefone = buscar_usuario_por_telefone(digitos, pacientes)
+            usuario = por_cpf or por_telefone
+            if por_cpf and por_telefone and por_cpf is not por_telefone:
+                print("\nEsse número é o CPF de um paciente e o telefone de outro:")
+                print(f"1 - {por_cpf['nome']} (CPF)")
+                print(f"2 - {por_telefone['nome']} (telefone)")
+                escolha = entrada_valida("Escolha o paciente: ", ["1", "2"])
+                usuario = por_cpf if escolha == "1" else por_telefone
+            if usuario:
+                print(f"\nPaciente encontrado: {usuario['nome']}")
+                identifica_conversa(usuario)
+                return usuario
+            print("\nCPF inválido ou não cadastrado (nem como telefone).")
+        elif texto:
+            usuario = escolher_paciente_por_nome(texto, pacientes)
             if usuario:
                 print(f"\nPaciente encontrado: {usuario['nome']}")
-                return usuario  
-        print("\nCPF inválido ou não cadastrado. Digite exatamente 11 números.")
+                identifica_conversa(usuario)
+                return usuario
+            print("\nNenhum paciente encontrado com esse nome.")
+        else:
+            print("\nDigite o CPF (11 números), o telefone com DDD ou o nome do paciente.")
         escolha = entrada_valida(
             "\nO que deseja fazer?\n1 - Tentar novamente\n2 - Voltar\nEscolha: ", ["1", "2"])
         if escolha == "1":
@@ -82,6 +142,46 @@ def salva_dados(arquivo: str, chave: str, lista: list) -> None:
     with open(arquivo, "w", encoding="utf-8") as f:
         json.dump({chave: lista}, f)
 
+"""
+Grava vários arquivos JSON como uma única operação: todos são escritos primeiro em arquivos
+temporários e só depois trocados pelos definitivos. Se a escrita de algum falhar, nenhum
+arquivo definitivo é alterado.
+
+Args:
+    conteudos (dict[str, object]): Caminho do arquivo -> conteúdo a ser gravado.
+"""
+def salva_arquivos_juntos(conteudos: dict[str, object]) -> None:
+    temporarios = []
+    try:
+        for arquivo, conteudo in conteudos.items():
+            temporarios.append(arquivo + ".tmp")
+            with open(arquivo + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(conteudo, f)
+    except OSError:
+        for temporario in temporarios:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        raise
+    for arquivo in conteudos:
+        os.replace(arquivo + ".tmp", arquivo)
+
+# mensagens dos carregamentos feitos em segundo plano, exibidas depois pelo menu principal (avisos_carregamento)
+_avisos_carregamento = []
+
+"""
+Exibe uma mensagem sobre a leitura de um arquivo. No carregamento em segundo plano (silencioso), a mensagem
+é guardada para o menu principal exibir depois, em vez de aparecer no meio do que o usuário está digitando.
+
+Args:
+    mensagem (str): Mensagem a exibir.
+    silencioso (bool): Se True, guarda a mensagem em vez de exibi-la.
+"""
+def _avisa_carregamento(mensagem: str, silencioso: bool) -> None:
+    if silencioso:
+        _avisos_carregamento.append(mensagem)
+    else:
+        print(mensagem)
+
 """
 Carrega uma lista de dados de um arquivo JSON, usando uma chave específica.
 Se o arquivo não existir ou estiver corrompido, retorna uma lista vazia.
@@ -89,665 +189,4012 @@ Se o arquivo não existir ou estiver corrompido, retorna uma lista vazia.
 Args:
     arquivo (str): Caminho do arquivo JSON.
     chave (str): Nome da chave dentro do JSON cujos dados serão carregados.
+    silencioso (bool, opcional): Se True, não exibe nenhuma mensagem (usado no carregamento em segundo plano); os avisos
+        de arquivo ausente ou corrompido ficam guardados para avisos_carregamento.
 
 Returns:
     list: Lista de dados encontrados na chave ou lista vazia se não existir.
 """
-def carrega_dados(arquivo: str, chave: str) -> list:
+def carrega_dados(arquivo: str, chave: str, silencioso: bool = False) -> list:
     try:
         with open(arquivo, "r", encoding="utf-8") as f:
             dados = json.load(f)
     except FileNotFoundError:
-        print(f"Arquivo '{arquivo}' não encontrado.")
+        _avisa_carregamento(f"Arquivo '{arquivo}' não encontrado.", silencioso)
         return []
     except json.JSONDecodeError:
-        print(f"Arquivo '{arquivo}' corrompido ou inválido.")
+        _avisa_carregamento(f"Arquivo '{arquivo}' corrompido ou inválido.", silencioso)
         return []
     else:
         return dados.get(chave, [])
     finally:
-        print(f"Tentativa de leitura do '{arquivo}' finalizada.")
+        if not silencioso:
+            print(f"Tentativa de leitura do '{arquivo}' finalizada.")
+
+#======EVENTOS (REGISTRO DE ALTERAÇÕES)===================================================================
+# trava para que eventos gravados por threads diferentes não se misturem no arquivo
+_trava_eventos = threading.Lock()
 
-#======CADASTRO===================================================================
 """
-Cadastra novos pacientes interativamente, solicitando nome, CPF e telefone e salva em 'pacientes.json'.
+Grava eventos de alteração no final do registro 'eventos.jsonl' (uma linha JSON por evento).
+O offset de cada evento é a posição em bytes da sua linha no arquivo, então é sempre crescente
+e permite que um leitor continue exatamente de onde parou.
 
 Args:
-    pacientes (list[dict]): Lista atual de pacientes cadastrados.
+    eventos (list[tuple[str, dict]]): Pares (tipo, dados), ex.: ("agendamento_criado", {"cpf": ..., "data": ...}).
+    arquivo (str, opcional): Caminho do registro. Default é 'eventos.jsonl'.
 
 Returns:
-    list[dict]: Lista atualizada de pacientes com os novos registros.
+    list[int]: Offsets dos eventos gravados.
 """
-def cadastra_paciente(pacientes: list[dict]) -> list[dict]:
-    while True:
-        print("=== Cadastro de Paciente ===")
-        #validação de dados para nome
-        while True:
-            nome = input("Digite o nome do paciente: ").strip()
-            if not nome or len(nome) < 2 or not nome.replace(" ", "").isalpha():
-                print("Nome inválido. Digite pelo menos 2 letras e apenas letras.")
-            else:
-                break
-        #validação de dados para CPF
-        while True:
-            cpf = input("Digite o CPF do paciente (11 dígitos): ").strip()
-            if not cpf.isdigit() or len(cpf) != 11:
-                print("CPF inválido. Digite exatamente 11 números.")
-                continue
-            if any(p["cpf"] == cpf for p in pacientes):
-                print("Já existe um paciente com esse CPF. Tente outro.")
-                continue
-            break
-        #validação de dados DDD
-        print("Digite o dados para contato via Whatsapp: ")
-        while True:
-            ddd = input("Digite o DDD (2 dígitos): ").strip()
-            if not ddd.isdigit() or not (11 <= int(ddd) <= 99):
-                print("DDD inválido. Deve ter 2 dígitos entre 11 e 99.")
-            else:
-                break
-        #validação de dados para número de telefone
-        while True:
-            numero = input("Digite o número de contato (8 ou 9 dígitos): ").strip()
-            if not numero.isdigit() or len(numero) not in [8, 9]:
-                print("Número inválido. Digite 8 dígitos (fixo) ou 9 dígitos (celular).")
-            else:
-                break
+def registra_eventos(eventos: list[tuple[str, dict]], arquivo: str = "eventos.jsonl") -> list[int]:
+    momento = time.strftime("%d/%m/%Y %H:%M:%S")
+    offsets = []
+    with _trava_eventos, open(arquivo, "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        linhas = []
+        for tipo, dados in eventos:
+            linha = json.dumps({"offset": offset, "tipo": tipo, "momento": momento, "dados": dados},
+                               ensure_ascii=False).encode("utf-8") + b"\n"
+            linhas.append(linha)
+            offsets.append(offset)
+            offset += len(linha)
+        f.write(b"".join(linhas))
+    return offsets
 
-        if len(numero) == 9:
-            telefone = f"+55 ({ddd}) {numero[:5]}-{numero[5:]}"
-        else:
-            telefone = f"+55 ({ddd}) {numero[:4]}-{numero[4:]}"
-
-        pacientes.append({"nome": nome, "cpf": cpf, "telefone": telefone})
-        salva_dados("pacientes.json", "pacientes", pacientes)
-        print("Paciente cadastrado com sucesso!")
+"""
+Grava um único evento de alteração no registro.
 
-        opcao = entrada_valida(
-            "\nDeseja cadastrar outro paciente?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-        if opcao == "2":
-            break
+Args:
+    tipo (str): Tipo do evento (ex.: "paciente_cadastrado").
+    dados (dict): Dados do evento.
+    arquivo (str, opcional): Caminho do registro. Default é 'eventos.jsonl'.
 
-    return pacientes
+Returns:
+    int: Offset do evento gravado.
+"""
+def registra_evento(tipo: str, dados: dict, arquivo: str = "eventos.jsonl") -> int:
+    return registra_eventos([(tipo, dados)], arquivo)[0]
 
-#======AGENDAMENTO/ADMINISTRAÇÃO DE DATAS E HORÁRIOS DISPONÍVEIS===================================================================
 """
-Salva os horários disponíveis em um arquivo JSON.
+Lê os eventos gravados a partir de um offset, sem reler o registro desde o início.
+Uma última linha incompleta (gravação interrompida) é ignorada.
 
 Args:
-    horarios (dict): Dicionário de horários disponíveis.
-    arquivo (str, opcional): Caminho do arquivo JSON. Default é 'horarios.json'.
+    a_partir (int, opcional): Offset a partir do qual ler. Default é 0 (início do registro).
+    arquivo (str, opcional): Caminho do registro. Default é 'eventos.jsonl'.
+
+Yields:
+    tuple[int, dict]: Offset do próximo evento (a ser salvo pelo leitor) e o evento lido.
 """
-def salva_horarios(horarios: dict, arquivo: str = "horarios.json") ->None:
-    with open(arquivo, "w", encoding="utf-8") as f:
-        json.dump(horarios, f)
+def le_eventos(a_partir: int = 0, arquivo: str = "eventos.jsonl"):
+    try:
+        f = open(arquivo, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(a_partir)
+        for linha in f:
+            if not linha.endswith(b"\n"):
+                break
+            a_partir += len(linha)
+            yield a_partir, json.loads(linha)
 
 """
-Carrega os horários disponíveis de um arquivo JSON.
-Se o arquivo não existir ou estiver corrompido, retorna um dicionário vazio.
+Carrega o offset salvo de um leitor do registro de eventos (ex.: sincronização com o prontuário).
 
 Args:
-    arquivo (str): Caminho do arquivo JSON.
+    leitor (str): Nome do leitor.
+    arquivo (str, opcional): Arquivo com os offsets dos leitores. Default é 'eventos_leitores.json'.
 
 Returns:
-    dict: Dicionário de horários disponíveis ou vazio se não existir ou estiver corrompido.
+    int: Offset salvo ou 0 se o leitor ainda não leu nenhum evento.
 """
-def carrega_horarios(arquivo: str) -> dict:
+def carrega_offset_leitor(leitor: str, arquivo: str = "eventos_leitores.json") -> int:
     try:
         with open(arquivo, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Arquivo '{arquivo}' não encontrado.")
-        return {}  
-    except json.JSONDecodeError:
-        print(f"Arquivo '{arquivo}' corrompido ou inválido.")
-        return {}
-    else:
-        return dados
-    finally:
-        print(f"Tentativa de leitura do '{arquivo}' finalizada.")  
-
+            return json.load(f).get(leitor, 0)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
 
+"""
+Salva o offset até onde um leitor já processou o registro de eventos.
 
+Args:
+    leitor (str): Nome do leitor.
+    offset (int): Offset do próximo evento a ler.
+    arquivo (str, opcional): Arquivo com os offsets dos leitores. Default é 'eventos_leitores.json'.
+"""
+def salva_offset_leitor(leitor: str, offset: int, arquivo: str = "eventos_leitores.json") -> None:
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            offsets = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        offsets = {}
+    offsets[leitor] = offset
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump(offsets, f)
 
-# horários válidos (intervalos de 30 min, 08:00 até 18:30)
-horarios_validos = [f"{h:02d}:00" for h in range(8, 19)] + [f"{h:02d}:30" for h in range(8, 19)]
 """
-Verifica se a hora fornecida está dentro da lista de horários válidos.
+Monta os dados de um evento de agendamento.
 
 Args:
-    hora (str): Horário no formato "hh:mm".
+    agendamento (dict): Agendamento alterado.
 
 Returns:
-    bool: True se válido, False caso contrário.
+    dict: CPF, nome, data e, quando houver, profissional/sala e série do agendamento.
 """
-def horario_valido(hora: str) -> bool:
-    return hora in horarios_validos
+def dados_evento_agendamento(agendamento: dict) -> dict:
+    return {c: agendamento[c] for c in ("cpf", "nome", "data", "recurso", "serie") if c in agendamento}
+
+#======BUSCA POR NOME===================================================================
+# tamanho máximo dos prefixos indexados; termos maiores são conferidos na própria palavra
+TAMANHO_MAX_PREFIXO = 8
+# quantas listas de trigramas (as mais raras) são usadas para achar palavras parecidas na busca aproximada
+MAX_TRIGRAMAS_CANDIDATOS = 4
+# similaridade mínima entre um termo digitado e uma palavra do nome na busca aproximada
+SIMILARIDADE_MINIMA = 0.3
+# limite de leituras do índice por busca (palavras parecidas, saltos com bisect e pacientes lidos);
+# mantém o tempo perto de um milissegundo mesmo em combinações de nomes muito comuns, ao custo de devolver
+# resultados aproximados nesses casos
+MAX_LEITURAS_BUSCA = 500
+# máximo de palavras de um grupo para ele entrar no cruzamento por bisect; grupos maiores só filtram os nomes lidos
+MAX_LISTAS_CRUZAMENTO = 32
+
+# índice mantido entre chamadas; é sincronizado com a lista de pacientes a cada busca
+_cache_indice_nomes = {"lista": None, "indice": None, "indexados": 0}
+# a trava permite montar o índice em segundo plano enquanto o menu continua respondendo
+_trava_indice_nomes = threading.Lock()
 
 """
-Solicita ao usuário um horário válido (08:00 até 18:30, de 30 em 30 minutos).
+Normaliza um texto para comparação: remove acentos, ignora maiúsculas/minúsculas e espaços extras.
+
+Args:
+    texto (str): Texto original (ex.: "João  Carvalho").
 
 Returns:
-    str | None: Horário escolhido no formato "hh:mm" ou None se cancelar.
+    str: Texto normalizado (ex.: "joao carvalho").
 """
-def pedir_horario() -> str | None:
-    while True:
-        hora = input("Digite o horário desejado: ").strip()
-        if hora == "0":
-            return None
-        if horario_valido(hora):
-            return hora
-        print("Horário inválido. Use formato hh:mm entre 08:00 e 18:30, apenas de 30 em 30 minutos.")
-
+def normaliza_texto(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
 
 """
-Verifica se a data fornecida é válida (anos 2025 ou 2026).
+Gera os trigramas de um texto normalizado, palavra por palavra (com espaço nas bordas).
 
 Args:
-    data (str): Data no formato "dd/mm/aaaa".
+    texto (str): Texto já normalizado.
 
 Returns:
-    bool: True se a data for válida, False caso contrário.
+    set[str]: Conjunto de trigramas.
 """
-def data_valida(data: str) -> bool:
-    if len(data) != 10 or data[2] != "/" or data[5] != "/":
-        return False
-    if not (data[:2].isdigit() and data[3:5].isdigit() and data[6:].isdigit()):
-        return False
+def trigramas(texto: str) -> set[str]:
+    resultado = set()
+    for termo in texto.split():
+        marcado = f" {termo} "
+        for i in range(len(marcado) - 2):
+            resultado.add(marcado[i:i + 3])
+    return resultado
 
-    dia, mes, ano = int(data[:2]), int(data[3:5]), int(data[6:])
-    if ano not in (2025, 2026):
-        return False
-    if mes < 1 or mes > 12:
-        return False
-    #lista que representa a quantidade de dias em cada mês do ano
-    dias_por_mes = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    return 1 <= dia <= dias_por_mes[mes - 1]
+"""
+Cria um índice vazio de busca por nome.
+O índice guarda o vocabulário de palavras dos nomes: cada palavra aponta para os pacientes que a têm
+(em ordem alfabética de nome), e os prefixos e trigramas apontam para palavras, não para pacientes.
+Como há bem menos palavras distintas do que pacientes, a busca percorre só o necessário para montar os primeiros resultados.
 
+Returns:
+    dict: Índice com os mapas de pacientes, nomes normalizados, palavras, prefixos, trigramas e trigramas de cada palavra.
+"""
+def cria_indice_nomes() -> dict:
+    return {"pacientes": {}, "nomes": {}, "palavras": {}, "prefixos": {}, "trigramas": {}, "trigramas_palavra": {}}
 
 """
-Solicita ao usuário uma data válida no formato dd/mm/aaaa.
+Acrescenta uma palavra ao vocabulário do índice (prefixos em ordem de tamanho da palavra e trigramas).
 
-Returns:
-    str | None: Data válida ou None se cancelar.
+Args:
+    indice (dict): Índice de busca por nome.
+    palavra (str): Palavra normalizada.
 """
-def pedir_data() -> str | None:
-    while True:
-        print("\nDigite a data para agendamento:")
-        print("0 - Voltar")
-        data = input("Digite a data (dd/mm/aaaa): ").strip()
-        if data == "0":
-            return None
-        if data_valida(data):
-            return data
-        print("Data inválida. Use formato dd/mm/aaaa e anos 2025 ou 2026.")
+def _registra_palavra(indice: dict, palavra: str) -> None:
+    if palavra in indice["palavras"]:
+        return
+    indice["palavras"][palavra] = []
+    for tamanho in range(1, min(len(palavra), TAMANHO_MAX_PREFIXO) + 1):
+        bisect.insort(indice["prefixos"].setdefault(palavra[:tamanho], []), (len(palavra), palavra))
+    tris = indice["trigramas_palavra"][palavra] = frozenset(trigramas(palavra))
+    for tri in tris:
+        indice["trigramas"].setdefault(tri, set()).add(palavra)
+
+"""
+Adiciona (ou atualiza) um paciente no índice de busca por nome.
 
+Args:
+    indice (dict): Índice criado por cria_indice_nomes.
+    paciente (dict): Paciente com as chaves 'nome' e 'cpf'.
+    ordenar (bool, opcional): Se False, o paciente é só acrescentado ao fim das listas de cada palavra
+        (usado na montagem inicial, que ordena tudo de uma vez no final). Default é True.
+"""
+def indexa_paciente(indice: dict, paciente: dict, ordenar: bool = True) -> None:
+    cpf = paciente["cpf"]
+    if cpf in indice["nomes"]:
+        remove_paciente_indice(indice, cpf)
+    nome = normaliza_texto(paciente["nome"])
+    indice["pacientes"][cpf] = paciente
+    indice["nomes"][cpf] = nome
+    for palavra in set(nome.split()):
+        _registra_palavra(indice, palavra)
+        if ordenar:
+            bisect.insort(indice["palavras"][palavra], (nome, cpf))
+        else:
+            indice["palavras"][palavra].append((nome, cpf))
 
 """
-Exibe os dias disponíveis com horários cadastrados e permite que o usuário escolha um.
+Remove um paciente do índice de busca por nome.
 
 Args:
-    horarios_disponiveis (dict): Dicionário de dias e horários cadastrados.
+    indice (dict): Índice de busca por nome.
+    cpf (str): CPF do paciente a remover.
+"""
+def remove_paciente_indice(indice: dict, cpf: str) -> None:
+    nome = indice["nomes"].pop(cpf, None)
+    indice["pacientes"].pop(cpf, None)
+    if nome is None:
+        return
+    for palavra in set(nome.split()):
+        lista = indice["palavras"][palavra]
+        posicao = bisect.bisect_left(lista, (nome, cpf))
+        if posicao < len(lista) and lista[posicao] == (nome, cpf):
+            del lista[posicao]
+
+"""
+Retorna o índice de busca por nome da lista de pacientes, criando-o na primeira chamada.
+Como pacientes só são acrescentados ao final da lista, apenas os novos registros são indexados.
+Na primeira montagem as listas de cada palavra são ordenadas uma única vez, no final.
+
+Args:
+    pacientes (list[dict]): Lista de pacientes cadastrados.
 
 Returns:
-    str | None: Dia escolhido no formato "dd/mm/aaaa" ou None se não houver/usuário cancelar.
+    dict: Índice de busca por nome atualizado.
 """
-def escolher_dia_existente(horarios_disponiveis: dict) -> str | None:
-    if not horarios_disponiveis:
-        print("Nenhum dia cadastrado.")
-        return None
-    dias = list(horarios_disponiveis.keys())
-    while True:
-        print("\nDias existentes:")
-        for i, d in enumerate(dias, 1):
-            print(f"{i}. {d}")
-        print("0 - Voltar")
+def obter_indice_nomes(pacientes: list[dict]) -> dict:
+    with _trava_indice_nomes:
+        cache = _cache_indice_nomes
+        if cache["lista"] is not pacientes or cache["indexados"] > len(pacientes):
+            cache["lista"] = pacientes
+            cache["indice"] = cria_indice_nomes()
+            cache["indexados"] = 0
+        indice = cache["indice"]
+        # cópia do trecho novo: pacientes cadastrados durante a indexação ficam para a próxima chamada
+        novos = pacientes[cache["indexados"]:]
+        montagem = cache["indexados"] == 0
+        for paciente in novos:
+            indexa_paciente(indice, paciente, ordenar=not montagem)
+        if montagem:
+            for lista in indice["palavras"].values():
+                lista.sort()
+        cache["indexados"] += len(novos)
+        return indice
 
-        escolha = input("Escolha o número do dia: ").strip()
-        if escolha == "0":
-            return None
-        if escolha.isdigit() and 1 <= int(escolha) <= len(dias):
-            return dias[int(escolha)-1]
-        print("Escolha inválida. Digite um número entre 0 e", len(dias))
+"""
+Monta o índice de busca por nome em segundo plano, para que a primeira busca não espere a indexação.
+
+Args:
+    pacientes (list[dict]): Lista de pacientes cadastrados.
 
+Returns:
+    threading.Thread: Thread da indexação.
+"""
+def prepara_indice_nomes(pacientes: list[dict]) -> threading.Thread:
+    thread = threading.Thread(target=obter_indice_nomes, args=(pacientes,), daemon=True)
+    thread.start()
+    return thread
 
 """
-Gerencia os horários disponíveis: adiciona e remove dias e horários no 'horarios.json' que serão escolhidos pelo paciente para agendar consulta.
+Calcula quanto um termo digitado vale para uma palavra do nome.
+Prefixo vale entre 1 e 2 (2 quando o termo é a palavra inteira); na busca aproximada, uma palavra parecida
+vale a sua similaridade de trigramas com o termo (menor que 1, então fica sempre atrás dos prefixos).
 
 Args:
-    horarios_disponiveis (dict): Dicionário de horários disponíveis.
+    termo (str): Termo normalizado.
+    tris_termo (set[str]): Trigramas do termo.
+    palavra (str): Palavra normalizada do nome.
+    aproximada (bool): Se True, aceita palavras parecidas além dos prefixos.
+    tris_palavra (frozenset[str] | None): Trigramas da palavra já calculados no índice (opcional).
 
 Returns:
-    dict: Dicionário atualizado de horários disponíveis.
+    float: Pontuação do termo para a palavra (0 se não combinar).
 """
-def gerenciar_horarios(horarios_disponiveis: dict) -> dict:
-    while True:
-        limpa_tela()
-        print("=== Gerenciar Horários ===")
-        if not horarios_disponiveis:
-            print("Nenhum horário cadastrado.")
-        else:
-            for dia, horas in horarios_disponiveis.items():
-                print(f"{dia}: {', '.join(sorted(horas)) if horas else 'Sem horários'}")
+def _pontua_termo(termo: str, tris_termo: set[str], palavra: str, aproximada: bool,
+                  tris_palavra: frozenset[str] | None = None) -> float:
+    if palavra.startswith(termo):
+        return 1.0 + len(termo) / len(palavra)
+    if aproximada:
+        if tris_palavra is None:
+            tris_palavra = trigramas(palavra)
+        similaridade = len(tris_termo & tris_palavra) / len(tris_termo | tris_palavra)
+        if similaridade >= SIMILARIDADE_MINIMA:
+            return similaridade
+    return 0.0
 
-        print("\nOpções:")
-        print("1. Adicionar dia e horários")
-        print("2. Adicionar horário em dia existente")
-        print("3. Remover horário de um dia")
-        print("4. Remover dia inteiro")
-        print("0. Voltar")
+"""
+Agrupa as palavras do vocabulário que combinam com um termo por pontuação, da maior para a menor.
+Os prefixos vêm primeiro: a lista de cada prefixo está em ordem de tamanho da palavra, então cada grupo (palavras de
+mesmo tamanho) é um trecho contínuo achado com bisect. Na busca aproximada, as palavras parecidas (por trigramas) vêm no final.
+As palavras e listas de um grupo só são montadas quando a busca chega nele (grupos de prefixos curtos podem ter milhares de palavras).
+As palavras parecidas lidas das listas de trigramas (das mais raras para as mais comuns) contam no orçamento de leituras da busca.
 
-        opcao = entrada_valida("Escolha: ", ["0", "1", "2", "3", "4"])
+Args:
+    indice (dict): Índice de busca por nome.
+    termo (str): Termo normalizado.
+    aproximada (bool): Se True, inclui as palavras parecidas.
+    orcamento (dict): Contador {"leituras": int} compartilhado pela busca inteira.
 
-        if opcao == "0":
+Yields:
+    tuple: Pontuação do grupo e uma função que monta (conjunto das palavras, listas (nome, cpf) delas, total de pacientes).
+"""
+def _grupos_do_termo(indice: dict, termo: str, aproximada: bool, orcamento: dict):
+    def monta(palavras: set[str]) -> tuple:
+        listas = list(map(indice["palavras"].__getitem__, palavras))
+        return palavras, listas, sum(map(len, listas))
+
+    def monta_prefixos(fatia: list[tuple[int, str]]) -> tuple:
+        palavras = set(map(itemgetter(1), fatia))
+        if len(termo) > TAMANHO_MAX_PREFIXO:
+            # termos maiores que os prefixos indexados ainda precisam ser conferidos na palavra
+            palavras = {palavra for palavra in palavras if palavra.startswith(termo)}
+        return monta(palavras)
+
+    prefixados = indice["prefixos"].get(termo[:TAMANHO_MAX_PREFIXO], [])
+    inicio = 0
+    while inicio < len(prefixados):
+        tamanho = prefixados[inicio][0]
+        fim = bisect.bisect_left(prefixados, (tamanho + 1, ""), inicio)
+        yield 1.0 + len(termo) / tamanho, functools.partial(monta_prefixos, prefixados[inicio:fim])
+        inicio = fim
+    if not aproximada:
+        return
+    tris_termo = trigramas(termo)
+    candidatas = sorted((indice["trigramas"].get(t, set()) for t in tris_termo), key=len)
+    lidas = set()
+    for palavras in candidatas[:MAX_TRIGRAMAS_CANDIDATOS]:
+        if lidas and orcamento["leituras"] + len(palavras) > MAX_LEITURAS_BUSCA:
             break
+        orcamento["leituras"] += len(palavras)
+        lidas |= palavras
+    parecidas = []
+    for palavra in lidas:
+        if not palavra.startswith(termo):
+            pontos = _pontua_termo(termo, tris_termo, palavra, True, indice["trigramas_palavra"][palavra])
+            if pontos:
+                parecidas.append((pontos, palavra))
+    parecidas.sort(reverse=True)
+    for pontos, grupo in itertools.groupby(parecidas, key=itemgetter(0)):
+        yield pontos, functools.partial(monta, set(map(itemgetter(1), grupo)))
 
-        elif opcao == "1":
-            while True:
-                limpa_tela()
-                print("=== Adicionar dia e horários ===")
-                dia = pedir_data()
-                if dia == "0":
-                    break
-                if dia not in horarios_disponiveis:
-                    horarios_disponiveis[dia] = []
-
-                while True:
-                    hora = pedir_horario()
-                    if hora == "0":
-                        break
-                    if hora in horarios_disponiveis[dia]:
-                        print("Esse horário já existe.")
-                    else:
-                        horarios_disponiveis[dia].append(hora)
-                        print(f"Horário {hora} adicionado em {dia}.")
+"""
+Percorre, em ordem alfabética, os pacientes presentes em todos os grupos de listas ao mesmo tempo.
+Todas as listas do índice estão na mesma ordem (nome, cpf), então cada grupo "salta" direto para o próximo paciente
+possível com bisect, em vez de ler paciente por paciente; combinações raras de nomes comuns ficam baratas.
+Cada bisect conta uma leitura no orçamento, e o percurso para quando ele acaba.
 
-                    opcao_hora = entrada_valida("Deseja adicionar outro horário?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                    if opcao_hora == "2":
-                        break
-                break
+Args:
+    grupos (list[list[list[tuple]]]): Para cada termo, as listas (nome, cpf) das palavras que combinam com ele.
+    orcamento (dict): Contador {"leituras": int} compartilhado pela busca inteira.
 
-        elif opcao == "2":
-            while True:
-                limpa_tela()
-                print("=== Adicionar horário em dia existente ===")
-                dia = escolher_dia_existente(horarios_disponiveis)
-                if not dia:
-                    break
+Yields:
+    tuple[str, str]: (nome, cpf) dos pacientes que aparecem em todos os grupos.
+"""
+def _intersecao_ordenada(grupos: list[list[list[tuple[str, str]]]], orcamento: dict):
+    chave = ("", "")
+    while orcamento["leituras"] < MAX_LEITURAS_BUSCA:
+        proximos = []
+        for listas in grupos:
+            orcamento["leituras"] += len(listas)
+            proximo = None
+            for lista in listas:
+                posicao = bisect.bisect_left(lista, chave)
+                if posicao < len(lista) and (proximo is None or lista[posicao] < proximo):
+                    proximo = lista[posicao]
+            if proximo is None:
+                return
+            proximos.append(proximo)
+            # já sabemos que nenhum paciente antes deste serve: os próximos grupos saltam direto para ele
+            chave = max(chave, proximo)
+        if all(p == chave for p in proximos):
+            yield chave
+            # a próxima chave fica logo depois deste paciente
+            chave = (chave[0], chave[1] + "\x00")
 
-                if horarios_disponiveis[dia]:
-                    print(f"Horários já cadastrados em {dia}: {', '.join(sorted(horarios_disponiveis[dia]))}")
-                else:
-                    print(f"Nenhum horário cadastrado ainda em {dia}.")
+"""
+Procura os melhores nomes para os termos digitados.
+A pontuação de um nome é a média, entre os termos, da melhor palavra do nome para cada termo. Cada termo tem seus
+grupos de palavras de mesma pontuação; as combinações de um grupo por termo são visitadas da que vale mais para a que
+vale menos (fila de prioridade), então um paciente ainda não visto em uma combinação vale exatamente a pontuação dela.
+Em cada combinação o grupo com menos pacientes conduz a leitura, em ordem alfabética, cruzado por bisect com os
+grupos pequenos dos outros termos (_intersecao_ordenada); os grupos com muitas palavras são conferidos nas palavras
+do próprio nome. A busca para quando nenhuma combinação restante pode superar os resultados, ou depois
+de MAX_LEITURAS_BUSCA leituras (nesse caso devolve os melhores achados até ali).
 
-                while True:
-                    hora = pedir_horario()
-                    if hora == "0":
-                        break
-                    if hora in horarios_disponiveis[dia]:
-                        print("Esse horário já existe.")
-                    else:
-                        horarios_disponiveis[dia].append(hora)
-                        print(f"Horário {hora} adicionado em {dia}.")
+Args:
+    indice (dict): Índice de busca por nome.
+    termos (list[str]): Termos normalizados.
+    limite (int): Quantidade máxima de resultados.
+    aproximada (bool): Se True, aceita palavras parecidas além dos prefixos.
+    orcamento (dict): Contador {"leituras": int} compartilhado pelas etapas da busca.
 
-                    opcao_hora = entrada_valida("Deseja adicionar outro horário nesse dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                    if opcao_hora == "2":
-                        break
+Returns:
+    list[tuple]: Resultados (-pontuação, nome, cpf), do melhor para o pior.
+"""
+def _melhores_nomes(indice: dict, termos: list[str], limite: int, aproximada: bool,
+                    orcamento: dict) -> list[tuple[float, str, str]]:
+    geradores = [_grupos_do_termo(indice, termo, aproximada, orcamento) for termo in termos]
+    grupos = [[] for _ in termos]
+
+    def grupo(t: int, i: int):
+        while len(grupos[t]) <= i:
+            proximo = next(geradores[t], None)
+            if proximo is None:
+                return None
+            grupos[t].append(list(proximo))
+        return grupos[t][i]
+
+    def conteudo(t: int, i: int) -> tuple:
+        # troca a função de montagem pelo conteúdo do grupo na primeira vez que ele é lido
+        if callable(grupos[t][i][1]):
+            grupos[t][i][1] = grupos[t][i][1]()
+        return grupos[t][i][1]
+
+    def teto(combinacao: tuple) -> float:
+        total = 0.0
+        for t, i in enumerate(combinacao):
+            total += grupos[t][i][0]
+        return total / len(termos)
+
+    inicial = (0,) * len(termos)
+    if any(grupo(t, 0) is None for t in range(len(termos))):
+        return []
+    fila, enfileiradas = [(-teto(inicial), inicial)], {inicial}
+    resultados, vistos = [], set()
+    while fila and orcamento["leituras"] < MAX_LEITURAS_BUSCA:
+        negativo, combinacao = heapq.heappop(fila)
+        if len(resultados) == limite and resultados[-1][0] < negativo:
+            break
+        for t in range(len(termos)):
+            vizinha = combinacao[:t] + (combinacao[t] + 1,) + combinacao[t + 1:]
+            if vizinha not in enfileiradas and grupo(t, vizinha[t]) is not None:
+                enfileiradas.add(vizinha)
+                heapq.heappush(fila, (-teto(vizinha), vizinha))
+        escolhidos = sorted((conteudo(t, i) for t, i in enumerate(combinacao)), key=itemgetter(2))
+        cruzados = [listas for palavras, listas, _ in escolhidos[1:] if len(palavras) <= MAX_LISTAS_CRUZAMENTO]
+        filtros = [palavras for palavras, _, _ in escolhidos[1:] if len(palavras) > MAX_LISTAS_CRUZAMENTO]
+        candidatos = (_intersecao_ordenada([escolhidos[0][1]] + cruzados, orcamento) if cruzados
+                      else heapq.merge(*escolhidos[0][1]))
+        orcamento["leituras"] += 1
+        for nome, cpf in candidatos:
+            orcamento["leituras"] += 1
+            if len(resultados) == limite and (negativo, nome, cpf) > resultados[-1]:
                 break
+            if cpf not in vistos:
+                palavras = nome.split()
+                if all(not filtro.isdisjoint(palavras) for filtro in filtros):
+                    vistos.add(cpf)
+                    bisect.insort(resultados, (negativo, nome, cpf))
+                    del resultados[limite:]
+            if orcamento["leituras"] >= MAX_LEITURAS_BUSCA:
+                break
+    return resultados
 
-        elif opcao == "3":
-            while True:
-                limpa_tela()
-                print("=== Remover horário de um dia ===")
-                dia = escolher_dia_existente(horarios_disponiveis)
-                if not dia:
-                    break
-                if not horarios_disponiveis[dia]:
-                    print("Nenhum horário nesse dia.")
-                    opcao_dia = entrada_valida("Deseja tentar outro dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                    if opcao_dia == "2":
-                        break
-                    else:
-                        continue
+"""
+Busca pacientes pelo nome, ignorando acentos e maiúsculas.
+Primeiro procura nomes cujas palavras começam com os termos digitados; se faltarem resultados,
+repete aceitando palavras parecidas (tolera erros de digitação em cada termo, ex.: "lianna").
+Nenhuma das etapas percorre a lista inteira de pacientes: só os nomes vindos do índice são lidos,
+na ordem da melhor pontuação possível, e a busca para quando os resultados não podem mais melhorar
+(ou depois de MAX_LEITURAS_BUSCA leituras; em combinações raras de nomes muito comuns o resultado pode
+não ser o melhor possível, e digitar mais letras resolve).
 
-                while True:
-                    print(f"\nHorários em {dia}:")
-                    horarios_ordenados = sorted(horarios_disponiveis[dia])
-                    for i, h in enumerate(horarios_ordenados, 1):
-                        print(f"{i}. {h}")
-                    print("0 - Voltar")
+Args:
+    consulta (str): Nome ou parte do nome (ex.: "joao carv").
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+    limite (int, opcional): Quantidade máxima de resultados. Default é 10.
 
-                    escolha = input("Escolha o número do horário para remover: ").strip()
-                    if escolha == "0":
-                        break
-                    if escolha.isdigit() and 1 <= int(escolha) <= len(horarios_ordenados):
-                        removido = horarios_ordenados[int(escolha) - 1]
-                        horarios_disponiveis[dia].remove(removido)
-                        print(f"Horário {removido} removido.")
+Returns:
+    list[dict]: Pacientes encontrados, do mais parecido para o menos parecido.
+"""
+def busca_pacientes_por_nome(consulta: str, pacientes: list[dict], limite: int = 10) -> list[dict]:
+    indice = obter_indice_nomes(pacientes)
+    termos = normaliza_texto(consulta).split()
+    if not termos:
+        return []
+    # as duas etapas dividem o mesmo limite de leituras
+    orcamento = {"leituras": 0}
+    resultados = _melhores_nomes(indice, termos, limite, False, orcamento)
+    if len(resultados) < limite:
+        aproximados = _melhores_nomes(indice, termos, limite, True, orcamento)
+        if len(aproximados) > len(resultados):
+            resultados = aproximados
+    return [indice["pacientes"][cpf] for _, _, cpf in resultados]
 
-                        opcao_hora = entrada_valida("Deseja remover outro horário nesse dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                        if opcao_hora == "2":
-                            break
-                    else:
-                        print("Escolha inválida.")
+"""
+Busca pacientes pelo nome e deixa o usuário escolher um dos resultados.
 
-                opcao_dia = entrada_valida("Deseja remover horário de outro dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                if opcao_dia == "2":
-                    break
+Args:
+    consulta (str): Nome ou parte do nome digitado.
+    pacientes (list[dict]): Lista de pacientes cadastrados.
 
-        elif opcao == "4":
-            while True:
-                limpa_tela()
-                print("=== Remover dia inteiro ===")
-                dia = escolher_dia_existente(horarios_disponiveis)
-                if not dia:
-                    break
-                opcao_remover = entrada_valida(f"Tem certeza que deseja remover o dia {dia}?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                if opcao_remover == "1":
-                    del horarios_disponiveis[dia]
-                    print(f"Dia {dia} removido com sucesso.")
-                else:
-                    print("Remoção cancelada.")
+Returns:
+    dict | None: Paciente escolhido ou None se não houver resultado/usuário cancelar.
+"""
+def escolher_paciente_por_nome(consulta: str, pacientes: list[dict]) -> dict | None:
+    encontrados = busca_pacientes_por_nome(consulta, pacientes)
+    if not encontrados:
+        return None
+    print("\nPacientes encontrados:")
+    for i, p in enumerate(encontrados, 1):
+        print(f"{i}. {p['nome']} - CPF {p['cpf'][:3]}.***.***-{p['cpf'][-2:]}")
+    print("0 - Nenhum destes")
+    escolha = entrada_valida("Escolha o paciente: ", [str(i) for i in range(len(encontrados) + 1)])
+    if escolha == "0":
+        return None
+    return encontrados[int(escolha) - 1]
 
-                opcao_dia = entrada_valida("Deseja remover outro dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
-                if opcao_dia == "2":
-                    break
+#======BUSCA POR TELEFONE===================================================================
+# índice telefone -> CPF mantido entre chamadas, sincronizado como o índice de nomes
+_cache_indice_telefones = {"lista": None, "indice": None, "pacientes": None, "indexados": 0}
 
-        salva_horarios(horarios_disponiveis)
+"""
+Converte um telefone em qualquer formato para o padrão E.164 (ex.: "+5511992222222").
+Aceita o formato de exibição do cadastro ("+55 (11) 99222-2222"), o identificador do
+Whatsapp ("5511992222222") ou apenas DDD e número ("11992222222").
 
-    return horarios_disponiveis
+Args:
+    telefone (str): Telefone a ser normalizado.
 
+Returns:
+    str | None: Telefone no formato E.164 ou None se não for um telefone brasileiro válido.
 """
-Agenda uma consulta para um paciente em dia e horário disponível, que ao ser confirmada vai para 'agendamentos.json' de determinado paciente.
-Quando a consulta é agendada, o horario disponivel para determinado dia é retirado dos horários disponíveis.
+def normaliza_telefone(telefone: str) -> str | None:
+    digitos = "".join(c for c in telefone if c.isdigit())
+    if len(digitos) in (10, 11):
+        digitos = "55" + digitos
+    if len(digitos) not in (12, 13) or not digitos.startswith("55"):
+        return None
+    if not (11 <= int(digitos[2:4]) <= 99):
+        return None
+    return "+" + digitos
+
+"""
+Gera as formas alternativas de um celular no formato E.164, com e sem o nono dígito.
+O Whatsapp ainda identifica alguns celulares antigos sem o 9 inicial.
+
+Args:
+    e164 (str): Telefone no formato E.164.
+
+Returns:
+    list[str]: O próprio telefone seguido da variante com/sem o nono dígito, quando existir.
+"""
+def variantes_telefone(e164: str) -> list[str]:
+    ddd, numero = e164[3:5], e164[5:]
+    if len(numero) == 9 and numero[0] == "9":
+        return [e164, f"+55{ddd}{numero[1:]}"]
+    if len(numero) == 8 and numero[0] in "6789":
+        return [e164, f"+55{ddd}9{numero}"]
+    return [e164]
+
+"""
+Preenche o campo 'telefone_e164' dos pacientes cadastrados antes da normalização.
+Percorre a lista uma única vez; registros já migrados são mantidos.
 
 Args:
-    agendamentos (list[dict]): Lista de agendamentos existentes.
     pacientes (list[dict]): Lista de pacientes cadastrados.
-    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
 
 Returns:
-    tuple:
-        list[dict]: Lista atualizada de agendamentos.
-        dict: Dicionário atualizado de horários disponíveis.
+    int: Quantidade de pacientes atualizados.
 """
-def agendar_consulta_com_horarios(agendamentos: list[dict], pacientes: list[dict], horarios_disponiveis: dict) -> tuple[list[dict], dict]:
-    print("=== Agendamento de consulta ===")
-    paciente = buscar_usuario_por_cpf_interativo(pacientes)
+def migra_telefones(pacientes: list[dict]) -> int:
+    atualizados = 0
+    for paciente in pacientes:
+        if "telefone_e164" in paciente:
+            continue
+        paciente["telefone_e164"] = normaliza_telefone(paciente.get("telefone", ""))
+        atualizados += 1
+    return atualizados
 
-    if not paciente:
-        return agendamentos, horarios_disponiveis
+"""
+Retorna o índice telefone (E.164) -> CPF, criando-o na primeira chamada e indexando só os novos pacientes.
 
-    if not horarios_disponiveis:
-        print("Não há horários disponíveis para agendamento.")
-        return agendamentos, horarios_disponiveis
+Args:
+    pacientes (list[dict]): Lista de pacientes cadastrados.
 
-    while True:
-        print("\nDias disponíveis para agendamento:")
-        dias = list(horarios_disponiveis.keys())
-        for i, dia in enumerate(dias, 1):
-            print(f"{i}. {dia} ({len(horarios_disponiveis[dia])} horários disponíveis)")
+Returns:
+    dict[str, str]: Mapa de telefone E.164 para CPF.
+"""
+def obter_indice_telefones(pacientes: list[dict]) -> dict[str, str]:
+    cache = _cache_indice_telefones
+    if cache["lista"] is not pacientes or cache["indexados"] > len(pacientes):
+        cache["lista"] = pacientes
+        cache["indice"] = {}
+        cache["pacientes"] = {}
+        cache["indexados"] = 0
+    for paciente in pacientes[cache["indexados"]:]:
+        cache["pacientes"][paciente["cpf"]] = paciente
+        e164 = paciente.get("telefone_e164") or normaliza_telefone(paciente.get("telefone", ""))
+        if e164:
+            cache["indice"][e164] = paciente["cpf"]
+    cache["indexados"] = len(pacientes)
+    return cache["indice"]
 
-        try:
-            escolha_dia = int(input("Escolha o número do dia: "))
-            if 1 <= escolha_dia <= len(dias): 
-                dia_escolhido = dias[escolha_dia - 1]
-                if not horarios_disponiveis[dia_escolhido]:
-                    print("Não há horários disponíveis neste dia.")
-                    return agendamentos
+"""
+Busca o paciente dono de um telefone, sem precisar pedir o CPF.
+Usado para identificar quem enviou uma mensagem pelo Whatsapp.
+
+Args:
+    telefone (str): Telefone em qualquer formato aceito por normaliza_telefone.
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+
+Returns:
+    dict | None: Paciente encontrado ou None se o telefone não estiver cadastrado.
+"""
+def buscar_usuario_por_telefone(telefone: str, pacientes: list[dict]) -> dict | None:
+    e164 = normaliza_telefone(telefone)
+    if not e164:
+        return None
+    indice = obter_indice_telefones(pacientes)
+    for variante in variantes_telefone(e164):
+        cpf = indice.get(variante)
+        if cpf:
+            return _cache_indice_telefones["pacientes"][cpf]
+    return None
+
+#======CADASTRO===================================================================
+"""
+Verifica se o nome do paciente é válido (pelo menos 2 caracteres, apenas letras e espaços).
+
+Args:
+    nome (str): Nome digitado.
+
+Returns:
+    bool: True se válido, False caso contrário.
+"""
+def nome_valido(nome: str) -> bool:
+    return len(nome) >= 2 and nome.replace(" ", "").isalpha()
+
+"""
+Verifica se o CPF tem exatamente 11 dígitos.
+
+Args:
+    cpf (str): CPF digitado.
+
+Returns:
+    bool: True se válido, False caso contrário.
+"""
+def cpf_valido(cpf: str) -> bool:
+    return cpf.isdigit() and len(cpf) == 11
+
+"""
+Confere os dois dígitos verificadores do CPF (e rejeita CPFs com todos os dígitos iguais).
+
+Args:
+    cpf (str): CPF com 11 dígitos.
+
+Returns:
+    bool: True se os dígitos verificadores conferem, False caso contrário.
+"""
+def cpf_digitos_validos(cpf: str) -> bool:
+    if not cpf_valido(cpf) or cpf == cpf[0] * 11:
+        return False
+    numeros = [int(c) for c in cpf]
+    for posicao in (9, 10):
+        soma = sum(n * peso for n, peso in zip(numeros[:posicao], range(posicao + 1, 1, -1)))
+        digito = soma * 10 % 11 % 10
+        if digito != numeros[posicao]:
+            return False
+    return True
+
+"""
+Verifica se o DDD é válido (2 dígitos entre 11 e 99).
+
+Args:
+    ddd (str): DDD digitado.
+
+Returns:
+    bool: True se válido, False caso contrário.
+"""
+def ddd_valido(ddd: str) -> bool:
+    return ddd.isdigit() and len(ddd) == 2 and 11 <= int(ddd) <= 99
+
+"""
+Verifica se o número de telefone tem 8 (fixo) ou 9 (celular) dígitos.
+
+Args:
+    numero (str): Número digitado, sem DDD.
+
+Returns:
+    bool: True se válido, False caso contrário.
+"""
+def numero_valido(numero: str) -> bool:
+    return numero.isdigit() and len(numero) in [8, 9]
+
+"""
+Monta o telefone no formato de exibição do cadastro (ex.: "+55 (11) 99222-2222").
+
+Args:
+    ddd (str): DDD com 2 dígitos.
+    numero (str): Número com 8 ou 9 dígitos.
+
+Returns:
+    str: Telefone formatado.
+"""
+def formata_telefone(ddd: str, numero: str) -> str:
+    if len(numero) == 9:
+        return f"+55 ({ddd}) {numero[:5]}-{numero[5:]}"
+    return f"+55 ({ddd}) {numero[:4]}-{numero[4:]}"
+
+"""
+Cadastra novos pacientes interativamente, solicitando nome, CPF e telefone e salva em 'pacientes.json'.
+
+Args:
+    pacientes (list[dict]): Lista atual de pacientes cadastrados.
+
+Returns:
+    list[dict]: Lista atualizada de pacientes com os novos registros.
+"""
+def cadastra_paciente(pacientes: list[dict]) -> list[dict]:
+    while True:
+        print("=== Cadastro de Paciente ===")
+        #validação de dados para nome
+        while True:
+            nome = input("Digite o nome do paciente: ").strip()
+            if not nome_valido(nome):
+                print("Nome inválido. Digite pelo menos 2 letras e apenas letras.")
+            else:
+                break
+        #validação de dados para CPF
+        while True:
+            cpf = input("Digite o CPF do paciente (11 dígitos): ").strip()
+            if not cpf_valido(cpf):
+                print("CPF inválido. Digite exatamente 11 números.")
+                continue
+            obter_indice_telefones(pacientes)
+            if cpf in _cache_indice_telefones["pacientes"]:
+                print("Já existe um paciente com esse CPF. Tente outro.")
+                continue
+            break
+        #validação de dados DDD
+        print("Digite o dados para contato via Whatsapp: ")
+        while True:
+            ddd = input("Digite o DDD (2 dígitos): ").strip()
+            if not ddd_valido(ddd):
+                print("DDD inválido. Deve ter 2 dígitos entre 11 e 99.")
+            else:
                 break
+        #validação de dados para número de telefone
+        while True:
+            numero = input("Digite o número de contato (8 ou 9 dígitos): ").strip()
+            if not numero_valido(numero):
+                print("Número inválido. Digite 8 dígitos (fixo) ou 9 dígitos (celular).")
             else:
-                print("Opção inválida. Digite um número entre 1 e", len(dias))
-        except ValueError:
-            print("Entrada inválida. Digite apenas números.")
+                break
 
-    while True:
-        print(f"\nHorários disponíveis em {dia_escolhido}:")
-        for i, hora in enumerate(horarios_disponiveis[dia_escolhido], 1):
-            print(f"{i}. {hora}")
+        telefone = formata_telefone(ddd, numero)
+        pacientes.append({"nome": nome, "cpf": cpf, "telefone": telefone,
+                          "telefone_e164": normaliza_telefone(telefone)})
+        # indexa o novo paciente para que já apareça nas buscas por nome e telefone
+        # (o índice de nomes só é atualizado se já foi montado; senão, será montado na primeira busca)
+        if _cache_indice_nomes["lista"] is pacientes:
+            obter_indice_nomes(pacientes)
+        obter_indice_telefones(pacientes)
+        salva_dados("pacientes.json", "pacientes", pacientes)
+        registra_evento("paciente_cadastrado", {"cpf": cpf, "nome": nome, "telefone_e164": pacientes[-1]["telefone_e164"]})
+        print("Paciente cadastrado com sucesso!")
+        identifica_conversa(pacientes[-1])
+
+        opcao = entrada_valida(
+            "\nDeseja cadastrar outro paciente?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+        if opcao == "2":
+            break
+
+    return pacientes
 
+#======IMPORTAÇÃO EM LOTE===================================================================
+# quantidade de pacientes validados e gravados de uma vez na importação
+TAMANHO_LOTE_IMPORTACAO = 5000
+# codificação usada quando o arquivo não é UTF-8 (CSVs salvos pelo Excel no Windows)
+CODIFICACAO_ALTERNATIVA = "cp1252"
+
+"""
+Descobre a codificação de um arquivo de importação antes de importar qualquer lote.
+O arquivo é decodificado como UTF-8 em blocos (sem carregá-lo inteiro na memória); se algum byte
+não for UTF-8 válido, usa CODIFICACAO_ALTERNATIVA.
+
+Args:
+    arquivo (str): Caminho do arquivo.
+
+Returns:
+    str: "utf-8-sig" ou CODIFICACAO_ALTERNATIVA.
+"""
+def detecta_codificacao(arquivo: str) -> str:
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+    with open(arquivo, "rb") as f:
         try:
-            escolha_hora = int(input("Escolha o número do horário: "))
-            if 1 <= escolha_hora <= len(horarios_disponiveis[dia_escolhido]):
-                horario_escolhido = horarios_disponiveis[dia_escolhido][escolha_hora - 1]
-                break
-            else:
-                print(f"Opção inválida. Digite um número entre 1 e {len(horarios_disponiveis[dia_escolhido])}.")
-        except ValueError:
-            print("Entrada inválida. Digite apenas números.")
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                decodificador.decode(bloco)
+            decodificador.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return CODIFICACAO_ALTERNATIVA
+    return "utf-8-sig"
 
-    data_str = f"{dia_escolhido} {horario_escolhido}"
-    for ag in agendamentos:
-        if ag["cpf"] == paciente["cpf"] and ag["data"] == data_str:
-            print("Já existe uma consulta nesse horário para este paciente.")
-            return agendamentos
+"""
+Lê um arquivo de importação linha a linha, sem carregá-lo inteiro na memória.
+Arquivos '.jsonl' têm um objeto JSON por linha; os demais são lidos como CSV com cabeçalho
+(colunas nome, cpf, ddd, numero ou nome, cpf, telefone).
 
-    agendamentos.append({
-        "cpf": paciente["cpf"],
-        "nome": paciente["nome"],
-        "data": data_str
-    })
-    salva_dados("agendamentos.json", "agendamentos", agendamentos)
+Args:
+    arquivo (str): Caminho do arquivo CSV ou JSONL.
+    codificacao (str, opcional): Codificação do arquivo. Default é 'utf-8-sig' (UTF-8, com ou sem BOM).
+
+Yields:
+    tuple[int, dict | None]: Número da linha no arquivo e o registro lido (None se a linha JSON for inválida).
+"""
+def le_registros_importacao(arquivo: str, codificacao: str = "utf-8-sig"):
+    with open(arquivo, "r", encoding=codificacao, newline="") as f:
+        if arquivo.endswith(".jsonl"):
+            for numero_linha, linha in enumerate(f, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    registro = None
+                yield numero_linha, registro if isinstance(registro, dict) else None
+        else:
+            for numero_linha, registro in enumerate(csv.DictReader(f), 2):
+                yield numero_linha, registro
+
+"""
+Valida um registro de importação com as mesmas regras do cadastro interativo,
+conferindo também os dígitos verificadores do CPF e CPFs repetidos.
+
+Args:
+    registro (dict | None): Registro lido do arquivo.
+    cpfs (set[str]): CPFs já cadastrados ou importados.
+
+Returns:
+    tuple:
+        dict | None: Paciente pronto para cadastro ou None se rejeitado.
+        str: Motivo da rejeição (vazio se aceito).
+"""
+def valida_registro_importacao(registro: dict | None, cpfs: set[str]) -> tuple[dict | None, str]:
+    if registro is None:
+        return None, "Linha inválida"
+    nome = " ".join(str(registro.get("nome") or "").split())
+    cpf = "".join(c for c in str(registro.get("cpf") or "") if c.isdigit())
+    ddd = str(registro.get("ddd") or "").strip()
+    numero = str(registro.get("numero") or "").strip()
+    if not ddd and not numero and registro.get("telefone"):
+        e164 = normaliza_telefone(str(registro["telefone"]))
+        if e164:
+            ddd, numero = e164[3:5], e164[5:]
+
+    if not nome_valido(nome):
+        return None, "Nome inválido"
+    if not cpf_valido(cpf):
+        return None, "CPF deve ter 11 dígitos"
+    if not cpf_digitos_validos(cpf):
+        return None, "Dígitos verificadores do CPF não conferem"
+    if cpf in cpfs:
+        return None, "CPF já cadastrado"
+    if not ddd_valido(ddd):
+        return None, "DDD inválido"
+    if not numero_valido(numero):
+        return None, "Número de telefone inválido"
+
+    telefone = formata_telefone(ddd, numero)
+    return {"nome": nome, "cpf": cpf, "telefone": telefone, "telefone_e164": normaliza_telefone(telefone)}, ""
+
+"""
+Importa pacientes em massa de um arquivo CSV ou JSONL.
+O arquivo é lido em lotes de TAMANHO_LOTE_IMPORTACAO registros; cada lote é validado e
+gravado em 'pacientes.json' com uma única escrita. As linhas rejeitadas vão para um
+relatório CSV com o número da linha e o motivo.
+Sem codificação informada, ela é detectada antes do primeiro lote (UTF-8 ou cp1252). Se o arquivo
+não puder ser lido até o fim (codificação errada, CSV malformado), a importação para com uma mensagem;
+os lotes anteriores já gravados continuam cadastrados e são contados no retorno.
+
+Args:
+    arquivo (str): Caminho do arquivo CSV ou JSONL.
+    pacientes (list[dict]): Lista atual de pacientes cadastrados.
+    arquivo_erros (str, opcional): Caminho do relatório de erros. Default é 'erros_importacao.csv'.
+    codificacao (str | None, opcional): Codificação do arquivo (ex.: "cp1252"). Default é None (detecta).
+
+Returns:
+    tuple:
+        int: Quantidade de pacientes importados.
+        int: Quantidade de linhas rejeitadas.
+"""
+def importa_pacientes(arquivo: str, pacientes: list[dict], arquivo_erros: str = "erros_importacao.csv",
+                      codificacao: str | None = None) -> tuple[int, int]:
+    cpfs = {p["cpf"] for p in pacientes}
+    importados = rejeitados = 0
+    # o arquivo de entrada é aberto (lendo o primeiro lote) antes do relatório de erros,
+    # para que um arquivo inexistente ou ilegível não apague o relatório da importação anterior
+    try:
+        registros = le_registros_importacao(arquivo, codificacao or detecta_codificacao(arquivo))
+        lote = list(itertools.islice(registros, TAMANHO_LOTE_IMPORTACAO))
+    except OSError:
+        print(f"Arquivo '{arquivo}' não encontrado ou sem permissão de leitura.")
+        return 0, 0
+    except LookupError:
+        print(f"Codificação desconhecida: {codificacao}.")
+        return 0, 0
+    except (UnicodeDecodeError, csv.Error) as erro:
+        print(f"Não foi possível ler '{arquivo}': {erro}. Nenhum paciente importado.")
+        return 0, 0
+    with open(arquivo_erros, "w", encoding="utf-8", newline="") as f_erros:
+        erros = csv.writer(f_erros)
+        erros.writerow(["linha", "motivo", "registro"])
+        while lote:
+            novos = []
+            for numero_linha, registro in lote:
+                paciente, motivo = valida_registro_importacao(registro, cpfs)
+                if paciente:
+                    cpfs.add(paciente["cpf"])
+                    novos.append(paciente)
+                else:
+                    erros.writerow([numero_linha, motivo, json.dumps(registro, ensure_ascii=False)])
+                    rejeitados += 1
+            if novos:
+                pacientes.extend(novos)
+                salva_dados("pacientes.json", "pacientes", pacientes)
+                registra_eventos([("paciente_cadastrado", {"cpf": p["cpf"], "nome": p["nome"],
+                                                           "telefone_e164": p["telefone_e164"], "origem": "importacao"})
+                                  for p in novos])
+                importados += len(novos)
+            try:
+                lote = list(itertools.islice(registros, TAMANHO_LOTE_IMPORTACAO))
+            except (UnicodeDecodeError, csv.Error) as erro:
+                print(f"Leitura de '{arquivo}' interrompida: {erro}. "
+                      f"Os {importados} pacientes dos lotes anteriores já foram gravados.")
+                break
+    return importados, rejeitados
+
+#======PAGINAÇÃO===================================================================
+# quantidade de itens exibidos por página nas listagens (cabe em uma mensagem de Whatsapp)
+TAMANHO_PAGINA = 10
+
+# índice ordenado das chaves (ordinal, dia) do dicionário de dias paginado por último
+_indice_dias = {"dias": None, "chaves": []}
+
+"""
+Retorna a chave de ordenação de um dia: (ordinal, dia). Dias com data inválida vão para o final.
+
+Args:
+    dia (str): Dia no formato "dd/mm/aaaa".
+
+Returns:
+    tuple[int, str]: Chave (ordinal, dia).
+"""
+def _chave_dia(dia: str) -> tuple[int, str]:
+    return (data_para_ordinal(dia) if data_valida(dia) else 10 ** 7), dia
+
+"""
+Retorna as chaves (ordinal, dia) de um dicionário {dia: ...} em ordem cronológica.
+A lista ordenada fica guardada e só é montada de novo quando o dicionário muda de objeto ou de
+tamanho; inclusões e remoções de dias feitas pelo sistema a mantêm em dia com indexa_dia e
+remove_dia_indice.
+
+Args:
+    dias (dict): Dicionário cujas chaves são dias "dd/mm/aaaa" (ex.: horarios_disponiveis).
+
+Returns:
+    list[tuple[int, str]]: Chaves ordenadas.
+"""
+def indice_dias(dias: dict) -> list[tuple[int, str]]:
+    if _indice_dias["dias"] is not dias or len(_indice_dias["chaves"]) != len(dias):
+        _indice_dias["dias"] = dias
+        _indice_dias["chaves"] = sorted(_chave_dia(d) for d in dias)
+    return _indice_dias["chaves"]
+
+"""
+Inclui um dia recém-adicionado ao dicionário no índice ordenado, se ele já estiver montado.
+
+Args:
+    dias (dict): Dicionário de dias (ex.: horarios_disponiveis).
+    dia (str): Dia adicionado.
+"""
+def indexa_dia(dias: dict, dia: str) -> None:
+    if _indice_dias["dias"] is not dias:
+        return
+    chaves = _indice_dias["chaves"]
+    chave = _chave_dia(dia)
+    pos = bisect.bisect_left(chaves, chave)
+    if pos == len(chaves) or chaves[pos] != chave:
+        chaves.insert(pos, chave)
+
+"""
+Tira um dia removido do dicionário do índice ordenado, se ele já estiver montado.
+
+Args:
+    dias (dict): Dicionário de dias (ex.: horarios_disponiveis).
+    dia (str): Dia removido.
+"""
+def remove_dia_indice(dias: dict, dia: str) -> None:
+    if _indice_dias["dias"] is not dias:
+        return
+    chaves = _indice_dias["chaves"]
+    chave = _chave_dia(dia)
+    pos = bisect.bisect_left(chaves, chave)
+    if pos < len(chaves) and chaves[pos] == chave:
+        del chaves[pos]
+
+"""
+Retorna uma página dos dias de um dicionário {dia: ...}, em ordem cronológica.
+O cursor é a chave (ordinal, dia) de um item: a próxima página começa depois dele e a anterior
+termina antes dele, então a navegação continua estável mesmo se dias forem adicionados ou removidos.
+A página é localizada por busca binária no índice ordenado (indice_dias), sem percorrer todos os dias.
+Dias com data inválida aparecem no final.
+
+Args:
+    dias (dict): Dicionário cujas chaves são dias "dd/mm/aaaa" (ex.: horarios_disponiveis).
+    cursor (tuple | None, opcional): Chave de referência. Default é None (primeira página).
+    direcao (str, opcional): 'proxima' ou 'anterior'. Default é 'proxima'.
+    tamanho (int, opcional): Itens por página. Default é TAMANHO_PAGINA.
+
+Returns:
+    dict: Página com 'itens' (pares (chave, dia)), 'tem_proxima' e 'tem_anterior'.
+"""
+def pagina_dias(dias: dict, cursor: tuple | None = None, direcao: str = "proxima", tamanho: int = TAMANHO_PAGINA) -> dict:
+    chaves = indice_dias(dias)
+    if direcao == "proxima":
+        inicio = 0 if cursor is None else bisect.bisect_right(chaves, tuple(cursor))
+        fim = min(len(chaves), inicio + tamanho)
+    else:
+        fim = len(chaves) if cursor is None else bisect.bisect_left(chaves, tuple(cursor))
+        inicio = max(0, fim - tamanho)
+    itens = [(c, c[1]) for c in chaves[inicio:fim]]
+    if any(dia not in dias for _, dia in itens):
+        # o dicionário mudou sem passar pelo índice: monta de novo
+        _indice_dias["dias"] = None
+        return pagina_dias(dias, cursor, direcao, tamanho)
+    if direcao == "proxima":
+        return {"itens": itens, "tem_proxima": fim < len(chaves), "tem_anterior": cursor is not None}
+    return {"itens": itens, "tem_proxima": True, "tem_anterior": inicio > 0}
+
+"""
+Retorna uma página de uma lista na ordem de inserção (ex.: FAQ). O cursor é a posição do item.
+Como a lista já está na ordem certa, a página é um recorte direto, sem percorrer o restante.
+
+Args:
+    lista (list): Lista de itens.
+    cursor (int | None, opcional): Posição de referência. Default é None (primeira página).
+    direcao (str, opcional): 'proxima' (itens depois do cursor) ou 'anterior' (itens antes). Default é 'proxima'.
+    tamanho (int, opcional): Itens por página. Default é TAMANHO_PAGINA.
+
+Returns:
+    dict: Página com 'itens' (pares (posição, item)), 'tem_proxima' e 'tem_anterior'.
+"""
+def pagina_lista(lista: list, cursor: int | None = None, direcao: str = "proxima", tamanho: int = TAMANHO_PAGINA) -> dict:
+    if direcao == "proxima":
+        inicio = 0 if cursor is None else cursor + 1
+        fim = min(len(lista), inicio + tamanho)
+    else:
+        # a página anterior termina logo antes do cursor (o item do cursor não entra)
+        fim = len(lista) if cursor is None else min(len(lista), cursor)
+        inicio = max(0, fim - tamanho)
+    return {
+        "itens": [(i, lista[i]) for i in range(inicio, fim)],
+        "tem_proxima": fim < len(lista),
+        "tem_anterior": inicio > 0,
+    }
+
+"""
+Exibe uma coleção página a página, com navegação "p" (próxima) e "a" (anterior).
+Apenas a página atual é montada e exibida.
+
+Args:
+    obter_pagina (Callable): Função (cursor, direcao) -> página, como pagina_dias ou pagina_lista já com a coleção.
+    formata (Callable): Função item -> texto exibido na linha.
+    mensagem (str, opcional): Mensagem do prompt. Default é "Escolha o número: ".
+    selecionar (bool, opcional): Se False, só permite navegar (sem escolher item). Default é True.
+
+Returns:
+    tuple | None: Par (chave, item) escolhido ou None se o usuário voltar.
+"""
+def navega_paginas(obter_pagina, formata, mensagem: str = "Escolha o número: ", selecionar: bool = True) -> tuple | None:
+    pagina = obter_pagina(None, "proxima")
+    while True:
+        for i, (_, item) in enumerate(pagina["itens"], 1):
+            print(f"{i}. {formata(item)}" if selecionar else formata(item))
+        opcoes = ["0"]
+        if pagina["tem_anterior"]:
+            print("a - Página anterior")
+            opcoes.append("a")
+        if pagina["tem_proxima"]:
+            print("p - Próxima página")
+            opcoes.append("p")
+        print("0 - Voltar")
+        if selecionar:
+            opcoes += [str(i) for i in range(1, len(pagina["itens"]) + 1)]
+
+        escolha = input(mensagem if selecionar else "Escolha: ").strip().lower()
+        if escolha not in opcoes:
+            print(f"Opção inválida. Escolha entre: {', '.join(opcoes)}.")
+            continue
+        if escolha == "0":
+            return None
+        if escolha == "p":
+            pagina = obter_pagina(pagina["itens"][-1][0], "proxima")
+        elif escolha == "a":
+            pagina = obter_pagina(pagina["itens"][0][0], "anterior")
+        else:
+            return pagina["itens"][int(escolha) - 1]
+        print()
+
+#======AGENDAMENTO/ADMINISTRAÇÃO DE DATAS E HORÁRIOS DISPONÍVEIS===================================================================
+"""
+Salva os horários disponíveis em um arquivo JSON.
+
+Args:
+    horarios (dict): Dicionário de horários disponíveis.
+    arquivo (str, opcional): Caminho do arquivo JSON. Default é 'horarios.json'.
+"""
+def salva_horarios(horarios: dict, arquivo: str = "horarios.json") ->None:
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump(horarios, f)
+
+"""
+Carrega os horários disponíveis de um arquivo JSON.
+Se o arquivo não existir ou estiver corrompido, retorna um dicionário vazio.
+
+Args:
+    arquivo (str): Caminho do arquivo JSON.
+    silencioso (bool, opcional): Se True, não exibe nenhuma mensagem (os avisos ficam para avisos_carregamento).
+
+Returns:
+    dict: Dicionário de horários disponíveis ou vazio se não existir ou estiver corrompido.
+"""
+def carrega_horarios(arquivo: str, silencioso: bool = False) -> dict:
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        _avisa_carregamento(f"Arquivo '{arquivo}' não encontrado.", silencioso)
+        return {}  
+    except json.JSONDecodeError:
+        _avisa_carregamento(f"Arquivo '{arquivo}' corrompido ou inválido.", silencioso)
+        return {}
+    else:
+        return dados
+    finally:
+        if not silencioso:
+            print(f"Tentativa de leitura do '{arquivo}' finalizada.")
+
+
+
+
+# horários válidos (intervalos de 30 min, 08:00 até 18:30)
+horarios_validos = [f"{h:02d}:00" for h in range(8, 19)] + [f"{h:02d}:30" for h in range(8, 19)]
+_conjunto_horarios_validos = set(horarios_validos)
+"""
+Verifica se a hora fornecida está dentro da lista de horários válidos.
+
+Args:
+    hora (str): Horário no formato "hh:mm".
+
+Returns:
+    bool: True se válido, False caso contrário.
+"""
+def horario_valido(hora: str) -> bool:
+    return hora in _conjunto_horarios_validos
+
+"""
+Solicita ao usuário um horário válido (08:00 até 18:30, de 30 em 30 minutos).
+
+Returns:
+    str | None: Horário escolhido no formato "hh:mm" ou None se cancelar.
+"""
+def pedir_horario() -> str | None:
+    while True:
+        hora = input("Digite o horário desejado: ").strip()
+        if hora == "0":
+            return None
+        if horario_valido(hora):
+            return hora
+        print("Horário inválido. Use formato hh:mm entre 08:00 e 18:30, apenas de 30 em 30 minutos.")
+
+
+"""
+Verifica se a data fornecida é válida (anos 2025 ou 2026).
+
+Args:
+    data (str): Data no formato "dd/mm/aaaa".
+
+Returns:
+    bool: True se a data for válida, False caso contrário.
+"""
+def data_valida(data: str) -> bool:
+    if len(data) != 10 or data[2] != "/" or data[5] != "/":
+        return False
+    if not (data[:2].isdigit() and data[3:5].isdigit() and data[6:].isdigit()):
+        return False
+
+    dia, mes, ano = int(data[:2]), int(data[3:5]), int(data[6:])
+    if ano not in (2025, 2026):
+        return False
+    if mes < 1 or mes > 12:
+        return False
+    #lista que representa a quantidade de dias em cada mês do ano
+    dias_por_mes = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    return 1 <= dia <= dias_por_mes[mes - 1]
+
+
+"""
+Solicita ao usuário uma data válida no formato dd/mm/aaaa.
+
+Returns:
+    str | None: Data válida ou None se cancelar.
+"""
+def pedir_data() -> str | None:
+    while True:
+        print("\nDigite a data para agendamento:")
+        print("0 - Voltar")
+        data = input("Digite a data (dd/mm/aaaa): ").strip()
+        if data == "0":
+            return None
+        if data_valida(data):
+            return data
+        print("Data inválida. Use formato dd/mm/aaaa e anos 2025 ou 2026.")
+
+
+"""
+Exibe os dias disponíveis com horários cadastrados, em ordem cronológica e página a página, e permite que o usuário escolha um.
+
+Args:
+    horarios_disponiveis (dict): Dicionário de dias e horários cadastrados.
+
+Returns:
+    str | None: Dia escolhido no formato "dd/mm/aaaa" ou None se não houver/usuário cancelar.
+"""
+def escolher_dia_existente(horarios_disponiveis: dict) -> str | None:
+    if not horarios_disponiveis:
+        print("Nenhum dia cadastrado.")
+        return None
+    print("\nDias existentes:")
+    escolhido = navega_paginas(lambda cursor, direcao: pagina_dias(horarios_disponiveis, cursor, direcao),
+                               lambda dia: dia, "Escolha o número do dia: ")
+    return escolhido[1] if escolhido else None
+
+
+"""
+Gerencia os horários disponíveis: adiciona e remove dias e horários no 'horarios.json' que serão escolhidos pelo paciente para agendar consulta.
+
+Args:
+    horarios_disponiveis (dict): Dicionário de horários disponíveis.
+
+Returns:
+    dict: Dicionário atualizado de horários disponíveis.
+"""
+def gerenciar_horarios(horarios_disponiveis: dict) -> dict:
+    while True:
+        # os eventos só são registrados depois que os horários forem salvos
+        eventos = []
+        limpa_tela()
+        print("=== Gerenciar Horários ===")
+        if not horarios_disponiveis:
+            print("Nenhum horário cadastrado.")
+        else:
+            # mostra só os próximos dias; a lista completa fica na opção 5
+            pagina = pagina_dias(horarios_disponiveis)
+            for _, dia in pagina["itens"]:
+                horas = horarios_disponiveis[dia]
+                print(f"{dia}: {', '.join(sorted(horas)) if horas else 'Sem horários'}")
+            if pagina["tem_proxima"]:
+                print(f"... {len(horarios_disponiveis) - len(pagina['itens'])} dias a mais (opção 5)")
+
+        print("\nOpções:")
+        print("1. Adicionar dia e horários")
+        print("2. Adicionar horário em dia existente")
+        print("3. Remover horário de um dia")
+        print("4. Remover dia inteiro")
+        print("5. Ver todos os dias")
+        print("0. Voltar")
+
+        opcao = entrada_valida("Escolha: ", ["0", "1", "2", "3", "4", "5"])
+
+        if opcao == "0":
+            break
+
+        elif opcao == "5":
+            limpa_tela()
+            print("=== Todos os dias ===")
+            navega_paginas(lambda cursor, direcao: pagina_dias(horarios_disponiveis, cursor, direcao),
+                           lambda dia: f"{dia}: {', '.join(sorted(horarios_disponiveis[dia])) or 'Sem horários'}",
+                           selecionar=False)
+
+        elif opcao == "1":
+            while True:
+                limpa_tela()
+                print("=== Adicionar dia e horários ===")
+                dia = pedir_data()
+                if dia == "0":
+                    break
+                if dia not in horarios_disponiveis:
+                    horarios_disponiveis[dia] = []
+                    indexa_dia(horarios_disponiveis, dia)
+
+                while True:
+                    hora = pedir_horario()
+                    if hora == "0":
+                        break
+                    if hora in horarios_disponiveis[dia]:
+                        print("Esse horário já existe.")
+                    else:
+                        horarios_disponiveis[dia].append(hora)
+                        eventos.append(("horario_adicionado", {"dia": dia, "hora": hora}))
+                        print(f"Horário {hora} adicionado em {dia}.")
+
+                    opcao_hora = entrada_valida("Deseja adicionar outro horário?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                    if opcao_hora == "2":
+                        break
+                break
+
+        elif opcao == "2":
+            while True:
+                limpa_tela()
+                print("=== Adicionar horário em dia existente ===")
+                dia = escolher_dia_existente(horarios_disponiveis)
+                if not dia:
+                    break
+
+                if horarios_disponiveis[dia]:
+                    print(f"Horários já cadastrados em {dia}: {', '.join(sorted(horarios_disponiveis[dia]))}")
+                else:
+                    print(f"Nenhum horário cadastrado ainda em {dia}.")
+
+                while True:
+                    hora = pedir_horario()
+                    if hora == "0":
+                        break
+                    if hora in horarios_disponiveis[dia]:
+                        print("Esse horário já existe.")
+                    else:
+                        horarios_disponiveis[dia].append(hora)
+                        eventos.append(("horario_adicionado", {"dia": dia, "hora": hora}))
+                        print(f"Horário {hora} adicionado em {dia}.")
+
+                    opcao_hora = entrada_valida("Deseja adicionar outro horário nesse dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                    if opcao_hora == "2":
+                        break
+                break
+
+        elif opcao == "3":
+            while True:
+                limpa_tela()
+                print("=== Remover horário de um dia ===")
+                dia = escolher_dia_existente(horarios_disponiveis)
+                if not dia:
+                    break
+                if not horarios_disponiveis[dia]:
+                    print("Nenhum horário nesse dia.")
+                    opcao_dia = entrada_valida("Deseja tentar outro dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                    if opcao_dia == "2":
+                        break
+                    else:
+                        continue
+
+                while True:
+                    print(f"\nHorários em {dia}:")
+                    horarios_ordenados = sorted(horarios_disponiveis[dia])
+                    for i, h in enumerate(horarios_ordenados, 1):
+                        print(f"{i}. {h}")
+                    print("0 - Voltar")
+
+                    escolha = input("Escolha o número do horário para remover: ").strip()
+                    if escolha == "0":
+                        break
+                    if escolha.isdigit() and 1 <= int(escolha) <= len(horarios_ordenados):
+                        removido = horarios_ordenados[int(escolha) - 1]
+                        horarios_disponiveis[dia].remove(removido)
+                        eventos.append(("horario_removido", {"dia": dia, "hora": removido}))
+                        print(f"Horário {removido} removido.")
+
+                        opcao_hora = entrada_valida("Deseja remover outro horário nesse dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                        if opcao_hora == "2":
+                            break
+                    else:
+                        print("Escolha inválida.")
+
+                opcao_dia = entrada_valida("Deseja remover horário de outro dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                if opcao_dia == "2":
+                    break
+
+        elif opcao == "4":
+            while True:
+                limpa_tela()
+                print("=== Remover dia inteiro ===")
+                dia = escolher_dia_existente(horarios_disponiveis)
+                if not dia:
+                    break
+                opcao_remover = entrada_valida(f"Tem certeza que deseja remover o dia {dia}?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                if opcao_remover == "1":
+                    del horarios_disponiveis[dia]
+                    remove_dia_indice(horarios_disponiveis, dia)
+                    eventos.append(("dia_removido", {"dia": dia}))
+                    print(f"Dia {dia} removido com sucesso.")
+                else:
+                    print("Remoção cancelada.")
+
+                opcao_dia = entrada_valida("Deseja remover outro dia?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+                if opcao_dia == "2":
+                    break
+
+        salva_horarios(horarios_disponiveis)
+        if eventos:
+            registra_eventos(eventos)
+
+    return horarios_disponiveis
+
+"""
+Agenda uma consulta para um paciente em dia e horário disponível, que ao ser confirmada vai para 'agendamentos.json' de determinado paciente.
+Quando a consulta é agendada, o horario disponivel para determinado dia é retirado dos horários disponíveis.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos existentes.
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+
+Returns:
+    tuple:
+        list[dict]: Lista atualizada de agendamentos.
+        dict: Dicionário atualizado de horários disponíveis.
+"""
+def agendar_consulta_com_horarios(agendamentos: list[dict], pacientes: list[dict], horarios_disponiveis: dict) -> tuple[list[dict], dict]:
+    print("=== Agendamento de consulta ===")
+    paciente = buscar_usuario_por_cpf_interativo(pacientes)
+
+    if not paciente:
+        return agendamentos, horarios_disponiveis
+
+    if not horarios_disponiveis:
+        print("Não há horários disponíveis para agendamento.")
+        return agendamentos, horarios_disponiveis
+
+    # retoma um agendamento interrompido: o dia escolhido fica na sessão do paciente até a consulta ser marcada
+    sessoes = obter_sessoes()
+    estado = obtem_sessao(sessoes, paciente["cpf"]) or {}
+    dia_escolhido = None
+    if estado.get("fluxo") == "agendamento" and horarios_disponiveis.get(estado["dia"]):
+        continuar = entrada_valida(f"\nVocê estava agendando uma consulta para {estado['dia']}. Continuar com esse dia?"
+                                   "\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+        if continuar == "1":
+            dia_escolhido = estado["dia"]
+
+    if dia_escolhido is None:
+        print("\nDias disponíveis para agendamento:")
+        escolhido = navega_paginas(lambda cursor, direcao: pagina_dias(horarios_disponiveis, cursor, direcao),
+                                   lambda dia: f"{dia} ({len(horarios_disponiveis[dia])} horários disponíveis)",
+                                   "Escolha o número do dia: ")
+        if not escolhido:
+            return agendamentos, horarios_disponiveis
+        dia_escolhido = escolhido[1]
+        salva_sessao(sessoes, paciente["cpf"], {"fluxo": "agendamento", "dia": dia_escolhido})
+    if not horarios_disponiveis[dia_escolhido]:
+        print("Não há horários disponíveis neste dia.")
+        return agendamentos, horarios_disponiveis
+
+    while True:
+        print(f"\nHorários disponíveis em {dia_escolhido}:")
+        for i, hora in enumerate(horarios_disponiveis[dia_escolhido], 1):
+            print(f"{i}. {hora}")
+
+        try:
+            escolha_hora = int(input("Escolha o número do horário: "))
+            if 1 <= escolha_hora <= len(horarios_disponiveis[dia_escolhido]):
+                horario_escolhido = horarios_disponiveis[dia_escolhido][escolha_hora - 1]
+                break
+            else:
+                print(f"Opção inválida. Digite um número entre 1 e {len(horarios_disponiveis[dia_escolhido])}.")
+        except ValueError:
+            print("Entrada inválida. Digite apenas números.")
+
+    data_str = f"{dia_escolhido} {horario_escolhido}"
+    for ag in agendamentos:
+        if ag["cpf"] == paciente["cpf"] and ag["data"] == data_str and agendamento_ativo(ag):
+            print("Já existe uma consulta nesse horário para este paciente.")
+            return agendamentos, horarios_disponiveis
+
+    remove_sessao(sessoes, paciente["cpf"])
+    agendamentos.append({
+        "cpf": paciente["cpf"],
+        "nome": paciente["nome"],
+        "data": data_str,
+        "status": "agendado",
+        "agendado_em": time.strftime("%d/%m/%Y %H:%M")
+    })
+    salva_dados("agendamentos.json", "agendamentos", agendamentos)
+
+    horarios_disponiveis[dia_escolhido].remove(horario_escolhido)
+    salva_horarios(horarios_disponiveis)
+    registra_evento("agendamento_criado", dados_evento_agendamento(agendamentos[-1]))
+
+    print(f"Consulta agendada para {paciente['nome']} em {data_str}!")
+    return agendamentos, horarios_disponiveis
+
+"""
+Verifica se um agendamento ainda vale (não foi cancelado).
+Agendamentos antigos, sem o campo 'status', são considerados ativos.
+Cancelar uma consulta não apaga o registro: ele fica com status 'cancelado', com os mesmos dados que já
+tinha (CPF, nome, data), porque a taxa de cancelamento do relatório e o STATUS:CANCELLED dos calendários
+dependem dele. Quem percorre os agendamentos para achar consultas ativas deve usar esta função.
+
+Args:
+    agendamento (dict): Agendamento a verificar.
+
+Returns:
+    bool: True se o agendamento não foi cancelado.
+"""
+def agendamento_ativo(agendamento: dict) -> bool:
+    return agendamento.get("status", "agendado") != "cancelado"
+
+"""
+Consulta e exibe os agendamentos de um paciente pelo CPF.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+"""
+def consultar_agendamentos(agendamentos: list[dict], pacientes: list[dict]) -> None:
+    print("=== Consulta de Agendamento ===")
+    paciente = buscar_usuario_por_cpf_interativo(pacientes)
+    if not paciente:
+        return
+
+    cpf = paciente["cpf"]
+    encontrados = [ag for ag in agendamentos if ag["cpf"] == cpf and agendamento_ativo(ag)]
+
+    print("\n=== Dados do Paciente ===")
+    print(f"Nome: {paciente['nome']}")
+    print(f"CPF: {paciente['cpf']}")
+    print(f"Telefone/WhatsApp: {paciente['telefone']}")
+
+    print("\n=== Agendamentos ===")
+    if not encontrados:
+        print("Nenhum agendamento encontrado.")
+    else:
+        for ag in encontrados:
+            if "hora" in ag:
+                print(f"- {ag['data']} às {ag['hora']}")
+            else:
+                print(f"- {ag['data']}")
+        # calendário do paciente, para importar na agenda do celular (só é regravado se os agendamentos mudaram)
+        caminho = calendario_paciente(cpf, agendamentos)
+        print(f"\nCalendário para a agenda do celular: {caminho}")
+
+#======LEMBRETES===================================================================
+"""
+Permite que o paciente confirme ou cancele seus agendamentos.Case cancele, o agendamento é marcado como 'cancelado' no 'agendamentos.json' e o horário volta aos horários disponíveis. Caso confirme ele é marcado como 'confirmado' e continua no agendamento. É uma simulação de envio de lembrete ao paciente para confirmação ou cancelamento de consulta.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    paciente (dict): Dicionário do paciente.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis.
+"""
+def verificar_lembretes_paciente(agendamentos: list[dict], paciente: dict, horarios_disponiveis: dict) -> None:
+    cpf = paciente["cpf"]
+    encontrados = [ag for ag in agendamentos if ag["cpf"] == cpf and agendamento_ativo(ag)]
+
+    if not encontrados:
+        print(f"\nNenhum agendamento encontrado para {paciente['nome']}.")
+        return
+
+    agendamentos_restantes = encontrados.copy()
+    # retoma a verificação interrompida: a sessão guarda as consultas que ainda não foram confirmadas/canceladas
+    sessoes = obter_sessoes()
+    estado = obtem_sessao(sessoes, cpf)
+    if estado and estado.get("fluxo") == "lembretes":
+        pendentes = set(estado["restantes"])
+        retomados = [ag for ag in encontrados if ag["data"] in pendentes]
+        if retomados and len(retomados) < len(encontrados):
+            continuar = entrada_valida(f"\nVocê ainda tem {len(retomados)} lembretes da última verificação. "
+                                       "Continuar de onde parou?\n1 - Sim\n2 - Não (ver todos)\nEscolha: ", ["1", "2"])
+            if continuar == "1":
+                agendamentos_restantes = retomados
+
+    while agendamentos_restantes:
+        print(f"\n=== Agendamentos de {paciente['nome']} ===")
+        for i, ag in enumerate(agendamentos_restantes, 1):
+            print(f"{i}. {ag['data']}")
+        print("0 - Voltar")
+
+        escolha = input("Escolha um agendamento para confirmar/cancelar: ").strip()
+        if escolha == "0":
+            break
+        if not escolha.isdigit() or not (1 <= int(escolha) <= len(agendamentos_restantes)):
+            print(f"Escolha inválida. Digite um número entre 0 e {len(agendamentos_restantes)}.")
+            continue
+
+        agendamento = agendamentos_restantes[int(escolha)-1]
+
+        decisao = entrada_valida("\nDeseja confirmar ou cancelar este agendamento?\n1 - Confirmar\n2 - Cancelar\n0 - Voltar\nEscolha: ", ["0", "1", "2"])
+
+        if decisao == "1":
+            print(f"\nConsulta de {paciente['nome']} confirmada!")
+            agendamento["status"] = "confirmado"
+            agendamentos_restantes.remove(agendamento)
+            salva_dados("agendamentos.json", "agendamentos", agendamentos)
+            registra_evento("agendamento_confirmado", dados_evento_agendamento(agendamento))
+        elif decisao == "2":
+            print(f"\nConsulta de {paciente['nome']} cancelada.")
+            # a consulta fica no histórico como cancelada (usada nos relatórios de cancelamento)
+            agendamento["status"] = "cancelado"
+            agendamentos_restantes.remove(agendamento)
+            salva_dados("agendamentos.json", "agendamentos", agendamentos)
+            registra_evento("agendamento_cancelado", dados_evento_agendamento(agendamento))
+
+            if "recurso" in agendamento:
+                # consulta com profissional/sala: o horário volta para a agenda do recurso
+                devolve_horario_recurso(agendamento)
+            else:
+                dia, hora = agendamento["data"].split(" ")
+                if dia in horarios_disponiveis:
+                    horarios_disponiveis[dia].append(hora)
+                else:
+                    horarios_disponiveis[dia] = [hora]
+                    indexa_dia(horarios_disponiveis, dia)
+                salva_horarios(horarios_disponiveis)
+        elif decisao == "0":
+            continue
+
+        salva_sessao(sessoes, cpf, {"fluxo": "lembretes", "restantes": [ag["data"] for ag in agendamentos_restantes]})
+        if agendamentos_restantes:
+            proximo = entrada_valida(
+                "\nDeseja verificar o próximo agendamento? 1 - Sim, 2 - Não: ", ["1", "2"])
+            if proximo == "2":
+                break
+
+    if not agendamentos_restantes:
+        remove_sessao(sessoes, cpf)
+        print("\nNão há mais lembretes para verificar.")
+
+#======SÉRIES DE SESSÕES===================================================================
+"""
+Retorna os dias e horários das consultas ativas de um paciente.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    cpf (str): CPF do paciente.
+
+Returns:
+    set[str]: Datas das consultas ativas ("dd/mm/aaaa hh:mm").
+"""
+def consultas_ativas_paciente(agendamentos: list[dict], cpf: str) -> set[str]:
+    return {ag["data"] for ag in agendamentos if ag["cpf"] == cpf and agendamento_ativo(ag)}
+
+"""
+Procura nos horários disponíveis uma série de sessões com padrão fixo de dia da semana e horário
+(ex.: terças e quintas às 10:00) durante um número de semanas seguidas.
+Escolhe a semana de início mais cedo em que o padrão fica completo. Se nenhuma semana permitir
+o padrão completo, usa o padrão que cobre mais sessões e completa as que faltam com o horário
+livre mais próximo na mesma semana. Os horários em que o paciente já tem consulta não entram na série.
+
+Args:
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+    semanas (int): Quantidade de semanas do tratamento.
+    vezes_por_semana (int): Sessões por semana (em dias da semana diferentes).
+    a_partir (int | None, opcional): Ordinal do primeiro dia aceito. Default é amanhã.
+    ocupadas (set[str] | None, opcional): Consultas ativas do paciente ("dd/mm/aaaa hh:mm"). Default é None.
+
+Returns:
+    dict | None: Proposta com 'sessoes' (lista de "dd/mm/aaaa hh:mm" em ordem), 'alternativas'
+                 (sessões fora do padrão) e 'faltando' (sessões sem horário), ou None se não houver horários.
+"""
+def busca_serie(horarios_disponiveis: dict, semanas: int, vezes_por_semana: int, a_partir: int | None = None,
+                ocupadas: set[str] | None = None) -> dict | None:
+    if a_partir is None:
+        a_partir = datetime.date.today().toordinal() + 1
+
+    # semanas (começando na segunda-feira) em que cada (dia da semana, slot) está livre
+    livres = {}
+    for dia, horas in horarios_disponiveis.items():
+        ordinal = data_para_ordinal(dia) if data_valida(dia) else None
+        if ordinal is None or ordinal < a_partir:
+            continue
+        semana, dia_semana = divmod(ordinal - 1, 7)
+        for hora in horas:
+            if hora in _indice_slot and (not ocupadas or f"{dia} {hora}" not in ocupadas):
+                livres.setdefault((dia_semana, _indice_slot[hora]), set()).add(semana)
+    if not livres:
+        return None
+
+    melhor = None
+    for inicio in sorted(set().union(*livres.values())):
+        periodo = range(inicio, inicio + semanas)
+        cobertura = {par: sum(1 for s in periodo if s in semanas_livres) for par, semanas_livres in livres.items()}
+        padrao, dias_usados = [], set()
+        for par in sorted(cobertura, key=lambda p: (-cobertura[p], p)):
+            if par[0] not in dias_usados:
+                padrao.append(par)
+                dias_usados.add(par[0])
+            if len(padrao) == vezes_por_semana:
+                break
+        total = sum(cobertura[p] for p in padrao)
+        if melhor is None or total > melhor[0]:
+            melhor = (total, inicio, sorted(padrao))
+        if total == semanas * vezes_por_semana:
+            break
+
+    _, inicio, padrao = melhor
+    sessoes, alternativas, faltando = [], 0, 0
+    for semana in range(inicio, inicio + semanas):
+        usados = set()
+        for dia_semana, slot in padrao:
+            if semana in livres[(dia_semana, slot)] and (dia_semana, slot) not in usados:
+                escolhido = (dia_semana, slot)
+            else:
+                # alternativa: horário livre da mesma semana mais próximo do padrão
+                opcoes = [p for p, s in livres.items() if semana in s and p not in usados and p not in padrao]
+                if not opcoes:
+                    faltando += 1
+                    continue
+                escolhido = min(opcoes, key=lambda p: (abs(p[0] - dia_semana), abs(p[1] - slot)))
+                alternativas += 1
+            usados.add(escolhido)
+            ordinal = semana * 7 + escolhido[0] + 1
+            sessoes.append((ordinal, escolhido[1]))
+    return {
+        "sessoes": [f"{ordinal_para_data(o)} {SLOTS[s]}" for o, s in sorted(sessoes)],
+        "alternativas": alternativas,
+        "faltando": faltando,
+    }
+
+"""
+Reserva todas as sessões de uma série em uma única operação.
+Primeiro confere se todas continuam disponíveis e se o paciente não tem outra consulta em nenhuma delas;
+se alguma falhar, nada é alterado e o motivo diz qual sessão e por quê.
+Depois tira os horários da agenda, registra os agendamentos e grava os dois arquivos juntos
+(temporários trocados no final), para que uma falha no meio não deixe agendamentos sem a baixa
+dos horários correspondentes.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos existentes.
+    paciente (dict): Paciente da série.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+    sessoes (list[str]): Sessões no formato "dd/mm/aaaa hh:mm".
+
+Returns:
+    tuple:
+        bool: True se a série foi reservada.
+        str: Motivo da falha (vazio se reservada).
+"""
+def reserva_serie(agendamentos: list[dict], paciente: dict, horarios_disponiveis: dict,
+                  sessoes: list[str]) -> tuple[bool, str]:
+    ocupadas = consultas_ativas_paciente(agendamentos, paciente["cpf"])
+    for sessao in sessoes:
+        dia, hora = sessao.split(" ")
+        if sessao in ocupadas:
+            return False, f"O paciente já tem uma consulta em {sessao}."
+        if hora not in horarios_disponiveis.get(dia, []):
+            return False, f"O horário {sessao} não está mais disponível."
+
+    agendado_em = time.strftime("%d/%m/%Y %H:%M")
+    serie = f"{paciente['cpf']}-{int(time.time())}"
+    for sessao in sessoes:
+        dia, hora = sessao.split(" ")
+        horarios_disponiveis[dia].remove(hora)
+        agendamentos.append({
+            "cpf": paciente["cpf"],
+            "nome": paciente["nome"],
+            "data": sessao,
+            "status": "agendado",
+            "agendado_em": agendado_em,
+            "serie": serie
+        })
+    salva_arquivos_juntos({
+        "agendamentos.json": {"agendamentos": agendamentos},
+        "horarios.json": horarios_disponiveis,
+    })
+    registra_eventos([("agendamento_criado", dados_evento_agendamento(ag)) for ag in agendamentos[-len(sessoes):]])
+    return True, ""
+
+"""
+Agenda uma série de sessões de tratamento (ex.: 2 vezes por semana durante 8 semanas).
+Mostra a melhor série encontrada e, se o paciente confirmar, reserva todas as sessões de uma vez.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos existentes.
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+
+Returns:
+    tuple:
+        list[dict]: Lista atualizada de agendamentos.
+        dict: Dicionário atualizado de horários disponíveis.
+"""
+def agendar_serie(agendamentos: list[dict], pacientes: list[dict], horarios_disponiveis: dict) -> tuple[list[dict], dict]:
+    print("=== Agendar série de sessões ===")
+    paciente = buscar_usuario_por_cpf_interativo(pacientes)
+    if not paciente:
+        return agendamentos, horarios_disponiveis
+
+    semanas = int(entrada_valida("Quantas semanas de tratamento (1 a 52)? ", [str(i) for i in range(1, 53)]))
+    vezes = int(entrada_valida("Quantas sessões por semana (1 a 5)? ", [str(i) for i in range(1, 6)]))
+
+    while True:
+        # recalculadas a cada proposta: a série nunca cai em horário em que o paciente já está ocupado
+        ocupadas = consultas_ativas_paciente(agendamentos, paciente["cpf"])
+        proposta = busca_serie(horarios_disponiveis, semanas, vezes, ocupadas=ocupadas)
+        if not proposta or not proposta["sessoes"]:
+            print("Não há horários disponíveis para a série.")
+            return agendamentos, horarios_disponiveis
+
+        print("\nSérie proposta:")
+        for i, sessao in enumerate(proposta["sessoes"], 1):
+            print(f"{i}. {sessao}")
+        if proposta["alternativas"]:
+            print(f"{proposta['alternativas']} sessões estão fora do padrão semanal (horário mais próximo disponível).")
+        if proposta["faltando"]:
+            print(f"Atenção: {proposta['faltando']} sessões ficaram sem horário disponível.")
+
+        opcao = entrada_valida("\nConfirmar a série?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+        if opcao == "2":
+            print("Agendamento da série cancelado.")
+            return agendamentos, horarios_disponiveis
+        reservada, motivo = reserva_serie(agendamentos, paciente, horarios_disponiveis, proposta["sessoes"])
+        if reservada:
+            print(f"{len(proposta['sessoes'])} sessões agendadas para {paciente['nome']}!")
+            return agendamentos, horarios_disponiveis
+        print(f"{motivo} Buscando outra série...")
+
+#======PROFISSIONAIS E SALAS===================================================================
+TIPOS_RECURSO = ["profissional", "sala"]
+
+# agenda por recurso carregada uma única vez e compartilhada por todos os fluxos
+_agenda_recursos = None
+
+"""
+Retorna a agenda de profissionais e salas, carregando 'recursos.json' na primeira chamada.
+Cada recurso tem seus próprios horários disponíveis ({dia: [horas]}, como horarios_disponiveis),
+um índice ordenado de (dia, slot) para achar o próximo horário livre e uma trava para reservas.
+
+Args:
+    arquivo (str, opcional): Caminho do arquivo JSON. Default é 'recursos.json'.
+
+Returns:
+    dict: Agenda com 'recursos' (id -> recurso), 'horarios' (id -> {dia: [horas]}),
+          'indices' (id -> lista ordenada de (dia, slot)) e 'travas' (id -> Lock).
+"""
+def obter_agenda_recursos(arquivo: str = "recursos.json") -> dict:
+    global _agenda_recursos
+    if _agenda_recursos is not None:
+        return _agenda_recursos
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        dados = {}
+    except json.JSONDecodeError:
+        print(f"Arquivo '{arquivo}' corrompido ou inválido.")
+        dados = {}
+
+    agenda = {"arquivo": arquivo, "recursos": {}, "horarios": {}, "indices": {}, "travas": {}}
+    for recurso in dados.get("recursos", []):
+        _registra_recurso(agenda, recurso, dados.get("horarios", {}).get(recurso["id"], {}))
+    _agenda_recursos = agenda
+    return agenda
+
+"""
+Salva os recursos e seus horários disponíveis em 'recursos.json'.
+
+Args:
+    agenda (dict): Agenda de recursos.
+"""
+def salva_agenda_recursos(agenda: dict) -> None:
+    with open(agenda["arquivo"], "w", encoding="utf-8") as f:
+        json.dump({"recursos": list(agenda["recursos"].values()), "horarios": agenda["horarios"]}, f)
+
+"""
+Registra um recurso na agenda e monta seu índice ordenado de horários.
+
+Args:
+    agenda (dict): Agenda de recursos.
+    recurso (dict): Recurso com 'id', 'nome', 'tipo' e 'especialidade'.
+    horarios (dict): Horários disponíveis do recurso ({dia: [horas]}).
+"""
+def _registra_recurso(agenda: dict, recurso: dict, horarios: dict) -> None:
+    rid = recurso["id"]
+    agenda["recursos"][rid] = recurso
+    agenda["horarios"][rid] = horarios
+    agenda["travas"][rid] = threading.Lock()
+    agenda["indices"][rid] = sorted(
+        (data_para_ordinal(dia), _indice_slot[hora])
+        for dia, horas in horarios.items() if data_valida(dia)
+        for hora in horas if hora in _indice_slot
+    )
+
+"""
+Cadastra um novo profissional ou sala na agenda.
+
+Args:
+    agenda (dict): Agenda de recursos.
+    nome (str): Nome do profissional ou identificação da sala.
+    tipo (str): 'profissional' ou 'sala'.
+    especialidade (str): Especialidade atendida (ex.: "Fisioterapia").
+
+Returns:
+    dict: Recurso criado.
+"""
+def cria_recurso(agenda: dict, nome: str, tipo: str, especialidade: str) -> dict:
+    numero = 1 + sum(1 for r in agenda["recursos"].values() if r["tipo"] == tipo)
+    rid = f"{tipo}-{numero}"
+    while rid in agenda["recursos"]:
+        numero += 1
+        rid = f"{tipo}-{numero}"
+    recurso = {"id": rid, "nome": nome, "tipo": tipo, "especialidade": especialidade}
+    _registra_recurso(agenda, recurso, {})
+    return recurso
+
+"""
+Adiciona um horário disponível na agenda de um recurso.
+
+Args:
+    agenda (dict): Agenda de recursos.
+    rid (str): Id do recurso.
+    dia (str): Dia no formato "dd/mm/aaaa".
+    hora (str): Horário no formato "hh:mm".
+
+Returns:
+    bool: True se adicionado, False se o horário já existia.
+"""
+def adiciona_horario_recurso(agenda: dict, rid: str, dia: str, hora: str) -> bool:
+    with agenda["travas"][rid]:
+        horas = agenda["horarios"][rid].setdefault(dia, [])
+        if hora in horas:
+            return False
+        horas.append(hora)
+        bisect.insort(agenda["indices"][rid], (data_para_ordinal(dia), _indice_slot[hora]))
+        return True
+
+"""
+Busca o horário livre mais cedo entre todos os recursos que atendem aos filtros.
+Cada recurso é consultado por busca binária no seu índice, então o custo cresce com o
+número de recursos e não com a quantidade de horários.
+
+Args:
+    agenda (dict): Agenda de recursos.
+    especialidade (str | None, opcional): Só recursos desta especialidade. Default é None (todas).
+    a_partir (tuple[int, int] | None, opcional): Só horários depois deste (dia ordinal, slot). Default é agora
+        (horários de hoje que já começaram ficam de fora).
+    ignorar (set[str] | None, opcional): Ids de recursos a desconsiderar. Default é None.
+
+Returns:
+    tuple[str, str, str] | None: (id do recurso, dia "dd/mm/aaaa", hora "hh:mm") ou None se não houver horário.
+"""
+def busca_primeiro_horario(agenda: dict, especialidade: str | None = None,
+                           a_partir: tuple[int, int] | None = None, ignorar: set[str] | None = None) -> tuple[str, str, str] | None:
+    if a_partir is None:
+        # o último slot que já começou; bisect_right abaixo pula ele e os anteriores
+        a_partir = (datetime.date.today().toordinal(), bisect.bisect_right(SLOTS, time.strftime("%H:%M")) - 1)
+    melhor = None
+    for rid, recurso in agenda["recursos"].items():
+        if especialidade and recurso["especialidade"] != especialidade:
+            continue
+        if ignorar and rid in ignorar:
+            continue
+        indice = agenda["indices"][rid]
+        pos = bisect.bisect_right(indice, a_partir)
+        if pos < len(indice) and (melhor is None or indice[pos] < melhor[0]):
+            melhor = (indice[pos], rid)
+    if melhor is None:
+        return None
+    (dia, slot), rid = melhor
+    return rid, ordinal_para_data(dia), SLOTS[slot]
+
+"""
+Reserva um horário de um recurso para um paciente e registra o agendamento.
+A reserva é feita sob a trava do recurso: se o horário já tiver sido ocupado, ou se o paciente
+já tiver uma consulta ativa no mesmo dia e horário (com qualquer recurso), nada é alterado.
+
+Args:
+    agenda (dict): Agenda de recursos.
+    rid (str): Id do recurso.
+    dia (str): Dia no formato "dd/mm/aaaa".
+    hora (str): Horário no formato "hh:mm".
+    paciente (dict): Paciente que está agendando.
+    agendamentos (list[dict]): Lista de agendamentos.
+
+Returns:
+    bool: True se a reserva foi feita, False se o horário não estava mais disponível ou o paciente já está ocupado.
+"""
+def reserva_horario_recurso(agenda: dict, rid: str, dia: str, hora: str, paciente: dict, agendamentos: list[dict]) -> bool:
+    with agenda["travas"][rid]:
+        horas = agenda["horarios"][rid].get(dia, [])
+        if hora not in horas:
+            return False
+        data_str = f"{dia} {hora}"
+        for ag in agendamentos:
+            if ag["cpf"] == paciente["cpf"] and ag["data"] == data_str and agendamento_ativo(ag):
+                return False
+        horas.remove(hora)
+        indice = agenda["indices"][rid]
+        del indice[bisect.bisect_left(indice, (data_para_ordinal(dia), _indice_slot[hora]))]
+        agendamentos.append({
+            "cpf": paciente["cpf"],
+            "nome": paciente["nome"],
+            "data": data_str,
+            "recurso": rid,
+            "status": "agendado",
+            "agendado_em": time.strftime("%d/%m/%Y %H:%M")
+        })
+    return True
+
+"""
+Devolve à agenda do recurso o horário de um agendamento cancelado.
+
+Args:
+    agendamento (dict): Agendamento cancelado (com a chave 'recurso').
+"""
+def devolve_horario_recurso(agendamento: dict) -> None:
+    agenda = obter_agenda_recursos()
+    if agendamento["recurso"] not in agenda["recursos"]:
+        return
+    dia, hora = agendamento["data"].split(" ")
+    adiciona_horario_recurso(agenda, agendamento["recurso"], dia, hora)
+    salva_agenda_recursos(agenda)
+
+"""
+Agenda uma consulta com qualquer profissional/sala de uma especialidade, sugerindo o horário
+livre mais cedo entre todos eles. O paciente pode aceitar ou pedir o próximo horário: os outros
+recursos livres no mesmo dia e horário são oferecidos antes de avançar para o horário seguinte.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos existentes.
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+
+Returns:
+    list[dict]: Lista atualizada de agendamentos.
+"""
+def agendar_com_recursos(agendamentos: list[dict], pacientes: list[dict]) -> list[dict]:
+    print("=== Agendar com profissional ===")
+    agenda = obter_agenda_recursos()
+    especialidades = sorted({r["especialidade"] for r in agenda["recursos"].values()})
+    if not especialidades:
+        print("Nenhum profissional ou sala cadastrado.")
+        return agendamentos
+
+    paciente = buscar_usuario_por_cpf_interativo(pacientes)
+    if not paciente:
+        return agendamentos
+
+    print("\nEspecialidades:")
+    for i, e in enumerate(especialidades, 1):
+        print(f"{i}. {e}")
+    print("0 - Qualquer especialidade")
+    escolha = entrada_valida("Escolha: ", [str(i) for i in range(len(especialidades) + 1)])
+    especialidade = especialidades[int(escolha) - 1] if escolha != "0" else None
+
+    # Horário (dia ordinal, slot) da última proposta recusada e os recursos já recusados nele
+    atual = None
+    recusados = set()
+    while True:
+        proposta = None
+        if atual is not None:
+            proposta = busca_primeiro_horario(agenda, especialidade, (atual[0], atual[1] - 1), recusados)
+            if proposta and (data_para_ordinal(proposta[1]), _indice_slot[proposta[2]]) != atual:
+                proposta = None
+        if not proposta:
+            recusados = set()
+            proposta = busca_primeiro_horario(agenda, especialidade, atual)
+        if not proposta:
+            print("Não há mais horários disponíveis.")
+            return agendamentos
+        rid, dia, hora = proposta
+        recurso = agenda["recursos"][rid]
+        print(f"\nPróximo horário: {dia} às {hora} com {recurso['nome']} ({recurso['especialidade']})")
+        opcao = entrada_valida("1 - Agendar\n2 - Ver próximo horário\n0 - Voltar\nEscolha: ", ["0", "1", "2"])
+        if opcao == "0":
+            return agendamentos
+        if opcao == "2":
+            atual = (data_para_ordinal(dia), _indice_slot[hora])
+            recusados.add(rid)
+            continue
+        if reserva_horario_recurso(agenda, rid, dia, hora, paciente, agendamentos):
+            salva_dados("agendamentos.json", "agendamentos", agendamentos)
+            salva_agenda_recursos(agenda)
+            registra_evento("agendamento_criado", dados_evento_agendamento(agendamentos[-1]))
+            print(f"Consulta agendada para {paciente['nome']} em {dia} {hora} com {recurso['nome']}!")
+            return agendamentos
+        if hora in agenda["horarios"][rid].get(dia, []):
+            # O horário continua livre: quem está ocupado nele é o paciente
+            print("Já existe uma consulta nesse horário para este paciente. Buscando outro...")
+            atual = (data_para_ordinal(dia), _indice_slot[hora])
+            recusados = set(agenda["recursos"])
+            continue
+        print("Esse horário acabou de ser ocupado. Buscando outro...")
+
+"""
+Gerencia profissionais e salas: cadastra recursos e adiciona horários disponíveis em cada um.
+As alterações são salvas em 'recursos.json'.
+"""
+def gerenciar_recursos() -> None:
+    agenda = obter_agenda_recursos()
+    while True:
+        # os eventos só são registrados depois que a agenda for salva
+        eventos = []
+        limpa_tela()
+        print("=== Gerenciar profissionais e salas ===")
+        recursos = list(agenda["recursos"].values())
+        if not recursos:
+            print("Nenhum profissional ou sala cadastrado.")
+        for i, r in enumerate(recursos, 1):
+            livres = len(agenda["indices"][r["id"]])
+            print(f"{i}. {r['nome']} ({r['tipo']}, {r['especialidade']}) - {livres} horários livres")
+
+        print("\nOpções:")
+        print("1. Cadastrar profissional ou sala")
+        print("2. Adicionar horários a um profissional ou sala")
+        print("0. Voltar")
+        opcao = entrada_valida("Escolha: ", ["0", "1", "2"])
+
+        if opcao == "0":
+            break
+        elif opcao == "1":
+            nome = input("Nome do profissional ou identificação da sala: ").strip()
+            tipo = TIPOS_RECURSO[int(entrada_valida("Tipo:\n1 - Profissional\n2 - Sala\nEscolha: ", ["1", "2"])) - 1]
+            especialidade = input("Especialidade: ").strip()
+            if not nome or not especialidade:
+                print("Nome e especialidade são obrigatórios.")
+                input("\nPressione Enter para continuar...")
+                continue
+            recurso = cria_recurso(agenda, nome, tipo, especialidade)
+            eventos.append(("recurso_cadastrado", recurso))
+            print(f"{recurso['nome']} cadastrado com o código {recurso['id']}.")
+        elif opcao == "2":
+            if not recursos:
+                continue
+            escolha = entrada_valida("Número do profissional ou sala: ", [str(i) for i in range(1, len(recursos) + 1)])
+            rid = recursos[int(escolha) - 1]["id"]
+            dia = pedir_data()
+            if dia is None:
+                continue
+            while True:
+                hora = pedir_horario()
+                if hora is None:
+                    break
+                if adiciona_horario_recurso(agenda, rid, dia, hora):
+                    eventos.append(("horario_adicionado", {"dia": dia, "hora": hora, "recurso": rid}))
+                    print(f"Horário {hora} adicionado em {dia}.")
+                else:
+                    print("Esse horário já existe.")
+                if entrada_valida("Deseja adicionar outro horário?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"]) == "2":
+                    break
+        salva_agenda_recursos(agenda)
+        if eventos:
+            registra_eventos(eventos)
+
+#=======FAQ==================================================================
+"""
+Salva a lista de perguntas e respostas no arquivo JSON.
+
+Args:
+    faq_lista (list[dict]): Lista de perguntas e respostas.
+    arquivo (str, opcional): Caminho do arquivo JSON.
+"""
+def salvar_faq(faq_lista: list[dict], arquivo="faq.json") -> None:
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump({"faq": faq_lista}, f)
+
+"""
+Carrega o FAQ do arquivo JSON.
+Se o arquivo não existir ou estiver corrompido, retorna um dicionário vazio.
+
+Args:
+    arquivo (str, opcional): Caminho do arquivo JSON.
+    silencioso (bool, opcional): Se True, não exibe nenhuma mensagem (os avisos ficam para avisos_carregamento).
+
+Returns:
+    list[dict]: Lista de perguntas e respostas.
+"""
+def carrega_faq(arquivo: str = "faq.json", silencioso: bool = False) -> list[dict]:
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        _avisa_carregamento(f"Arquivo '{arquivo}' não encontrado.", silencioso)
+        return []
+    except json.JSONDecodeError:
+        _avisa_carregamento(f"Arquivo '{arquivo}' corrompido ou inválido.", silencioso)
+        return []
+    else:
+        return dados.get("faq", [])
+    finally:
+        if not silencioso:
+            print(f"Tentativa de leitura de '{arquivo}' finalizada.")
+
+"""
+Adiciona uma nova pergunta e resposta ao FAQ e salva em 'faq.json'.
+
+Args:
+    faq_lista (list[dict]): Lista atual de perguntas e respostas.
+
+Returns:
+    list[dict]: Lista atualizada de perguntas e respostas.
+"""
+def adicionar_pergunta(faq_lista: list[dict]) -> list[dict]:
+    print("=== Adicionar Pergunta ===")
+    while True:
+        pergunta = input("Digite a pergunta: ").strip()
+        if not pergunta:
+            print("A pergunta não pode ser vazia. Tente novamente.")
+            continue
+        if any(item["pergunta"].lower() == pergunta.lower() for item in faq_lista):
+            print("Essa pergunta já existe no FAQ. Digite uma diferente.")
+            continue
+        break
+
+    while True:
+        resposta = input("Digite a resposta: ").strip()
+        if not resposta:
+            print("A resposta não pode ser vazia. Tente novamente.")
+            continue
+        break
+
+    faq_lista.append({"pergunta": pergunta, "resposta": resposta})
+    salvar_faq(faq_lista)
+    registra_evento("faq_adicionada", {"posicao": len(faq_lista) - 1, "pergunta": pergunta, "resposta": resposta})
+    print("Pergunta adicionada com sucesso!")
+    return faq_lista
+
+"""
+Edita uma pergunta ou resposta existente no FAQ e salva em 'faq.json' (só se algo mudou).
+
+Args:
+    faq_lista (list[dict]): Lista de perguntas e respostas.
+
+Returns:
+    list[dict]: Lista atualizada após edição.
+"""
+def editar_pergunta(faq_lista: list[dict]) -> list[dict]:
+    print("=== Editar Pergunta ===")
+    escolhido = navega_paginas(lambda cursor, direcao: pagina_lista(faq_lista, cursor, direcao),
+                               lambda item: item["pergunta"], "Escolha o número da pergunta para editar: ")
+    if not escolhido:
+        return faq_lista
+    item = escolhido[1]
+    print(f"Pergunta atual: {item['pergunta']}")
+    nova_pergunta = input("Digite a nova pergunta (ENTER para manter): ").strip()
+    print(f"Resposta atual: {item['resposta']}")
+    nova_resposta = input("Digite a nova resposta (ENTER para manter): ").strip()
+    if (nova_pergunta or item["pergunta"]) == item["pergunta"] and (nova_resposta or item["resposta"]) == item["resposta"]:
+        print("Nada foi alterado.")
+        return faq_lista
+    if nova_pergunta:
+        item["pergunta"] = nova_pergunta
+    if nova_resposta:
+        item["resposta"] = nova_resposta
+    salvar_faq(faq_lista)
+    registra_evento("faq_editada", {"posicao": escolhido[0], "pergunta": item["pergunta"], "resposta": item["resposta"]})
+    print("Pergunta atualizada.")
+    return faq_lista
+
+"""
+Remove uma pergunta do FAQ e salva em 'faq.json'.
+
+Args:
+    faq_lista (list[dict]): Lista de perguntas e respostas.
+
+Returns:
+    list[dict]: Lista atualizada sem a pergunta removida.
+"""
+def remover_pergunta(faq_lista: list[dict]) -> list[dict]:
+    print("=== Remover Pergunta ===")
+    escolhido = navega_paginas(lambda cursor, direcao: pagina_lista(faq_lista, cursor, direcao),
+                               lambda item: item["pergunta"], "Escolha o número da pergunta para remover: ")
+    if escolhido:
+        item = faq_lista.pop(escolhido[0])
+        salvar_faq(faq_lista)
+        registra_evento("faq_removida", {"posicao": escolhido[0], "pergunta": item["pergunta"]})
+        print(f"Pergunta '{item['pergunta']}' removida.")
+    return faq_lista
+
+#======INTEGRIDADE DOS DADOS===================================================================
+"""
+Verifica a consistência entre pacientes, agendamentos e horários disponíveis.
+Cada coleção é percorrida uma única vez e as junções são feitas com conjuntos/dicionários (hash),
+então o custo é linear no tamanho dos dados.
+
+Problemas verificados:
+    orfaos: agendamentos de CPFs que não estão cadastrados
+    agendamentos_invalidos: agendamentos com data ou horário inválidos
+    duplos: mais de um agendamento ativo no mesmo dia, horário e profissional/sala
+    ocupados_livres: horários agendados que continuam na lista de horários disponíveis
+    horarios_duplicados: horário repetido na lista de um mesmo dia
+    horarios_invalidos: dias ou horários disponíveis inválidos
+    dias_passados: dias disponíveis que já passaram
+
+Args:
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+    agendamentos (list[dict]): Lista de agendamentos.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+    hoje (int | None, opcional): Ordinal do dia atual. Default é hoje.
+
+Returns:
+    dict[str, list]: Problemas encontrados por tipo. Agendamentos são indicados pela posição na lista;
+                     horários por "dd/mm/aaaa hh:mm" e dias por "dd/mm/aaaa".
+"""
+def verifica_integridade(pacientes: list[dict], agendamentos: list[dict], horarios_disponiveis: dict,
+                         hoje: int | None = None) -> dict[str, list]:
+    if hoje is None:
+        hoje = datetime.date.today().toordinal()
+    problemas = {"orfaos": [], "agendamentos_invalidos": [], "duplos": [], "ocupados_livres": [],
+                 "horarios_duplicados": [], "horarios_invalidos": [], "dias_passados": []}
+
+    livres = set()
+    for dia, horas in horarios_disponiveis.items():
+        if not data_valida(dia):
+            problemas["horarios_invalidos"].append(dia)
+            continue
+        if data_para_ordinal(dia) < hoje:
+            problemas["dias_passados"].append(dia)
+        vistos = set()
+        for hora in horas:
+            if not horario_valido(hora):
+                problemas["horarios_invalidos"].append(f"{dia} {hora}")
+            elif hora in vistos:
+                problemas["horarios_duplicados"].append(f"{dia} {hora}")
+            vistos.add(hora)
+            livres.add(f"{dia} {hora}")
+
+    cpfs = {p["cpf"] for p in pacientes}
+    ocupados = {}
+    # muitos agendamentos caem nos mesmos dias: cada data distinta é validada uma só vez
+    datas_validas = {}
+    for i, ag in enumerate(agendamentos):
+        if not agendamento_ativo(ag):
+            continue
+        if ag["cpf"] not in cpfs:
+            problemas["orfaos"].append(i)
+            continue
+        dia, _, hora = ag["data"].partition(" ")
+        if dia not in datas_validas:
+            datas_validas[dia] = data_valida(dia)
+        if not datas_validas[dia] or not horario_valido(hora):
+            problemas["agendamentos_invalidos"].append(i)
+            continue
+        # cada profissional/sala tem sua própria agenda; sem recurso, vale a agenda geral
+        chave = (ag.get("recurso"), ag["data"])
+        if chave in ocupados:
+            problemas["duplos"].append(i)
+            continue
+        ocupados[chave] = i
+        if "recurso" not in ag and ag["data"] in livres:
+            problemas["ocupados_livres"].append(ag["data"])
+    return problemas
+
+"""
+Exibe o resultado de verifica_integridade.
+
+Args:
+    problemas (dict[str, list]): Problemas encontrados por tipo.
+    agendamentos (list[dict]): Lista de agendamentos (para mostrar os agendamentos com problema).
+"""
+def exibe_integridade(problemas: dict[str, list], agendamentos: list[dict]) -> None:
+    descricoes = {
+        "orfaos": "Agendamentos de CPF não cadastrado",
+        "agendamentos_invalidos": "Agendamentos com data/horário inválido",
+        "duplos": "Agendamentos em horário já ocupado",
+        "ocupados_livres": "Horários agendados que ainda aparecem como disponíveis",
+        "horarios_duplicados": "Horários repetidos no mesmo dia",
+        "horarios_invalidos": "Dias/horários disponíveis inválidos",
+        "dias_passados": "Dias disponíveis que já passaram",
+    }
+    print("=== Verificação de Integridade ===")
+    if not any(problemas.values()):
+        print("Nenhum problema encontrado.")
+        return
+    for tipo, itens in problemas.items():
+        if not itens:
+            continue
+        print(f"\n{descricoes[tipo]}: {len(itens)}")
+        for item in itens[:10]:
+            if isinstance(item, int):
+                ag = agendamentos[item]
+                print(f"- {ag['data']} - {ag['nome']} (CPF {ag['cpf']})")
+            else:
+                print(f"- {item}")
+        if len(itens) > 10:
+            print(f"- ... e mais {len(itens) - 10}")
+
+"""
+Corrige os problemas encontrados por verifica_integridade e salva os arquivos alterados.
+Agendamentos órfãos, inválidos ou em horário já ocupado são marcados como cancelados
+(o primeiro agendamento de cada horário é mantido). Horários ocupados, repetidos, inválidos
+e dias que já passaram são retirados dos horários disponíveis.
+
+Args:
+    problemas (dict[str, list]): Problemas encontrados por tipo.
+    agendamentos (list[dict]): Lista de agendamentos.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+
+Returns:
+    int: Quantidade de correções feitas.
+"""
+def repara_integridade(problemas: dict[str, list], agendamentos: list[dict], horarios_disponiveis: dict) -> int:
+    correcoes = 0
+    eventos = []
+    for i in set(problemas["orfaos"] + problemas["agendamentos_invalidos"] + problemas["duplos"]):
+        agendamentos[i]["status"] = "cancelado"
+        eventos.append(("agendamento_cancelado", {**dados_evento_agendamento(agendamentos[i]), "origem": "integridade"}))
+        correcoes += 1
+
+    remover = set(problemas["ocupados_livres"]) | {h for h in problemas["horarios_invalidos"] if " " in h}
+    dias_remover = set(problemas["dias_passados"]) | {h for h in problemas["horarios_invalidos"] if " " not in h}
+    dias_alterados = {h.split(" ")[0] for h in remover} | {h.split(" ")[0] for h in problemas["horarios_duplicados"]}
+    for dia in dias_remover:
+        del horarios_disponiveis[dia]
+        remove_dia_indice(horarios_disponiveis, dia)
+        eventos.append(("dia_removido", {"dia": dia, "origem": "integridade"}))
+        correcoes += 1
+    for dia in dias_alterados - dias_remover:
+        horas = horarios_disponiveis[dia]
+        # mantém a ordem original, sem repetições e sem os horários a remover
+        novas = [h for h in dict.fromkeys(horas) if f"{dia} {h}" not in remover]
+        eventos += [("horario_removido", {"dia": dia, "hora": h, "origem": "integridade"})
+                    for h in dict.fromkeys(horas) if h not in novas]
+        correcoes += len(horas) - len(novas)
+        horarios_disponiveis[dia] = novas
+
+    if correcoes:
+        salva_dados("agendamentos.json", "agendamentos", agendamentos)
+        salva_horarios(horarios_disponiveis)
+        registra_eventos(eventos)
+    return correcoes
+
+"""
+Verifica a integridade dos dados, exibe os problemas e pergunta se devem ser corrigidos.
+
+Args:
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+    agendamentos (list[dict]): Lista de agendamentos.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+"""
+def menu_integridade(pacientes: list[dict], agendamentos: list[dict], horarios_disponiveis: dict) -> None:
+    problemas = verifica_integridade(pacientes, agendamentos, horarios_disponiveis)
+    exibe_integridade(problemas, agendamentos)
+    if any(problemas.values()):
+        opcao = entrada_valida("\nDeseja corrigir os problemas?\n1 - Sim\n2 - Não\nEscolha: ", ["1", "2"])
+        if opcao == "1":
+            correcoes = repara_integridade(problemas, agendamentos, horarios_disponiveis)
+            print(f"{correcoes} correções feitas.")
+
+#======RELATÓRIOS===================================================================
+# horários em ordem cronológica; a posição de cada horário é o "índice do slot" usado nas colunas
+SLOTS = sorted(horarios_validos)
+_indice_slot = {h: i for i, h in enumerate(SLOTS)}
+# "cancelado" tem código 0 para que a própria coluna de status sirva de filtro de consultas ativas
+STATUS_AGENDAMENTO = ["cancelado", "agendado", "confirmado"]
+_codigo_status = {s: i for i, s in enumerate(STATUS_AGENDAMENTO)}
+DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+"""
+Converte uma data "dd/mm/aaaa" no número ordinal do dia (dias desde 01/01/0001).
+
+Args:
+    data (str): Data no formato "dd/mm/aaaa".
+
+Returns:
+    int | None: Número ordinal do dia ou None se a data for inválida.
+"""
+def data_para_ordinal(data: str) -> int | None:
+    try:
+        return datetime.date(int(data[6:10]), int(data[3:5]), int(data[:2])).toordinal()
+    except ValueError:
+        return None
+
+"""
+Converte o número ordinal de um dia de volta para "dd/mm/aaaa".
+
+Args:
+    ordinal (int): Número ordinal do dia.
+
+Returns:
+    str: Data no formato "dd/mm/aaaa".
+"""
+def ordinal_para_data(ordinal: int) -> str:
+    return datetime.date.fromordinal(ordinal).strftime("%d/%m/%Y")
+
+"""
+Verifica se um texto é um ano aceito pelo relatório (1 a 9999, o intervalo das datas do Python).
+
+Args:
+    texto (str): Ano digitado.
+
+Returns:
+    bool: True se válido, False caso contrário.
+"""
+def ano_valido(texto: str) -> bool:
+    return texto.isdigit() and 1 <= int(texto) <= 9999
+
+"""
+Carrega agendamentos e horários disponíveis em colunas (arrays de inteiros), uma por campo.
+Datas viram números ordinais, horários viram índices de SLOTS, CPFs e status viram códigos.
+Nenhum laço em Python passa por todos os agendamentos: os campos são extraídos com map/itemgetter (laços em C)
+e só os valores distintos (poucas datas, horários e status) são convertidos em Python.
+Registros com data ou horário inválidos ficam com -1 nessas colunas e são ignorados pelo relatório.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+    incluir_cpf (bool, opcional): Se True, monta também as colunas de CPF (o relatório não usa; é a parte mais cara
+        com muitos pacientes distintos). Default é False.
+    horarios_recursos (list[dict] | None, opcional): Horários disponíveis de cada profissional/sala ({dia: [horas]}),
+        somados aos horários livres. Default é None.
+
+Returns:
+    dict: Colunas 'dia', 'slot', 'status' e 'antecedencia' (dias entre a marcação e a consulta,
+          negativa se desconhecida) dos agendamentos, 'livre_dia' e 'livre_slot' dos horários livres e,
+          com incluir_cpf, 'cpf' e 'cpfs' (CPF de cada linha; o código da coluna 'cpf' é a primeira linha do paciente).
+"""
+def carrega_colunas(agendamentos: list[dict], horarios_disponiveis: dict, incluir_cpf: bool = False,
+                    horarios_recursos: list[dict] | None = None) -> dict:
+    datas = list(map(itemgetter("data"), agendamentos))
+    marcacoes = list(map(itemgetter(slice(0, 10)), map(methodcaller("get", "agendado_em", ""), agendamentos)))
+    status = map(methodcaller("get", "status", "agendado"), agendamentos)
+
+    # conversões feitas uma vez por valor distinto (data e hora, dia da marcação, status)
+    dias, slots = {}, {}
+    for data in set(datas):
+        dia = data_para_ordinal(data[:10])
+        slot = _indice_slot.get(data[11:])
+        dias[data] = -1 if dia is None or slot is None else dia
+        slots[data] = -1 if slot is None else slot
+    # marcação desconhecida: um ordinal enorme deixa a antecedência negativa, e ela é ignorada no relatório
+    ordinais_marcacao = {d: data_para_ordinal(d) or 10 ** 9 for d in set(marcacoes)}
+
+    coluna_dia = array("l", map(dias.__getitem__, datas))
+    colunas = {
+        "dia": coluna_dia,
+        "slot": array("b", map(slots.__getitem__, datas)),
+        # status desconhecido conta como "agendado"
+        "status": array("b", map(_codigo_status.get, status, itertools.repeat(1))),
+        "antecedencia": array("l", map(sub, coluna_dia, map(ordinais_marcacao.__getitem__, marcacoes))),
+        "livre_dia": array("l"), "livre_slot": array("b"),
+    }
+    if incluir_cpf:
+        # código do CPF = posição da primeira linha com esse CPF (a lista 'cpfs' decodifica o código)
+        colunas["cpfs"] = list(map(itemgetter("cpf"), agendamentos))
+        codigos_cpf = {}
+        colunas["cpf"] = array("l", map(codigos_cpf.setdefault, colunas["cpfs"], range(len(agendamentos))))
+
+    # cada profissional/sala tem sua agenda: um mesmo dia e horário pode estar livre em vários deles
+    for horarios in [horarios_disponiveis, *(horarios_recursos or [])]:
+        for data, horas_livres in horarios.items():
+            dia = data_para_ordinal(data)
+            if dia is None:
+                continue
+            livres = [_indice_slot[h] for h in horas_livres if h in _indice_slot]
+            colunas["livre_dia"].extend([dia] * len(livres))
+            colunas["livre_slot"].extend(livres)
+    return colunas
+
+"""
+Agrega as colunas no intervalo de dias [inicio, fim): quantidade de agendamentos por (dia, slot, status),
+de horários livres por dia e de agendamentos por antecedência (só os que registram a marcação).
+Com numpy, as colunas são lidas direto dos arrays (sem cópia) e agregadas com máscaras e np.unique;
+sem numpy, com Counter sobre zip (laço em C, mas ainda um objeto Python por linha).
+
+Args:
+    colunas (dict): Colunas criadas por carrega_colunas.
+    inicio (int): Primeiro dia (ordinal) considerado.
+    fim (int): Dia (ordinal) seguinte ao último considerado.
+
+Returns:
+    tuple[dict, dict, dict]: Contagens por (dia, slot, status), horários livres por dia e agendamentos por antecedência.
+"""
+def _agrega_colunas(colunas: dict, inicio: int, fim: int) -> tuple[dict, dict, dict]:
+    if np is None:
+        combinacoes = Counter()
+        for (dia, slot, status), n in Counter(zip(colunas["dia"], colunas["slot"], colunas["status"])).items():
+            if inicio <= dia < fim:
+                combinacoes[dia, slot, status] = n
+        livres_dia = Counter(d for d in colunas["livre_dia"] if inicio <= d < fim)
+        antecedencias = Counter()
+        for (dia, antecedencia), n in Counter(zip(colunas["dia"], colunas["antecedencia"])).items():
+            if antecedencia >= 0 and inicio <= dia < fim:
+                antecedencias[antecedencia] += n
+        return combinacoes, livres_dia, antecedencias
+
+    def conta(valores) -> dict:
+        distintos, contagens = np.unique(valores, return_counts=True)
+        return dict(zip(distintos.tolist(), contagens.tolist()))
+
+    dia = np.asarray(colunas["dia"])
+    no_periodo = (dia >= inicio) & (dia < fim)
+    # (dia, slot, status) vira um único inteiro; slot e status são pequenos e não negativos dentro do período
+    largura = len(SLOTS) * len(STATUS_AGENDAMENTO)
+    chaves = (dia[no_periodo] - inicio) * largura + np.asarray(colunas["slot"])[no_periodo] * len(STATUS_AGENDAMENTO)
+    chaves += np.asarray(colunas["status"])[no_periodo]
+    combinacoes = {}
+    for chave, n in conta(chaves).items():
+        dia_chave, resto = divmod(chave, largura)
+        combinacoes[inicio + dia_chave, resto // len(STATUS_AGENDAMENTO), resto % len(STATUS_AGENDAMENTO)] = n
+    livre_dia = np.asarray(colunas["livre_dia"])
+    livres_dia = conta(livre_dia[(livre_dia >= inicio) & (livre_dia < fim)])
+    antecedencia = np.asarray(colunas["antecedencia"])
+    antecedencias = conta(antecedencia[no_periodo & (antecedencia >= 0)])
+    return combinacoes, livres_dia, antecedencias
+
+"""
+Calcula os indicadores de ocupação e comparecimento a partir das colunas.
+As colunas são agregadas de uma vez por _agrega_colunas e só as combinações distintas de
+(dia, slot, status) são percorridas em Python, por isso o custo quase não depende da
+quantidade de agendamentos.
+
+Args:
+    colunas (dict): Colunas criadas por carrega_colunas.
+    ano (int | None, opcional): Considera apenas consultas e horários deste ano. Default é None (todos).
+    hoje (int | None, opcional): Ordinal do dia atual, usado para separar consultas passadas. Default é hoje.
+
+Returns:
+    dict: Relatório com ocupação por dia e por dia da semana, taxas de cancelamento e de
+          consultas passadas sem confirmação, antecedência média/mediana e mapa de horários de pico.
+"""
+def calcula_relatorio(colunas: dict, ano: int | None = None, hoje: int | None = None) -> dict:
+    if hoje is None:
+        hoje = datetime.date.today().toordinal()
+    if ano is None:
+        # o dia seguinte a 31/12/9999, a última data do Python
+        inicio, fim = 0, datetime.date.max.toordinal() + 1
+    else:
+        inicio = datetime.date(ano, 1, 1).toordinal()
+        fim = datetime.date(ano, 12, 31).toordinal() + 1
+    cancelado = STATUS_AGENDAMENTO.index("cancelado")
+    agendado = STATUS_AGENDAMENTO.index("agendado")
+
+    combinacoes, livres_dia, antecedencias = _agrega_colunas(colunas, inicio, fim)
+
+    total = cancelados = passados = sem_confirmacao = 0
+    ocupados_dia = Counter()
+    pico = [[0] * len(SLOTS) for _ in DIAS_SEMANA]
+    for (dia, slot, status), n in combinacoes.items():
+        total += n
+        if status == cancelado:
+            cancelados += n
+            continue
+        ocupados_dia[dia] += n
+        pico[datetime.date.fromordinal(dia).weekday()][slot] += n
+        # consultas passadas que nunca foram confirmadas (possíveis faltas)
+        if dia < hoje:
+            passados += n
+            if status == agendado:
+                sem_confirmacao += n
+
+    # ocupação: consultas ativas / (consultas ativas + horários livres)
+    ocupacao_dia = {}
+    ocupados_semana, capacidade_semana = Counter(), Counter()
+    for dia in ocupados_dia.keys() | livres_dia.keys():
+        capacidade = ocupados_dia[dia] + livres_dia.get(dia, 0)
+        ocupacao_dia[dia] = ocupados_dia[dia] / capacidade
+        semana = datetime.date.fromordinal(dia).weekday()
+        ocupados_semana[semana] += ocupados_dia[dia]
+        capacidade_semana[semana] += capacidade
+    ocupacao_semana = {s: ocupados_semana[s] / capacidade_semana[s] for s in capacidade_semana}
+
+    # antecedência entre a marcação e a consulta (só para agendamentos que registram a data de marcação)
+    com_antecedencia = sum(antecedencias.values())
+    media = sum(a * n for a, n in antecedencias.items()) / com_antecedencia if com_antecedencia else None
+    mediana = None
+    acumulado = 0
+    for a in sorted(antecedencias):
+        acumulado += antecedencias[a]
+        if acumulado * 2 >= com_antecedencia:
+            mediana = a
+            break
+
+    return {
+        "total": total,
+        "cancelados": cancelados,
+        "taxa_cancelamento": cancelados / total if total else 0.0,
+        "passados": passados,
+        "sem_confirmacao": sem_confirmacao,
+        "taxa_sem_confirmacao": sem_confirmacao / passados if passados else 0.0,
+        "ocupacao_dia": dict(sorted(ocupacao_dia.items())),
+        "ocupacao_semana": dict(sorted(ocupacao_semana.items())),
+        "antecedencia_media": media,
+        "antecedencia_mediana": mediana,
+        "pico": pico,
+    }
+
+"""
+Exibe um relatório calculado por calcula_relatorio.
+
+Args:
+    relatorio (dict): Relatório de ocupação e comparecimento.
+"""
+def exibe_relatorio(relatorio: dict) -> None:
+    print("=== Relatório de Ocupação ===")
+    print(f"Agendamentos: {relatorio['total']}")
+    print(f"Cancelamentos: {relatorio['cancelados']} ({relatorio['taxa_cancelamento']:.1%})")
+    print(f"Consultas passadas sem confirmação: {relatorio['sem_confirmacao']} de {relatorio['passados']} "
+          f"({relatorio['taxa_sem_confirmacao']:.1%})")
+    if relatorio["antecedencia_media"] is not None:
+        print(f"Antecedência da marcação: média {relatorio['antecedencia_media']:.1f} dias, "
+              f"mediana {relatorio['antecedencia_mediana']} dias")
+
+    print("\nOcupação por dia da semana:")
+    for semana, taxa in relatorio["ocupacao_semana"].items():
+        print(f"{DIAS_SEMANA[semana]}: {taxa:.1%}")
+
+    print("\nOcupação por dia:")
+    for dia, taxa in relatorio["ocupacao_dia"].items():
+        print(f"{ordinal_para_data(dia)}: {taxa:.1%}")
+
+    print("\nHorários de pico (consultas por dia da semana):")
+    print("       " + " ".join(DIAS_SEMANA))
+    for slot, hora in enumerate(SLOTS):
+        linha = " ".join(f"{relatorio['pico'][semana][slot]:>3}" for semana in range(len(DIAS_SEMANA)))
+        print(f"{hora}  {linha}")
+
+"""
+Gera e exibe o relatório de ocupação, opcionalmente restrito a um ano.
+Os agendamentos com profissional/sala contam como ocupados, e os horários livres desses recursos
+entram na capacidade junto com os horários disponíveis gerais.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+    ano (int | None, opcional): Ano do relatório. Default é None (todo o histórico).
+"""
+def relatorio_ocupacao(agendamentos: list[dict], horarios_disponiveis: dict, ano: int | None = None) -> None:
+    horarios_recursos = list(obter_agenda_recursos()["horarios"].values())
+    colunas = carrega_colunas(agendamentos, horarios_disponiveis, horarios_recursos=horarios_recursos)
+    exibe_relatorio(calcula_relatorio(colunas, ano))
+
+#======EXPORTAÇÃO===================================================================
+# quantidade de registros processados por vez na exportação (limita o uso de memória)
+TAMANHO_LOTE_EXPORTACAO = 50000
+# typecode de array de tamanho fixo para cada tamanho de inteiro, em bytes (usado na leitura dos lotes)
+_typecode_inteiro = {1: "b", 2: "h", 4: "i", 8: "q"}
+
+"""
+Converte uma data e hora "dd/mm/aaaa hh:mm" em minutos desde 01/01/0001.
+
+Args:
+    data_hora (str): Data e hora no formato "dd/mm/aaaa hh:mm".
+
+Returns:
+    int: Minutos desde 01/01/0001 ou -1 se a data/hora for inválida.
+"""
+def data_hora_para_minutos(data_hora: str) -> int:
+    dia = data_para_ordinal(data_hora[:10])
+    hora = data_hora[11:]
+    if dia is None or len(hora) != 5 or not (hora[:2].isdigit() and hora[3:].isdigit()):
+        return -1
+    return dia * 1440 + int(hora[:2]) * 60 + int(hora[3:])
+
+"""
+Codifica uma coluna de textos como dicionário: cada texto distinto aparece uma vez
+e a coluna passa a guardar apenas a posição do texto no dicionário.
+
+Args:
+    valores (list[str]): Coluna de textos.
+
+Returns:
+    tuple:
+        array: Códigos de cada linha.
+        list[str]: Dicionário com os textos distintos.
+"""
+def codifica_dicionario(valores: list[str]) -> tuple[array, list[str]]:
+    codigos = {}
+    coluna = array("i", (codigos.setdefault(v, len(codigos)) for v in valores))
+    return coluna, list(codigos)
+
+"""
+Grava um lote de colunas em um arquivo ZIP compactado, um membro por coluna.
+Colunas numéricas (array) são gravadas em binário com o typecode como extensão (ex.: "dia.i"); só são usados
+typecodes de tamanho fixo ("b", "i", "q"), nunca "l", cujo tamanho muda de uma plataforma para outra.
+Colunas de texto são codificadas como dicionário ("cpf.i" com os códigos e "cpf.json" com os textos).
+
+Args:
+    arquivo (str): Caminho do arquivo ZIP a ser criado.
+    colunas (dict): Mapa nome da coluna -> array ou list[str].
+"""
+def grava_lote_colunar(arquivo: str, colunas: dict) -> None:
+    linhas = 0
+    with zipfile.ZipFile(arquivo, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for nome, valores in colunas.items():
+            if not isinstance(valores, array):
+                valores, dicionario = codifica_dicionario(valores)
+                z.writestr(f"{nome}.json", json.dumps(dicionario))
+            z.writestr(f"{nome}.{valores.typecode}", valores.tobytes())
+            linhas = len(valores)
+        z.writestr("manifesto.json", json.dumps({"linhas": linhas, "ordem_bytes": sys.byteorder,
+                                                 "colunas": list(colunas)}))
+
+"""
+Lê um arquivo ZIP gravado por grava_lote_colunar.
+O tipo de cada coluna é escolhido pelo tamanho em bytes de cada valor (bytes do membro / linhas do manifesto),
+então lotes antigos gravados com "l" em outra plataforma também são lidos corretamente.
+
+Args:
+    arquivo (str): Caminho do arquivo ZIP.
+
+Returns:
+    dict: Mapa nome da coluna -> array (colunas numéricas) ou list[str] (colunas de texto).
+"""
+def le_lote_colunar(arquivo: str) -> dict:
+    colunas = {}
+    with zipfile.ZipFile(arquivo) as z:
+        manifesto = json.loads(z.read("manifesto.json"))
+        membros = {os.path.splitext(m)[0]: m for m in z.namelist() if not m.endswith(".json")}
+        for nome in manifesto["colunas"]:
+            membro = membros[nome]
+            dados = z.read(membro)
+            typecode = membro.rsplit(".", 1)[1]
+            if manifesto["linhas"]:
+                typecode = _typecode_inteiro[len(dados) // manifesto["linhas"]]
+            valores = array(typecode)
+            valores.frombytes(dados)
+            if manifesto["ordem_bytes"] != sys.byteorder:
+                valores.byteswap()
+            if f"{nome}.json" in z.namelist():
+                dicionario = json.loads(z.read(f"{nome}.json"))
+                valores = [dicionario[c] for c in valores]
+            colunas[nome] = valores
+    return colunas
+
+"""
+Monta as colunas de um lote de pacientes.
+
+Args:
+    lote (list[dict]): Pacientes do lote.
+
+Returns:
+    dict: Colunas 'nome', 'cpf', 'telefone' e 'telefone_e164'.
+"""
+def _colunas_pacientes(lote: list[dict]) -> dict:
+    return {
+        "nome": [p["nome"] for p in lote],
+        "cpf": [p["cpf"] for p in lote],
+        "telefone": [p.get("telefone", "") for p in lote],
+        "telefone_e164": [p.get("telefone_e164") or "" for p in lote],
+    }
+
+"""
+Monta as colunas de um lote de agendamentos. Datas e horários inválidos viram -1.
+
+Args:
+    lote (list[dict]): Agendamentos do lote.
+
+Returns:
+    dict: Colunas 'cpf', 'nome', 'dia', 'slot', 'status' e 'agendado_em' (minutos, -1 se desconhecido).
+"""
+def _colunas_agendamentos(lote: list[dict]) -> dict:
+    codigos_status = {s: i for i, s in enumerate(STATUS_AGENDAMENTO)}
+    dias = [data_para_ordinal(ag["data"][:10]) for ag in lote]
+    return {
+        "cpf": [ag["cpf"] for ag in lote],
+        "nome": [ag["nome"] for ag in lote],
+        "dia": array("i", (-1 if d is None else d for d in dias)),
+        "slot": array("b", (_indice_slot.get(ag["data"][11:], -1) for ag in lote)),
+        "status": array("b", (codigos_status.get(ag.get("status", "agendado"), 1) for ag in lote)),
+        "agendado_em": array("q", (data_hora_para_minutos(ag["agendado_em"]) if "agendado_em" in ag else -1
+                                   for ag in lote)),
+    }
+
+"""
+Acrescenta linhas a um arquivo CSV, escrevendo o cabeçalho se o arquivo ainda não existir.
+
+Args:
+    arquivo (str): Caminho do arquivo CSV.
+    campos (list[str]): Nomes das colunas.
+    linhas (list[dict]): Registros a gravar (chaves extras são ignoradas).
+"""
+def _acrescenta_csv(arquivo: str, campos: list[str], linhas: list[dict]) -> None:
+    novo = not os.path.exists(arquivo)
+    with open(arquivo, "a", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=campos, extrasaction="ignore")
+        if novo:
+            escritor.writeheader()
+        escritor.writerows(linhas)
+
+"""
+Verifica se um arquivo foi gravado pela exportação (e pode ser apagado numa exportação completa).
+
+Args:
+    arquivo (str): Nome do arquivo, sem a pasta.
+
+Returns:
+    bool: True para "pacientes_NNNNN.zip", "agendamentos_NNNNN.zip", "pacientes.csv", "agendamentos.csv",
+          "horarios.zip", "horarios.csv" e "estado.json".
+"""
+def arquivo_exportado(arquivo: str) -> bool:
+    if arquivo in ("pacientes.csv", "agendamentos.csv", "horarios.zip", "horarios.csv", "estado.json"):
+        return True
+    for nome in ("pacientes", "agendamentos"):
+        numero = arquivo[len(nome) + 1:-len(".zip")]
+        if arquivo.startswith(f"{nome}_") and arquivo.endswith(".zip") and numero.isdigit() and len(numero) == 5:
+            return True
+    return False
+
+"""
+Exporta pacientes, agendamentos e horários disponíveis para arquivos colunares compactados (.zip,
+um membro binário por coluna) e CSV. Os registros são processados em lotes de TAMANHO_LOTE_EXPORTACAO.
+
+No modo incremental, apenas pacientes e agendamentos acrescentados desde a última exportação são
+gravados (em novos lotes). Mudanças de status em agendamentos já exportados só aparecem numa
+exportação completa. Se a exportação anterior tiver mais registros que as listas atuais (dados trocados
+ou apagados), ela não serve de base e é refeita por completo. Os horários disponíveis são sempre exportados por inteiro.
+
+Args:
+    pacientes (list[dict]): Lista de pacientes cadastrados.
+    agendamentos (list[dict]): Lista de agendamentos.
+    horarios_disponiveis (dict): Dicionário de horários disponíveis por dia.
+    pasta (str, opcional): Pasta de destino. Default é 'exportacao'.
+    incremental (bool, opcional): Exporta só os registros novos. Default é True.
+
+Returns:
+    dict: Quantidade de registros exportados por coleção nesta execução.
+"""
+def exporta_dados(pacientes: list[dict], agendamentos: list[dict], horarios_disponiveis: dict,
+                  pasta: str = "exportacao", incremental: bool = True) -> dict:
+    arquivo_estado = os.path.join(pasta, "estado.json")
+    estado = None
+    if incremental and os.path.exists(arquivo_estado):
+        with open(arquivo_estado, "r", encoding="utf-8") as f:
+            estado = json.load(f)
+        if estado["pacientes"] > len(pacientes) or estado["agendamentos"] > len(agendamentos):
+            estado = None
+    if estado is None:
+        estado = {"pacientes": 0, "agendamentos": 0, "lotes": 0}
+        # exportação completa: apaga apenas os arquivos que o próprio exportador grava
+        # (lotes "<colecao>_NNNNN.zip", CSVs, horarios.zip e estado.json); os .json de dados nunca são tocados
+        if os.path.isdir(pasta):
+            for arquivo in os.listdir(pasta):
+                if arquivo_exportado(arquivo):
+                    os.remove(os.path.join(pasta, arquivo))
+    os.makedirs(pasta, exist_ok=True)
+
+    colecoes = [
+        ("pacientes", pacientes, _colunas_pacientes, ["nome", "cpf", "telefone", "telefone_e164"]),
+        ("agendamentos", agendamentos, _colunas_agendamentos, ["cpf", "nome", "data", "status", "agendado_em"]),
+    ]
+    exportados = {}
+    for nome, registros, monta_colunas, campos_csv in colecoes:
+        inicio = estado[nome]
+        for pos in range(inicio, len(registros), TAMANHO_LOTE_EXPORTACAO):
+            lote = registros[pos:pos + TAMANHO_LOTE_EXPORTACAO]
+            grava_lote_colunar(os.path.join(pasta, f"{nome}_{estado['lotes']:05d}.zip"), monta_colunas(lote))
+            _acrescenta_csv(os.path.join(pasta, f"{nome}.csv"), campos_csv, lote)
+            estado["lotes"] += 1
+        exportados[nome] = len(registros) - inicio
+        estado[nome] = len(registros)
+
+    # horários disponíveis: foto completa a cada exportação
+    dias, slots, linhas = array("i"), array("b"), []
+    for data, horas in horarios_disponiveis.items():
+        for hora in horas:
+            dias.append(data_para_ordinal(data) or -1)
+            slots.append(_indice_slot.get(hora, -1))
+            linhas.append({"dia": data, "hora": hora})
+    grava_lote_colunar(os.path.join(pasta, "horarios.zip"), {"dia": dias, "slot": slots})
+    if os.path.exists(os.path.join(pasta, "horarios.csv")):
+        os.remove(os.path.join(pasta, "horarios.csv"))
+    _acrescenta_csv(os.path.join(pasta, "horarios.csv"), ["dia", "hora"], linhas)
+    exportados["horarios"] = len(linhas)
+
+    with open(arquivo_estado, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    return exportados
+
+"""
+Lê todos os lotes exportados de uma coleção e junta as colunas.
+
+Args:
+    colecao (str): 'pacientes', 'agendamentos' ou 'horarios'.
+    pasta (str, opcional): Pasta da exportação. Default é 'exportacao'.
+
+Returns:
+    dict: Mapa nome da coluna -> array ou list[str] com todas as linhas exportadas.
+"""
+def le_exportacao(colecao: str, pasta: str = "exportacao") -> dict:
+    if colecao == "horarios":
+        arquivos = ["horarios.zip"]
+    else:
+        arquivos = sorted(a for a in os.listdir(pasta) if a.startswith(f"{colecao}_") and a.endswith(".zip"))
+    colunas = {}
+    for arquivo in arquivos:
+        for nome, valores in le_lote_colunar(os.path.join(pasta, arquivo)).items():
+            if nome in colunas:
+                colunas[nome].extend(valores)
+            else:
+                colunas[nome] = valores
+    return colunas
+
+#======CALENDÁRIOS (ICS)===================================================================
+PASTA_CALENDARIOS = "calendarios"
+# duração de cada consulta, em minutos (um slot de horário)
+DURACAO_CONSULTA = 30
+# quantos calendários cada processo gera por vez na reconstrução completa
+TAMANHO_LOTE_CALENDARIOS = 200
+# muda sempre que o conteúdo gerado para os mesmos agendamentos mudar, para que os calendários sejam refeitos
+VERSAO_CALENDARIOS = 2
+_status_ics = {"agendado": "TENTATIVE", "confirmado": "CONFIRMED", "cancelado": "CANCELLED"}
+# o horário de Brasília não tem mais horário de verão, então um único bloco de fuso basta
+_fuso_ics = ["BEGIN:VTIMEZONE", "TZID:America/Sao_Paulo", "BEGIN:STANDARD", "DTSTART:19700101T000000",
+             "TZOFFSETFROM:-0300", "TZOFFSETTO:-0300", "TZNAME:-03", "END:STANDARD", "END:VTIMEZONE"]
+
+"""
+Escapa um texto para ser usado como valor em um arquivo iCalendar.
+
+Args:
+    texto (str): Texto original.
+
+Returns:
+    str: Texto com barras, vírgulas, ponto e vírgulas e quebras de linha escapados.
+"""
+def _escapa_ics(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+"""
+Quebra uma linha do iCalendar em pedaços de no máximo 75 bytes, como exige o formato.
+As linhas de continuação começam com um espaço, e nenhum caractere acentuado é cortado no meio.
+
+Args:
+    linha (str): Linha completa.
+
+Returns:
+    str: Linha dobrada, terminada em CRLF.
+"""
+def _dobra_linha_ics(linha: str) -> str:
+    dados = linha.encode("utf-8")
+    if len(dados) <= 75:
+        return linha + "\r\n"
+    partes, inicio, limite = [], 0, 75
+    while inicio < len(dados):
+        fim = min(inicio + limite, len(dados))
+        while fim < len(dados) and dados[fim] & 0xC0 == 0x80:
+            fim -= 1
+        partes.append(dados[inicio:fim].decode("utf-8"))
+        inicio, limite = fim, 74
+    return "\r\n ".join(partes) + "\r\n"
+
+"""
+Converte a data de um agendamento ("dd/mm/aaaa hh:mm") para o formato de data e hora do iCalendar.
+
+Args:
+    data (str): Data e hora do agendamento.
+    minutos (int, opcional): Minutos a somar (usado para o fim da consulta). Default é 0.
+
+Returns:
+    str | None: Data no formato "aaaammddThhmmss" ou None se a data for inválida.
+"""
+def _data_hora_ics(data: str, minutos: int = 0) -> str | None:
+    # montagem direta em vez de strptime, que é bem mais lento e pesa na geração de muitos calendários
+    if len(data) != 16 or data[2] != "/" or data[5] != "/" or data[13] != ":":
+        return None
+    try:
+        momento = datetime.datetime(int(data[6:10]), int(data[3:5]), int(data[:2]), int(data[11:13]), int(data[14:]))
+    except ValueError:
+        return None
+    if minutos:
+        momento += datetime.timedelta(minutes=minutos)
+    return f"{momento.year:04d}{momento.month:02d}{momento.day:02d}T{momento.hour:02d}{momento.minute:02d}00"
+
+"""
+Chave usada para ordenar os agendamentos de um calendário em ordem cronológica.
+
+Args:
+    agendamento (dict): Agendamento.
+
+Returns:
+    tuple: (dia ordinal, hora).
+"""
+def _chave_cronologica(agendamento: dict) -> tuple[int, str]:
+    return data_para_ordinal(agendamento["data"][:10]) or 0, agendamento["data"][11:]
+
+"""
+Nome do calendário diário (administração) ao qual um agendamento pertence.
+
+Args:
+    agendamento (dict): Agendamento.
+
+Returns:
+    str: Dia no formato "aaaa-mm-dd" (ordena corretamente como nome de arquivo).
+"""
+def _dia_calendario(agendamento: dict) -> str:
+    data = agendamento["data"]
+    return f"{data[6:10]}-{data[3:5]}-{data[:2]}"
+
+"""
+Gera, linha a linha, um arquivo iCalendar com os agendamentos recebidos.
+Agendamentos cancelados entram com STATUS:CANCELLED, para que os aplicativos de agenda removam a consulta.
+O UID de cada evento inclui o momento em que a consulta foi marcada, então um horário cancelado e depois
+remarcado gera dois eventos distintos; se ainda assim dois agendamentos tiverem o mesmo UID (marcados no
+mesmo minuto), só o mais recente entra no arquivo.
+
+Args:
+    titulo (str): Nome do calendário.
+    agendamentos (list[dict]): Agendamentos do calendário.
+    administrativo (bool, opcional): Se True, o título de cada evento mostra o paciente (calendário do dia). Default é False.
+
+Yields:
+    str: Linhas do arquivo, já dobradas e terminadas em CRLF.
+"""
+def linhas_calendario_ics(titulo: str, agendamentos: list[dict], administrativo: bool = False):
+    cabecalho = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//IMREA HC//Agendamentos//PT-BR",
+                 "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{_escapa_ics(titulo)}"] + _fuso_ics
+    for linha in cabecalho:
+        yield _dobra_linha_ics(linha)
+    eventos = {}
+    for ag in agendamentos:
+        inicio = _data_hora_ics(ag["data"])
+        if inicio is None:
+            continue
+        marcado = "".join(c for c in ag.get("agendado_em", "") if c.isdigit()) or "0"
+        # a lista está na ordem em que os agendamentos foram feitos: o último com o mesmo UID prevalece
+        eventos[f"{ag['cpf']}-{inicio}-{ag.get('recurso', 'geral')}-{marcado}@imrea"] = (ag, inicio)
+    for uid, (ag, inicio) in sorted(eventos.items(), key=lambda item: _chave_cronologica(item[1][0])):
+        resumo = f"{ag['nome']} ({ag['cpf']})" if administrativo else "Consulta IMREA HC"
+        if "recurso" in ag:
+            resumo += f" - {ag['recurso']}"
+        # a data em que a consulta foi marcada mantém o arquivo idêntico enquanto nada mudar (em UTC: Brasília + 3 horas)
+        carimbo = _data_hora_ics(ag.get("agendado_em", ag["data"]), 180) or _data_hora_ics(ag["data"], 180)
+        evento = ["BEGIN:VEVENT",
+                  f"UID:{uid}",
+                  f"DTSTAMP:{carimbo}Z",
+                  f"DTSTART;TZID=America/Sao_Paulo:{inicio}",
+                  f"DTEND;TZID=America/Sao_Paulo:{_data_hora_ics(ag['data'], DURACAO_CONSULTA)}",
+                  f"SUMMARY:{_escapa_ics(resumo)}",
+                  f"STATUS:{_status_ics.get(ag.get('status', 'agendado'), 'TENTATIVE')}",
+                  "END:VEVENT"]
+        for linha in evento:
+            yield _dobra_linha_ics(linha)
+    yield "END:VCALENDAR\r\n"
+
+"""
+Calcula uma impressão digital dos agendamentos de um calendário.
+Se a impressão não mudou desde a última geração, o arquivo .ics não precisa ser refeito.
+
+Args:
+    agendamentos (list[dict]): Agendamentos do calendário.
+
+Returns:
+    str: Resumo (hash) dos campos que aparecem no calendário.
+"""
+def impressao_calendario(agendamentos: list[dict]) -> str:
+    # a ordem dos campos não importa, só que seja sempre a mesma: ordenar os textos é mais rápido que converter as datas
+    registros = sorted("\x1f".join((ag["data"], ag["cpf"], ag["nome"], ag.get("status", "agendado"),
+                                     ag.get("recurso", ""), ag.get("agendado_em", ""))) for ag in agendamentos)
+    registros.append(str(VERSAO_CALENDARIOS))
+    return hashlib.blake2b("\x1e".join(registros).encode("utf-8"), digest_size=16).hexdigest()
+
+"""
+Monta o caminho do arquivo .ics de um paciente ou de um dia.
+
+Args:
+    pasta (str): Pasta dos calendários.
+    tipo (str): "pacientes" ou "dias".
+    chave (str): CPF do paciente ou dia ("aaaa-mm-dd").
+
+Returns:
+    str: Caminho do arquivo.
+"""
+def caminho_calendario(pasta: str, tipo: str, chave: str) -> str:
+    nome = "".join(c for c in chave if c.isalnum() or c == "-")
+    return os.path.join(pasta, tipo, f"{nome}.ics")
+
+"""
+Grava o calendário de um paciente ou de um dia, escrevendo as linhas conforme são geradas.
+O arquivo é escrito em um temporário e depois trocado, para que um aplicativo de agenda nunca leia um arquivo pela metade.
+
+Args:
+    pasta (str): Pasta dos calendários.
+    tipo (str): "pacientes" ou "dias".
+    chave (str): CPF do paciente ou dia ("aaaa-mm-dd").
+    agendamentos (list[dict]): Agendamentos do calendário.
+
+Returns:
+    str: Caminho do arquivo gravado.
+"""
+def grava_calendario(pasta: str, tipo: str, chave: str, agendamentos: list[dict]) -> str:
+    caminho = caminho_calendario(pasta, tipo, chave)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    if tipo == "pacientes":
+        titulo = f"IMREA HC - {agendamentos[0]['nome']}"
+    else:
+        titulo = f"IMREA HC - agenda de {chave[8:10]}/{chave[5:7]}/{chave[:4]}"
+    with open(caminho + ".tmp", "w", encoding="utf-8", newline="") as f:
+        f.writelines(linhas_calendario_ics(titulo, agendamentos, tipo == "dias"))
+    os.replace(caminho + ".tmp", caminho)
+    return caminho
+
+"""
+Grava um lote de calendários (executado pelos processos auxiliares na reconstrução completa).
+
+Args:
+    pasta (str): Pasta dos calendários.
+    tipo (str): "pacientes" ou "dias".
+    lote (list[tuple]): Pares (chave, agendamentos) dos calendários do lote.
+
+Returns:
+    dict[str, str]: Impressão digital de cada calendário gravado.
+"""
+def _grava_lote_calendarios(pasta: str, tipo: str, lote: list[tuple[str, list[dict]]]) -> dict[str, str]:
+    impressoes = {}
+    for chave, agendamentos in lote:
+        grava_calendario(pasta, tipo, chave, agendamentos)
+        impressoes[chave] = impressao_calendario(agendamentos)
+    return impressoes
+
+"""
+Lê o índice dos calendários já gerados (impressão digital de cada arquivo).
+O índice também guarda até que ponto do registro de eventos os calendários já refletem ("eventos").
+
+Args:
+    pasta (str): Pasta dos calendários.
+
+Returns:
+    dict: {"pacientes": {cpf: impressão}, "dias": {dia: impressão}, "eventos": offset (se houver)}.
+"""
+def _le_indice_calendarios(pasta: str) -> dict:
+    try:
+        with open(os.path.join(pasta, "indice.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"pacientes": {}, "dias": {}}
+
+"""
+Grava o índice dos calendários gerados.
+
+Args:
+    pasta (str): Pasta dos calendários.
+    indice (dict): Impressão digital de cada calendário, por tipo.
+"""
+def _salva_indice_calendarios(pasta: str, indice: dict) -> None:
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump(indice, f)
+
+"""
+Retorna o tamanho atual do registro de eventos, que é o offset do próximo evento a ser gravado.
+
+Args:
+    arquivo (str, opcional): Caminho do registro. Default é 'eventos.jsonl'.
+
+Returns:
+    int: Offset do fim do registro (0 se ele ainda não existir).
+"""
+def _fim_eventos(arquivo: str = "eventos.jsonl") -> int:
+    try:
+        return os.path.getsize(arquivo)
+    except FileNotFoundError:
+        return 0
+
+"""
+Atualiza os calendários .ics de todos os pacientes e de todos os dias.
+Só são regravados os calendários cujos agendamentos mudaram desde a última atualização (compara a impressão digital
+guardada no índice); calendários de pacientes ou dias que não têm mais agendamentos são apagados.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    pasta (str, opcional): Pasta dos calendários. Default é "calendarios".
+    arquivo (str, opcional): Caminho do registro de eventos cujo fim é guardado no índice. Default é 'eventos.jsonl'.
+
+Returns:
+    dict: Quantidade de calendários regravados por tipo e quantidade de calendários apagados.
+"""
+def atualiza_calendarios(agendamentos: list[dict], pasta: str = PASTA_CALENDARIOS, arquivo: str = "eventos.jsonl") -> dict:
+    fim_eventos = _fim_eventos(arquivo)
+    grupos = {"pacientes": {}, "dias": {}}
+    for ag in agendamentos:
+        grupos["pacientes"].setdefault(ag["cpf"], []).append(ag)
+        grupos["dias"].setdefault(_dia_calendario(ag), []).append(ag)
+
+    indice = _le_indice_calendarios(pasta)
+    resultado = {"pacientes": 0, "dias": 0, "removidos": 0}
+    for tipo, calendarios in grupos.items():
+        anteriores, atuais = indice.get(tipo, {}), {}
+        for chave, lista in calendarios.items():
+            atuais[chave] = impressao_calendario(lista)
+            if anteriores.get(chave) != atuais[chave] or not os.path.exists(caminho_calendario(pasta, tipo, chave)):
+                grava_calendario(pasta, tipo, chave, lista)
+                resultado[tipo] += 1
+        for chave in anteriores.keys() - atuais.keys():
+            if os.path.exists(caminho_calendario(pasta, tipo, chave)):
+                os.remove(caminho_calendario(pasta, tipo, chave))
+            resultado["removidos"] += 1
+        indice[tipo] = atuais
+    indice["eventos"] = fim_eventos
+    _salva_indice_calendarios(pasta, indice)
+    return resultado
+
+"""
+Atualiza só os calendários dos pacientes e dias que tiveram agendamentos criados, confirmados ou cancelados
+desde a última atualização. As alterações são lidas do registro de eventos a partir do offset guardado no
+índice dos calendários, então nada é recalculado se nenhum agendamento mudou. Sem esse offset (primeira
+execução) ou se o registro tiver sido apagado, faz a atualização completa (atualiza_calendarios).
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    pasta (str, opcional): Pasta dos calendários. Default é "calendarios".
+    arquivo (str, opcional): Caminho do registro de eventos. Default é 'eventos.jsonl'.
+
+Returns:
+    dict: Quantidade de calendários regravados por tipo e quantidade de calendários apagados.
+"""
+def atualiza_calendarios_alterados(agendamentos: list[dict], pasta: str = PASTA_CALENDARIOS,
+                                   arquivo: str = "eventos.jsonl") -> dict:
+    indice = _le_indice_calendarios(pasta)
+    a_partir = indice.get("eventos")
+    if a_partir is None or _fim_eventos(arquivo) < a_partir:
+        return atualiza_calendarios(agendamentos, pasta, arquivo)
+
+    cpfs, datas, offset = set(), set(), a_partir
+    for offset, evento in le_eventos(a_partir, arquivo):
+        if evento["tipo"].startswith("agendamento_"):
+            cpfs.add(evento["dados"]["cpf"])
+            datas.add(evento["dados"]["data"][:10])
+    resultado = {"pacientes": 0, "dias": 0, "removidos": 0}
+    if cpfs:
+        grupos = {"pacientes": {cpf: [] for cpf in cpfs}, "dias": {data: [] for data in datas}}
+        for ag in agendamentos:
+            if ag["cpf"] in cpfs:
+                grupos["pacientes"][ag["cpf"]].append(ag)
+            if ag["data"][:10] in datas:
+                grupos["dias"][ag["data"][:10]].append(ag)
+        grupos["dias"] = {f"{d[6:10]}-{d[3:5]}-{d[:2]}": lista for d, lista in grupos["dias"].items()}
+        for tipo, calendarios in grupos.items():
+            impressoes = indice.setdefault(tipo, {})
+            for chave, lista in calendarios.items():
+                caminho = caminho_calendario(pasta, tipo, chave)
+                if not lista:
+                    if impressoes.pop(chave, None) is not None or os.path.exists(caminho):
+                        resultado["removidos"] += 1
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                    continue
+                impressao = impressao_calendario(lista)
+                if impressoes.get(chave) != impressao or not os.path.exists(caminho):
+                    grava_calendario(pasta, tipo, chave, lista)
+                    impressoes[chave] = impressao
+                    resultado[tipo] += 1
+    if offset != a_partir:
+        indice["eventos"] = offset
+        _salva_indice_calendarios(pasta, indice)
+    return resultado
+
+"""
+Atualiza apenas o calendário de um paciente (usado ao consultar os agendamentos pelo menu).
+
+Args:
+    cpf (str): CPF do paciente.
+    agendamentos (list[dict]): Lista de agendamentos.
+    pasta (str, opcional): Pasta dos calendários. Default é "calendarios".
+
+Returns:
+    str | None: Caminho do arquivo .ics do paciente ou None se ele não tiver agendamentos.
+"""
+def calendario_paciente(cpf: str, agendamentos: list[dict], pasta: str = PASTA_CALENDARIOS) -> str | None:
+    lista = [ag for ag in agendamentos if ag["cpf"] == cpf]
+    if not lista:
+        return None
+    indice = _le_indice_calendarios(pasta)
+    impressao = impressao_calendario(lista)
+    caminho = caminho_calendario(pasta, "pacientes", cpf)
+    if indice["pacientes"].get(cpf) != impressao or not os.path.exists(caminho):
+        grava_calendario(pasta, "pacientes", cpf, lista)
+        indice["pacientes"][cpf] = impressao
+        _salva_indice_calendarios(pasta, indice)
+    return caminho
+
+"""
+Refaz do zero todos os calendários, dividindo o trabalho entre vários processos.
+Os agendamentos são agrupados em ordem (por CPF e depois por dia) e enviados aos processos em lotes;
+no máximo dois lotes por processo ficam na fila ao mesmo tempo, então a memória usada não cresce com o total de calendários.
+
+Args:
+    agendamentos (list[dict]): Lista de agendamentos.
+    pasta (str, opcional): Pasta dos calendários. Default é "calendarios".
+    processos (int | None, opcional): Quantidade de processos. Default é None (um por núcleo do processador).
+    arquivo (str, opcional): Caminho do registro de eventos cujo fim é guardado no índice. Default é 'eventos.jsonl'.
+
+Returns:
+    dict: Quantidade de calendários gerados por tipo.
+"""
+def reconstroi_calendarios(agendamentos: list[dict], pasta: str = PASTA_CALENDARIOS, processos: int | None = None,
+                           arquivo: str = "eventos.jsonl") -> dict:
+    # apaga apenas os calendários gerados anteriormente
+    for tipo in ("pacientes", "dias"):
+        if os.path.isdir(os.path.join(pasta, tipo)):
+            for arquivo in os.listdir(os.path.join(pasta, tipo)):
+                if arquivo.endswith((".ics", ".ics.tmp")):
+                    os.remove(os.path.join(pasta, tipo, arquivo))
+
+    processos = processos or os.cpu_count() or 1
+    indice = {"pacientes": {}, "dias": {}, "eventos": _fim_eventos(arquivo)}
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        for tipo, chave in (("pacientes", lambda ag: ag["cpf"]), ("dias", _dia_calendario)):
+            grupos = ((c, list(lista)) for c, lista in itertools.groupby(sorted(agendamentos, key=chave), chave))
+            pendentes = set()
+            for lote in iter(lambda: list(itertools.islice(grupos, TAMANHO_LOTE_CALENDARIOS)), []):
+                pendentes.add(executor.submit(_grava_lote_calendarios, pasta, tipo, lote))
+                if len(pendentes) >= 2 * processos:
+                    prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for tarefa in prontos:
+                        indice[tipo].update(tarefa.result())
+            for tarefa in pendentes:
+                indice[tipo].update(tarefa.result())
+    _salva_indice_calendarios(pasta, indice)
+    return {tipo: len(indice[tipo]) for tipo in ("pacientes", "dias")}
+
+#======SESSÕES DE CONVERSA===================================================================
+PASTA_SESSOES = "sessoes"
+# sessões usadas pelos menus (chave: CPF do paciente); criadas na primeira conversa
+_sessoes_conversa = None
+
+"""
+Cria um armazenamento de sessões de conversa (estado de cada chat em andamento).
+As sessões ficam em memória em ordem de uso: as menos usadas são descartadas quando a
+capacidade é atingida e todas expiram após 'ttl' segundos sem uso. Se 'pasta' for informada,
+cada sessão salva também é gravada em disco na hora, então as conversas sobrevivem a uma queda do sistema
+(ou Ctrl-C) e as descartadas por falta de espaço podem ser retomadas depois.
+
+Args:
+    capacidade (int, opcional): Quantidade máxima de sessões em memória. Default é 1000.
+    ttl (float, opcional): Tempo de vida de uma sessão sem uso, em segundos. Default é 1800 (30 min).
+    pasta (str | None, opcional): Pasta para gravar sessões em disco. Default é None (somente memória).
+
+Returns:
+    dict: Armazenamento de sessões.
+"""
+def cria_sessoes(capacidade: int = 1000, ttl: float = 1800, pasta: str | None = None) -> dict:
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    return {"sessoes": OrderedDict(), "capacidade": capacidade, "ttl": ttl, "pasta": pasta}
+
+"""
+Monta o caminho do arquivo em disco de uma sessão.
+
+Args:
+    sessoes (dict): Armazenamento de sessões.
+    chave (str): Identificador da conversa (telefone ou CPF).
+
+Returns:
+    str: Caminho do arquivo JSON da sessão.
+"""
+def _arquivo_sessao(sessoes: dict, chave: str) -> str:
+    nome = "".join(c for c in chave if c.isalnum())
+    return os.path.join(sessoes["pasta"], f"{nome}.json")
+
+"""
+Grava uma sessão em disco (em um arquivo temporário trocado pelo definitivo, para uma queda no meio
+da gravação não deixar o arquivo pela metade).
+
+Args:
+    sessoes (dict): Armazenamento de sessões.
+    chave (str): Identificador da conversa.
+    sessao (dict): Sessão com as chaves 'estado' e 'expira'.
+"""
+def _grava_sessao(sessoes: dict, chave: str, sessao: dict) -> None:
+    arquivo = _arquivo_sessao(sessoes, chave)
+    with open(arquivo + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"chave": chave, "estado": sessao["estado"], "expira": sessao["expira"]}, f)
+    os.replace(arquivo + ".tmp", arquivo)
+
+"""
+Lê uma sessão gravada em disco. O arquivo continua lá: ele é a cópia da sessão que sobrevive a uma queda.
+
+Args:
+    arquivo (str): Caminho do arquivo da sessão.
+
+Returns:
+    dict | None: Sessão lida (com 'chave', 'estado' e 'expira') ou None se não existir ou estiver corrompida.
+"""
+def _le_sessao(arquivo: str) -> dict | None:
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return dados
+
+"""
+Insere uma sessão na memória como a mais recente, descartando as menos usadas se passar da capacidade.
+
+Args:
+    sessoes (dict): Armazenamento de sessões.
+    chave (str): Identificador da conversa.
+    sessao (dict): Sessão com as chaves 'estado' e 'expira'.
+"""
+def _insere_sessao(sessoes: dict, chave: str, sessao: dict) -> None:
+    memoria = sessoes["sessoes"]
+    memoria[chave] = sessao
+    memoria.move_to_end(chave)
+    while len(memoria) > sessoes["capacidade"]:
+        chave_antiga, sessao_antiga = memoria.popitem(last=False)
+        if sessoes["pasta"] and sessao_antiga["expira"] > time.time():
+            _grava_sessao(sessoes, chave_antiga, sessao_antiga)
+
+"""
+Retorna o estado de uma conversa, renovando seu prazo de expiração.
+Se a sessão não estiver em memória, procura no disco (quando houver pasta configurada).
+
+Args:
+    sessoes (dict): Armazenamento de sessões.
+    chave (str): Identificador da conversa (telefone ou CPF).
+
+Returns:
+    dict | None: Estado da conversa ou None se não existir ou tiver expirado.
+"""
+def obtem_sessao(sessoes: dict, chave: str) -> dict | None:
+    agora = time.time()
+    sessao = sessoes["sessoes"].pop(chave, None)
+    if sessao is None and sessoes["pasta"]:
+        sessao = _le_sessao(_arquivo_sessao(sessoes, chave))
+    if sessao is None or sessao["expira"] <= agora:
+        return None
+    sessao = {"estado": sessao["estado"], "expira": agora + sessoes["ttl"]}
+    _insere_sessao(sessoes, chave, sessao)
+    return sessao["estado"]
+
+"""
+Salva (ou substitui) o estado de uma conversa, gravando-o também em disco quando houver pasta configurada.
+
+Args:
+    sessoes (dict): Armazenamento de sessões.
+    chave (str): Identificador da conversa (telefone ou CPF).
+    estado (dict): Estado da conversa (ex.: {"fluxo": "agendamento", "dia": "17/09/2025"}).
+"""
+def salva_sessao(sessoes: dict, chave: str, estado: dict) -> None:
+    sessao = {"estado": estado, "expira": time.time() + sessoes["ttl"]}
+    _insere_sessao(sessoes, chave, sessao)
+    if sessoes["pasta"]:
+        _grava_sessao(sessoes, chave, sessao)
+
+"""
+Encerra uma conversa, removendo seu estado da memória e do disco.
+
+Args:
+    sessoes (dict): Armazenamento de sessões.
+    chave (str): Identificador da conversa.
+"""
+def remove_sessao(sessoes: dict, chave: str) -> None:
+    sessoes["sessoes"].pop(chave, None)
+    if sessoes["pasta"]:
+        try:
+            os.remove(_arquivo_sessao(sessoes, chave))
+        except FileNotFoundError:
+            pass
 
-    horarios_disponiveis[dia_escolhido].remove(horario_escolhido)
-    salva_horarios(horarios_disponiveis)
+"""
+Remove da memória as sessões expiradas.
+Como as sessões estão em ordem de uso, as expiradas ficam sempre no início e a limpeza
+para na primeira sessão ainda válida.
 
-    print(f"Consulta agendada para {paciente['nome']} em {data_str}!")
-    return agendamentos, horarios_disponiveis
+Args:
+    sessoes (dict): Armazenamento de sessões.
 
+Returns:
+    int: Quantidade de sessões removidas.
 """
-Consulta e exibe os agendamentos de um paciente pelo CPF.
+def expira_sessoes(sessoes: dict) -> int:
+    memoria = sessoes["sessoes"]
+    agora = time.time()
+    removidas = 0
+    while memoria:
+        chave = next(iter(memoria))
+        if memoria[chave]["expira"] > agora:
+            break
+        del memoria[chave]
+        removidas += 1
+    return removidas
+
+"""
+Grava em disco todas as sessões ativas em memória com o prazo de expiração renovado pelo uso,
+para serem retomadas após reiniciar o sistema (o estado já foi gravado por salva_sessao).
 
 Args:
-    agendamentos (list[dict]): Lista de agendamentos.
-    pacientes (list[dict]): Lista de pacientes cadastrados.
+    sessoes (dict): Armazenamento de sessões (precisa ter pasta configurada).
 """
-def consultar_agendamentos(agendamentos: list[dict], pacientes: list[dict]) -> None:
-    print("=== Consulta de Agendamento ===")
-    paciente = buscar_usuario_por_cpf_interativo(pacientes)
-    if not paciente:
+def persiste_sessoes(sessoes: dict) -> None:
+    if not sessoes["pasta"]:
         return
+    expira_sessoes(sessoes)
+    for chave, sessao in sessoes["sessoes"].items():
+        _grava_sessao(sessoes, chave, sessao)
 
-    cpf = paciente["cpf"]
-    encontrados = [ag for ag in agendamentos if ag["cpf"] == cpf]
+"""
+Carrega do disco as sessões ainda válidas (as mais recentes primeiro, até a capacidade)
+e apaga os arquivos das sessões expiradas. Os arquivos das sessões carregadas continuam
+em disco como cópia, e as que não couberem em memória continuam disponíveis lá.
 
-    print("\n=== Dados do Paciente ===")
-    print(f"Nome: {paciente['nome']}")
-    print(f"CPF: {paciente['cpf']}")
-    print(f"Telefone/WhatsApp: {paciente['telefone']}")
+Args:
+    sessoes (dict): Armazenamento de sessões (precisa ter pasta configurada).
 
-    print("\n=== Agendamentos ===")
-    if not encontrados:
-        print("Nenhum agendamento encontrado.")
-    else:
-        for ag in encontrados:
-            if "hora" in ag:
-                print(f"- {ag['data']} às {ag['hora']}")
-            else:
-                print(f"- {ag['data']}")
+Returns:
+    int: Quantidade de sessões retomadas em memória.
+"""
+def carrega_sessoes(sessoes: dict) -> int:
+    if not sessoes["pasta"]:
+        return 0
+    agora = time.time()
+    validas = []
+    for nome in os.listdir(sessoes["pasta"]):
+        if not nome.endswith(".json"):
+            continue
+        arquivo = os.path.join(sessoes["pasta"], nome)
+        try:
+            with open(arquivo, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if dados["expira"] <= agora:
+            os.remove(arquivo)
+        else:
+            validas.append((dados["expira"], arquivo, dados))
+
+    # as que expiram por último são as usadas mais recentemente
+    recentes = heapq.nlargest(sessoes["capacidade"], validas, key=lambda v: v[0])
+    for _, _, dados in reversed(recentes):
+        sessoes["sessoes"][dados["chave"]] = {"estado": dados["estado"], "expira": dados["expira"]}
+    return len(recentes)
+
+"""
+Retorna o armazenamento de sessões usado pelos menus, criando-o na primeira chamada
+e retomando as conversas gravadas em disco na execução anterior.
+
+Returns:
+    dict: Armazenamento de sessões (com pasta em disco).
+"""
+def obter_sessoes() -> dict:
+    global _sessoes_conversa
+    if _sessoes_conversa is None:
+        _sessoes_conversa = cria_sessoes(pasta=PASTA_SESSOES)
+        carrega_sessoes(_sessoes_conversa)
+    return _sessoes_conversa
+
+"""
+Grava em disco as conversas em andamento ao encerrar o sistema (só se alguma sessão foi usada nesta execução).
+"""
+def encerra_sessoes() -> None:
+    if _sessoes_conversa is not None:
+        persiste_sessoes(_sessoes_conversa)
+
+#======CONTROLE DE ADMISSÃO===================================================================
+# A fila com prioridades (admite_pedido/processa_fila) é para o atendimento de mensagens do Whatsapp, um pedido por
+# mensagem recebida. Os menus do terminal atendem uma pessoa por vez, então não passam por ela; no terminal só o limite
+# de respostas inválidas repetidas (limita_repeticoes, usado por entrada_valida) se aplica.
+# prioridades da fila de trabalho (número menor é atendido primeiro)
+PRIORIDADE_ALTA = 0      # agendar e cancelar/confirmar consultas
+PRIORIDADE_NORMAL = 1    # cadastro, consultas, administração
+PRIORIDADE_BAIXA = 2     # navegação no FAQ
+# fração da fila que cada prioridade pode ocupar: o FAQ é recusado primeiro quando a fila enche,
+# e agendamentos/cancelamentos ainda encontram espaço
+LIMITE_FILA_PRIORIDADE = {PRIORIDADE_ALTA: 1.0, PRIORIDADE_NORMAL: 0.8, PRIORIDADE_BAIXA: 0.5}
+MENSAGEM_SOBRECARGA = "Sistema ocupado no momento, tente novamente em instantes."
+# chave usada para o atendimento pelo terminal enquanto o paciente ainda não foi identificado
+CHAVE_TERMINAL = "terminal"
+
+_controle_admissao = None
+# conversa em andamento: os pedidos e as respostas inválidas são contados pelo telefone (ou CPF) do paciente identificado
+_conversa_atual = {"chave": CHAVE_TERMINAL}
 
-#======LEMBRETES===================================================================
 """
-Permite que o paciente confirme ou cancele seus agendamentos.Case cancele, o horário é retirado do 'agendamentos.json' de determinado cpf e volta aos horários disponíveis. Caso confirme ele continua no agendamento. É uma simulação de envio de lembrete ao paciente para confirmação ou cancelamento de consulta.
+Cria o controle de admissão de pedidos.
+Cada chave (telefone ou CPF) tem um "balde de fichas": cada pedido gasta uma ficha e as fichas voltam a uma
+taxa fixa, até o tamanho da rajada. Os pedidos aceitos entram em uma fila global limitada, atendida por prioridade;
+pedidos que esperaram mais que a espera máxima são descartados em vez de atendidos atrasados.
+As respostas inválidas repetidas usam outros baldes, com as mesmas taxa e rajada, para que errar uma opção
+não consuma as fichas dos pedidos da conversa.
 
 Args:
-    agendamentos (list[dict]): Lista de agendamentos.
-    paciente (dict): Dicionário do paciente.
-    horarios_disponiveis (dict): Dicionário de horários disponíveis.
+    taxa (float, opcional): Fichas devolvidas por segundo a cada chave. Default é 1.
+    rajada (int, opcional): Máximo de fichas acumuladas por chave. Default é 10.
+    capacidade_fila (int, opcional): Tamanho máximo da fila global. Default é 200.
+    espera_maxima (float, opcional): Segundos que um pedido pode esperar na fila. Default é 30.
+    capacidade_chaves (int, opcional): Máximo de baldes mantidos em memória (os menos usados são descartados). Default é 10000.
+
+Returns:
+    dict: Controle de admissão.
 """
-def verificar_lembretes_paciente(agendamentos: list[dict], paciente: dict, horarios_disponiveis: dict) -> None:
-    cpf = paciente["cpf"]
-    encontrados = [ag for ag in agendamentos if ag["cpf"] == cpf]
+def cria_controle_admissao(taxa: float = 1.0, rajada: int = 10, capacidade_fila: int = 200,
+                           espera_maxima: float = 30, capacidade_chaves: int = 10000) -> dict:
+    return {
+        "taxa": taxa, "rajada": rajada, "capacidade_fila": capacidade_fila, "espera_maxima": espera_maxima,
+        "capacidade_chaves": capacidade_chaves,
+        "baldes": OrderedDict(), "baldes_repeticoes": OrderedDict(), "fila": [], "sequencia": itertools.count(),
+        "trava": threading.Lock(),
+        "metricas": {"aceitos": 0, "rejeitados_taxa": 0, "rejeitados_fila": 0, "expirados": 0,
+                     "repeticoes_invalidas": 0, "processados": 0, "profundidade_maxima": 0,
+                     "espera_maxima_observada": 0.0},
+    }
 
-    if not encontrados:
-        print(f"\nNenhum agendamento encontrado para {paciente['nome']}.")
-        return
+"""
+Retorna o controle de admissão do processo (usado por entrada_valida), criando-o na primeira chamada.
 
-    agendamentos_restantes = encontrados.copy()
+Returns:
+    dict: Controle de admissão.
+"""
+def obter_controle_admissao() -> dict:
+    global _controle_admissao
+    if _controle_admissao is None:
+        _controle_admissao = cria_controle_admissao()
+    return _controle_admissao
 
-    while agendamentos_restantes:
-        print(f"\n=== Agendamentos de {paciente['nome']} ===")
-        for i, ag in enumerate(agendamentos_restantes, 1):
-            print(f"{i}. {ag['data']}")
-        print("0 - Voltar")
+"""
+Identifica a conversa em andamento pelo paciente que está sendo atendido: a partir daí os pedidos e as
+respostas inválidas são contados pelo telefone dele (ou pelo CPF, se não houver telefone).
 
-        escolha = input("Escolha um agendamento para confirmar/cancelar: ").strip()
-        if escolha == "0":
-            break
-        if not escolha.isdigit() or not (1 <= int(escolha) <= len(agendamentos_restantes)):
-            print(f"Escolha inválida. Digite um número entre 0 e {len(agendamentos_restantes)}.")
-            continue
+Args:
+    paciente (dict | None): Paciente identificado, ou None para voltar à chave do terminal.
+"""
+def identifica_conversa(paciente: dict | None) -> None:
+    _conversa_atual["chave"] = (paciente.get("telefone_e164") or paciente["cpf"]) if paciente else CHAVE_TERMINAL
 
-        agendamento = agendamentos_restantes[int(escolha)-1]
+"""
+Retorna a chave da conversa em andamento.
 
-        decisao = entrada_valida("\nDeseja confirmar ou cancelar este agendamento?\n1 - Confirmar\n2 - Cancelar\n0 - Voltar\nEscolha: ", ["0", "1", "2"])
+Returns:
+    str: Telefone ou CPF do paciente identificado, ou CHAVE_TERMINAL.
+"""
+def chave_conversa() -> str:
+    return _conversa_atual["chave"]
 
-        if decisao == "1":
-            print(f"\nConsulta de {paciente['nome']} confirmada!")
-            agendamentos_restantes.remove(agendamento)
-        elif decisao == "2":
-            print(f"\nConsulta de {paciente['nome']} cancelada.")
-            agendamentos.remove(agendamento)
-            agendamentos_restantes.remove(agendamento)
-            salva_dados("agendamentos.json", "agendamentos", agendamentos)
+"""
+Tenta gastar uma ficha do balde de uma chave, devolvendo antes as fichas acumuladas desde o último pedido.
+Deve ser chamada com a trava do controle.
 
-            dia, hora = agendamento["data"].split(" ")
-            if dia in horarios_disponiveis:
-                horarios_disponiveis[dia].append(hora)
-            else:
-                horarios_disponiveis[dia] = [hora]
-            salva_horarios(horarios_disponiveis)
-        elif decisao == "0":
-            continue
+Args:
+    controle (dict): Controle de admissão.
+    chave (str): Telefone ou CPF de quem fez o pedido.
+    agora (float): Momento atual (time.monotonic()).
+    tipo (str, opcional): "baldes" (pedidos) ou "baldes_repeticoes" (respostas inválidas). Default é "baldes".
 
-        if agendamentos_restantes:
-            proximo = entrada_valida(
-                "\nDeseja verificar o próximo agendamento? 1 - Sim, 2 - Não: ", ["1", "2"])
-            if proximo == "2":
-                break
+Returns:
+    float: 0 se a ficha foi gasta, ou quantos segundos faltam para a próxima ficha.
+"""
+def _gasta_ficha(controle: dict, chave: str, agora: float, tipo: str = "baldes") -> float:
+    baldes = controle[tipo]
+    fichas, ultimo = baldes.get(chave, (controle["rajada"], agora))
+    fichas = min(controle["rajada"], fichas + (agora - ultimo) * controle["taxa"])
+    espera = 0.0
+    if fichas >= 1:
+        fichas -= 1
+    else:
+        espera = (1 - fichas) / controle["taxa"]
+    baldes[chave] = (fichas, agora)
+    baldes.move_to_end(chave)
+    while len(baldes) > controle["capacidade_chaves"]:
+        baldes.popitem(last=False)
+    return espera
 
-    if not agendamentos_restantes:
-        print("\nNão há mais lembretes para verificar.")
+"""
+Registra uma resposta inválida de uma conversa e verifica se ela ainda pode tentar de novo.
+Usa baldes separados dos pedidos, então as repetições não contam como pedidos recusados nem gastam as fichas deles.
 
-#=======FAQ==================================================================
+Args:
+    controle (dict): Controle de admissão.
+    chave (str): Telefone ou CPF da conversa.
+
+Returns:
+    float: 0 se a conversa pode tentar de novo, ou quantos segundos ela deve esperar.
 """
-Salva a lista de perguntas e respostas no arquivo JSON.
+def limita_repeticoes(controle: dict, chave: str) -> float:
+    with controle["trava"]:
+        espera = _gasta_ficha(controle, chave, time.monotonic(), "baldes_repeticoes")
+        if espera:
+            controle["metricas"]["repeticoes_invalidas"] += 1
+        return espera
+
+"""
+Tenta colocar um pedido na fila de trabalho.
+O pedido é recusado se a chave excedeu a sua taxa ou se a fila já passou do limite da prioridade do pedido.
 
 Args:
-    faq_lista (list[dict]): Lista de perguntas e respostas.
-    arquivo (str, opcional): Caminho do arquivo JSON.
+    controle (dict): Controle de admissão.
+    chave (str): Telefone ou CPF de quem fez o pedido.
+    prioridade (int): PRIORIDADE_ALTA, PRIORIDADE_NORMAL ou PRIORIDADE_BAIXA.
+    tarefa (callable): Função sem argumentos que atende o pedido.
+
+Returns:
+    bool: True se o pedido entrou na fila, False se foi recusado.
 """
-def salvar_faq(faq_lista: list[dict], arquivo="faq.json") -> None:
-    with open(arquivo, "w", encoding="utf-8") as f:
-        json.dump({"faq": faq_lista}, f)
+def admite_pedido(controle: dict, chave: str, prioridade: int, tarefa) -> bool:
+    agora = time.monotonic()
+    metricas = controle["metricas"]
+    with controle["trava"]:
+        fila = controle["fila"]
+        if len(fila) >= controle["capacidade_fila"] * LIMITE_FILA_PRIORIDADE[prioridade]:
+            metricas["rejeitados_fila"] += 1
+            return False
+        if _gasta_ficha(controle, chave, agora):
+            metricas["rejeitados_taxa"] += 1
+            return False
+        heapq.heappush(fila, (prioridade, next(controle["sequencia"]), agora, chave, tarefa))
+        metricas["aceitos"] += 1
+        metricas["profundidade_maxima"] = max(metricas["profundidade_maxima"], len(fila))
+        return True
 
 """
-Carrega o FAQ do arquivo JSON.
-Se o arquivo não existir ou estiver corrompido, retorna um dicionário vazio.
+Atende os pedidos da fila em ordem de prioridade (e de chegada, dentro da mesma prioridade).
+Pedidos que esperaram mais que a espera máxima são descartados, para que a demora de uma rajada não se acumule.
 
 Args:
-    arquivo (str, opcional): Caminho do arquivo JSON.
+    controle (dict): Controle de admissão.
+    limite (int | None, opcional): Máximo de pedidos atendidos nesta chamada. Default é None (toda a fila).
 
 Returns:
-    list[dict]: Lista de perguntas e respostas.
+    list[str]: Chaves dos pedidos descartados por espera, para que recebam a mensagem de sobrecarga.
 """
-def carrega_faq(arquivo: str = "faq.json") -> list[dict]:
-    try:
-        with open(arquivo, "r", encoding="utf-8") as f:
-            dados = json.load(f)
-    except FileNotFoundError:
-        print(f"Arquivo '{arquivo}' não encontrado.")
-        return []
-    except json.JSONDecodeError:
-        print(f"Arquivo '{arquivo}' corrompido ou inválido.")
-        return []
-    else:
-        return dados.get("faq", [])
-    finally:
-        print(f"Tentativa de leitura de '{arquivo}' finalizada.")
+def processa_fila(controle: dict, limite: int | None = None) -> list[str]:
+    metricas = controle["metricas"]
+    descartados = []
+    atendidos = 0
+    while limite is None or atendidos < limite:
+        with controle["trava"]:
+            if not controle["fila"]:
+                break
+            _, _, chegada, chave, tarefa = heapq.heappop(controle["fila"])
+            espera = time.monotonic() - chegada
+            if espera > controle["espera_maxima"]:
+                metricas["expirados"] += 1
+                descartados.append(chave)
+                continue
+            metricas["espera_maxima_observada"] = max(metricas["espera_maxima_observada"], espera)
+        # a tarefa roda fora da trava, para que novos pedidos possam ser recusados ou enfileirados enquanto isso
+        tarefa()
+        atendidos += 1
+        with controle["trava"]:
+            metricas["processados"] += 1
+    return descartados
 
 """
-Adiciona uma nova pergunta e resposta ao FAQ.
+Retorna as métricas do controle de admissão (profundidade da fila e contagem de pedidos aceitos e recusados).
 
 Args:
-    faq_lista (list[dict]): Lista atual de perguntas e respostas.
+    controle (dict): Controle de admissão.
 
 Returns:
-    list[dict]: Lista atualizada de perguntas e respostas.
+    dict: Métricas atuais.
 """
-def adicionar_pergunta(faq_lista: list[dict]) -> list[dict]:
-    print("=== Adicionar Pergunta ===")
-    while True:
-        pergunta = input("Digite a pergunta: ").strip()
-        if not pergunta:
-            print("A pergunta não pode ser vazia. Tente novamente.")
-            continue
-        if any(item["pergunta"].lower() == pergunta.lower() for item in faq_lista):
-            print("Essa pergunta já existe no FAQ. Digite uma diferente.")
-            continue
-        break
+def metricas_admissao(controle: dict) -> dict:
+    with controle["trava"]:
+        return dict(controle["metricas"], profundidade=len(controle["fila"]),
+                    chaves=len(controle["baldes"].keys() | controle["baldes_repeticoes"].keys()))
 
-    while True:
-        resposta = input("Digite a resposta: ").strip()
-        if not resposta:
-            print("A resposta não pode ser vazia. Tente novamente.")
-            continue
-        break
+#======CARREGAMENTO SOB DEMANDA===================================================================
+# coleções já carregadas nesta execução; cada arquivo só é lido na primeira vez que algum menu precisar dele
+_colecoes = {}
+_trava_colecoes = threading.Lock()
 
-    faq_lista.append({"pergunta": pergunta, "resposta": resposta})
-    print("Pergunta adicionada com sucesso!")
-    return faq_lista
+"""
+Carrega os pacientes, normaliza os telefones de cadastros antigos para o formato E.164 (salvando o arquivo se algo mudou)
+e começa a montar o índice de busca por nome em segundo plano.
+
+Args:
+    silencioso (bool): Se True, não exibe mensagens (carregamento em segundo plano).
+
+Returns:
+    list[dict]: Lista de pacientes.
+"""
+def _carrega_pacientes(silencioso: bool) -> list[dict]:
+    pacientes = carrega_dados("pacientes.json", "pacientes", silencioso)
+    if migra_telefones(pacientes):
+        salva_dados("pacientes.json", "pacientes", pacientes)
+    # o índice de nomes é montado em segundo plano enquanto o usuário digita
+    prepara_indice_nomes(pacientes)
+    return pacientes
+
+# como cada coleção é lida do disco
+_carregadores = {
+    "pacientes": _carrega_pacientes,
+    "agendamentos": lambda silencioso: carrega_dados("agendamentos.json", "agendamentos", silencioso),
+    "horarios": lambda silencioso: carrega_horarios("horarios.json", silencioso),
+    "faq": lambda silencioso: carrega_faq("faq.json", silencioso),
+}
 
 """
-Edita uma pergunta ou resposta existente no FAQ.
+Retorna uma coleção de dados, carregando o arquivo correspondente só no primeiro acesso.
+As chamadas seguintes devolvem sempre o mesmo objeto (lista ou dicionário), então as alterações feitas nele
+pelos menus continuam valendo até o fim da execução.
 
 Args:
-    faq_lista (list[dict]): Lista de perguntas e respostas.
+    nome (str): "pacientes", "agendamentos", "horarios" ou "faq".
+    silencioso (bool, opcional): Se True, não exibe mensagens (carregamento em segundo plano).
 
 Returns:
-    list[dict]: Lista atualizada após edição.
+    list[dict] | dict: Coleção carregada.
 """
-def editar_pergunta(faq_lista: list[dict]) -> list[dict]:
-    print("=== Editar Pergunta ===")
-    for i, item in enumerate(faq_lista, 1):
-        print(f"{i}. {item['pergunta']}")
-    try:
-        escolha = int(input("Escolha o número da pergunta para editar: ")) - 1
-        item = faq_lista[escolha]
-    except (ValueError, IndexError):
-        print("Escolha inválida.")
-        return faq_lista
-    print(f"Pergunta atual: {item['pergunta']}")
-    nova_pergunta = input("Digite a nova pergunta (ENTER para manter): ").strip()
-    print(f"Resposta atual: {item['resposta']}")
-    nova_resposta = input("Digite a nova resposta (ENTER para manter): ").strip()
-    if nova_pergunta:
-        item["pergunta"] = nova_pergunta
-    if nova_resposta:
-        item["resposta"] = nova_resposta
-    print("Pergunta atualizada.")
-    return faq_lista
+def colecao(nome: str, silencioso: bool = False) -> list[dict] | dict:
+    dados = _colecoes.get(nome)
+    if dados is not None:
+        return dados
+    # a trava evita que o menu e o carregamento em segundo plano leiam o mesmo arquivo ao mesmo tempo
+    with _trava_colecoes:
+        if nome not in _colecoes:
+            _colecoes[nome] = _carregadores[nome](silencioso)
+        return _colecoes[nome]
+
+# total de problemas achados pela verificação de integridade em segundo plano (None enquanto ela não terminou)
+_aviso_integridade = {"total": None, "exibido": False}
 
 """
-Remove uma pergunta do FAQ.
+Carrega coleções em segundo plano, enquanto o usuário ainda está navegando no menu principal.
+Se o usuário pedir uma coleção que ainda está sendo lida, o menu espera a leitura terminar em vez de ler o arquivo de novo.
+Com verificar=True, depois de carregar roda a verificação de integridade na mesma thread; o resultado é
+avisado pelo menu principal (aviso_integridade) e pelo Menu Administrador quando ela terminar.
 
 Args:
-    faq_lista (list[dict]): Lista de perguntas e respostas.
+    nomes (list[str] | None, opcional): Coleções a carregar. Default é None (todas).
+    verificar (bool, opcional): Se True, verifica a integridade entre os arquivos ao final. Default é False.
 
 Returns:
-    list[dict]: Lista atualizada sem a pergunta removida.
+    threading.Thread: Thread do carregamento (daemon, não impede o encerramento do programa).
 """
-def remover_pergunta(faq_lista: list[dict]) -> list[dict]:
-    print("=== Remover Pergunta ===")
-    for i, item in enumerate(faq_lista, 1):
-        print(f"{i}. {item['pergunta']}")
-    try:
-        escolha = int(input("Escolha o número da pergunta para remover: ")) - 1
-        item = faq_lista.pop(escolha)
-        print(f"Pergunta '{item['pergunta']}' removida.")
-    except (ValueError, IndexError):
-        print("Escolha inválida.")
-    return faq_lista
+def prefetch_colecoes(nomes: list[str] | None = None, verificar: bool = False) -> threading.Thread:
+    def carrega():
+        for nome in nomes or list(_carregadores):
+            colecao(nome, silencioso=True)
+        if verificar:
+            try:
+                problemas = verifica_integridade(colecao("pacientes", True), colecao("agendamentos", True),
+                                                 colecao("horarios", True))
+            except RuntimeError:
+                # um menu alterou os horários durante a verificação; ela fica para a opção 4 do Menu Administrador
+                return
+            _aviso_integridade["total"] = sum(len(p) for p in problemas.values())
+
+    thread = threading.Thread(target=carrega, daemon=True)
+    thread.start()
+    return thread
+
+"""
+Retorna o aviso de problemas de integridade achados pela verificação em segundo plano, uma única vez.
+
+Returns:
+    str | None: Mensagem de aviso, ou None se a verificação não terminou, não achou problemas ou o aviso já foi exibido.
+"""
+def aviso_integridade() -> str | None:
+    total = _aviso_integridade["total"]
+    if not total or _aviso_integridade["exibido"]:
+        return None
+    _aviso_integridade["exibido"] = True
+    return (f"Atenção: {total} problemas de integridade encontrados "
+            "(Menu Administrador > Verificar integridade dos dados).")
+
+"""
+Retorna (e esquece) os avisos de arquivos ausentes ou corrompidos guardados pelo carregamento em segundo plano.
+
+Returns:
+    list[str]: Mensagens ainda não exibidas.
+"""
+def avisos_carregamento() -> list[str]:
+    avisos = _avisos_carregamento[:]
+    del _avisos_carregamento[:len(avisos)]
+    return avisos
+
+"""
+Salva em disco as coleções de pacientes, agendamentos e horários que foram carregadas nesta execução.
+Coleções que nunca foram acessadas não são regravadas. O FAQ é salvo pelo próprio menu do FAQ a cada alteração.
+
+Returns:
+    list[str]: Nomes das coleções salvas.
+"""
+def salva_colecoes() -> list[str]:
+    salvas = []
+    with _trava_colecoes:
+        if "pacientes" in _colecoes:
+            salva_dados("pacientes.json", "pacientes", _colecoes["pacientes"])
+            salvas.append("pacientes")
+        if "agendamentos" in _colecoes:
+            salva_dados("agendamentos.json", "agendamentos", _colecoes["agendamentos"])
+            salvas.append("agendamentos")
+        if "horarios" in _colecoes:
+            salva_horarios(_colecoes["horarios"])
+            salvas.append("horarios")
+    return salvas
 
 #======MENUS===================================================================
 """
@@ -755,33 +4202,22 @@ Exibe o menu de perguntas frequentes para o paciente.
 O paciente pode visualizar perguntas e respostas já cadastradas.
 """
 def menu_faq_paciente()->None:
-    faq_lista = carrega_faq()
+    faq_lista = colecao("faq")
     if not faq_lista:
         print("Nenhuma pergunta cadastrada.")
         return
 
     while True:
         print("=== FAQ - Perguntas Frequentes ===")
-        for i, item in enumerate(faq_lista, 1):
-            print(f"{i}. {item['pergunta']}")
-        print("0. Voltar ao Menu Paciente")
-
-        try:
-            escolha = int(input("Escolha uma pergunta para ver a resposta: "))
-        except ValueError:
-            print("Entrada inválida. Digite apenas números.")
-            continue
-
-        if escolha == 0:
+        escolhido = navega_paginas(lambda cursor, direcao: pagina_lista(faq_lista, cursor, direcao),
+                                   lambda item: item["pergunta"], "Escolha uma pergunta para ver a resposta: ")
+        if not escolhido:
+            break
+        print(f"\n{escolhido[1]['pergunta']}")
+        print(f"{escolhido[1]['resposta']}")
+        ver_outra = entrada_valida("Deseja ver outra pergunta? 1 - Sim, 2 - Não: ", ["1", "2"])
+        if ver_outra == "2":
             break
-        elif 1 <= escolha <= len(faq_lista):
-            print(f"\n{faq_lista[escolha-1]['pergunta']}")
-            print(f"{faq_lista[escolha-1]['resposta']}")
-            ver_outra = entrada_valida("Deseja ver outra pergunta? 1 - Sim, 2 - Não: ", ["1", "2"])
-            if ver_outra == "2":
-                break
-        else:
-            print(f"Escolha inválida. Digite um número entre 0 e {len(faq_lista)}.")
 
 """
 Exibe o menu administrativo do FAQ.
@@ -814,16 +4250,15 @@ def menu_faq_adm(faq_lista: list[dict]) -> list[dict]:
                 print("Nenhuma pergunta cadastrada.")
             else:
                 print("=== Perguntas e Respostas ===")
-                for i, item in enumerate(faq_lista, 1):
-                    print(f"{i}. Pergunta: {item['pergunta']}")
-                    print(f"   Resposta: {item['resposta']}\n")
+                navega_paginas(lambda cursor, direcao: pagina_lista(faq_lista, cursor, direcao),
+                               lambda item: f"Pergunta: {item['pergunta']}\n   Resposta: {item['resposta']}\n",
+                               selecionar=False)
             input("\nPressione ENTER para voltar...")
 
         elif escolha == "2":
             limpa_tela()
             while True:
                 faq_lista = adicionar_pergunta(faq_lista)
-                salvar_faq(faq_lista)
                 ver_outra = entrada_valida("Deseja adicionar outra pergunta? 1 - Sim, 2 - Não: ", ["1", "2"])
                 if ver_outra == "2":
                     break
@@ -832,7 +4267,6 @@ def menu_faq_adm(faq_lista: list[dict]) -> list[dict]:
             limpa_tela()
             while True:
                 faq_lista = editar_pergunta(faq_lista)
-                salvar_faq(faq_lista)
                 ver_outra = entrada_valida("Deseja editar outra pergunta? 1 - Sim, 2 - Não: ", ["1", "2"])
                 if ver_outra == "2":
                     break
@@ -841,7 +4275,6 @@ def menu_faq_adm(faq_lista: list[dict]) -> list[dict]:
             limpa_tela()
             while True:
                 faq_lista = remover_pergunta(faq_lista)
-                salvar_faq(faq_lista)
                 ver_outra = entrada_valida("Deseja remover outra pergunta? 1 - Sim, 2 - Não: ", ["1", "2"])
                 if ver_outra == "2":
                     break
@@ -850,20 +4283,11 @@ def menu_faq_adm(faq_lista: list[dict]) -> list[dict]:
 """
 Menu interativo para pacientes.
 
-Permite que o paciente realizar cadastro, agendamento de consultas, consulta de agendamentos, verificação de lembretes e acesso ao FAQ.
-
-Args:
-    pacientes (list[dict]): Lista de pacientes cadastrados.
-    agendamentos (list[dict]): Lista de agendamentos existentes.
-    horarios_disponiveis (dict): Dicionário de dias e horários disponíveis para agendamento.
-
-Returns:
-    tuple:
-        list[dict]: Lista atualizada de pacientes após possíveis cadastros.
-        list[dict]: Lista atualizada de agendamentos após possíveis alterações.
-        dict: Dicionário atualizado de horários disponíveis após possíveis agendamentos ou cancelamentos.
+Permite que o paciente realizar cadastro, agendamento de consultas (no horário geral, com um profissional/especialidade ou em série), consulta de agendamentos, verificação de lembretes e acesso ao FAQ.
+Cada opção carrega só as coleções de que precisa (veja colecao); as alterações ficam nas próprias coleções e são salvas ao sair do sistema.
+As respostas inválidas repetidas são limitadas por conversa (veja entrada_valida e limita_repeticoes).
 """
-def menu_paciente(pacientes: list[dict], agendamentos: list[dict], horarios_disponiveis: dict) -> tuple[list[dict], list[dict], dict]:
+def menu_paciente() -> None:
     while True:
         limpa_tela()
         print("=== Menu Paciente ===")
@@ -872,71 +4296,163 @@ def menu_paciente(pacientes: list[dict], agendamentos: list[dict], horarios_disp
         print("3. Consultar agendamentos")
         print("4. Verificar lembretes / Confirmar ou cancelar consultas")
         print("5. FAQ - Perguntas Frequentes")
+        print("6. Agendar com profissional / especialidade")
+        print("7. Agendar série de sessões")
         print("0. Voltar ao Menu Principal")
-        escolha = entrada_valida("Escolha: ", ["0", "1", "2", "3", "4", "5"])
+        escolha = entrada_valida("Escolha: ", ["0", "1", "2", "3", "4", "5", "6", "7"])
 
         if escolha == "0":
+            # a próxima pessoa atendida no terminal começa uma nova conversa
+            identifica_conversa(None)
             limpa_tela()
             break
         elif escolha == "1":
             limpa_tela()
-            pacientes = cadastra_paciente(pacientes)
+            cadastra_paciente(colecao("pacientes"))
             input("\nPressione Enter para continuar...")
         elif escolha == "2":
             limpa_tela()
-            agendamentos, horarios_disponiveis = agendar_consulta_com_horarios(agendamentos, pacientes, horarios_disponiveis)
+            agendar_consulta_com_horarios(colecao("agendamentos"), colecao("pacientes"), colecao("horarios"))
             input("\nPressione Enter para continuar...")
         elif escolha == "3":
             limpa_tela()
-            consultar_agendamentos(agendamentos, pacientes)
+            consultar_agendamentos(colecao("agendamentos"), colecao("pacientes"))
             input("\nPressione Enter para continuar...")
         elif escolha == "4":
             limpa_tela()
             print("=== Verificar lembretes / Confirmar ou cancelar consultas ===")
-            paciente = buscar_usuario_por_cpf_interativo(pacientes)
+            paciente = buscar_usuario_por_cpf_interativo(colecao("pacientes"))
             if paciente:
-                verificar_lembretes_paciente(agendamentos, paciente, horarios_disponiveis)
+                verificar_lembretes_paciente(colecao("agendamentos"), paciente, colecao("horarios"))
             input("\nPressione Enter para continuar...")
         elif escolha == "5":
             limpa_tela()
             menu_faq_paciente()
             input("\nPressione Enter para continuar...")
-    return pacientes, agendamentos, horarios_disponiveis
+        elif escolha == "6":
+            limpa_tela()
+            agendar_com_recursos(colecao("agendamentos"), colecao("pacientes"))
+            input("\nPressione Enter para continuar...")
+        elif escolha == "7":
+            limpa_tela()
+            agendar_serie(colecao("agendamentos"), colecao("pacientes"), colecao("horarios"))
+            input("\nPressione Enter para continuar...")
 
 """
 Menu interativo para administradores.
-Permite que o administrador gerencie os horários disponíveis para consultas e o FAQ do sistema.
-
-Args:
-    pacientes (list[dict]): Lista de pacientes cadastrados.
-    agendamentos (list[dict]): Lista de agendamentos existentes.
-    horarios_disponiveis (dict): Dicionário contendo os dias e horários disponíveis para agendamento.
-    faq_lista (list[dict]): Lista de perguntas e respostas do FAQ.
-
-Returns:
-    tuple:
-        dict: Dicionário atualizado de horários disponíveis após possíveis alterações.
-        list[dict]: Lista atualizada de perguntas e respostas do FAQ após possíveis alterações.
+Permite que o administrador gerencie os horários disponíveis para consultas, os profissionais e salas e o FAQ do sistema, veja relatórios de ocupação e verifique a integridade dos dados.
+Se a verificação de integridade em segundo plano (prefetch_colecoes) já achou problemas, avisa no topo do menu;
+a verificação completa só roda pela opção 4. As coleções são carregadas sob demanda (veja colecao).
 """
-def menu_administrador(pacientes: list[dict], agendamentos: list[dict], horarios_disponiveis: dict, faq_lista: list[dict]) -> tuple[dict, list[dict]]:
+def menu_administrador() -> None:
     while True:
         limpa_tela()
+        if _aviso_integridade["total"]:
+            print(f"Atenção: {_aviso_integridade['total']} problemas de integridade encontrados (opção 4).")
+            _aviso_integridade["exibido"] = True
         print("=== Menu Administrador ===")
         print("1. Gerenciar horários")
         print("2. Gerenciar menu FAQ")
+        print("3. Relatório de ocupação")
+        print("4. Verificar integridade dos dados")
+        print("5. Gerenciar profissionais e salas")
         print("0. Voltar ao Menu Principal")
-        escolha = entrada_valida("Escolha: ", ["0", "1", "2"])
+        escolha = entrada_valida("Escolha: ", ["0", "1", "2", "3", "4", "5"])
     
         if escolha == "0":
             limpa_tela()
             break
         elif escolha == "1":
             limpa_tela()
-            horarios_disponiveis = gerenciar_horarios(horarios_disponiveis)
+            gerenciar_horarios(colecao("horarios"))
             input("\nPressione Enter para continuar...")
         elif escolha == "2":
             limpa_tela()
-            faq_lista = menu_faq_adm(faq_lista)
+            menu_faq_adm(colecao("faq"))
             input("\nPressione Enter para continuar...")
-    
-    return horarios_disponiveis, faq_lista
\ No newline at end of file
+        elif escolha == "3":
+            limpa_tela()
+            while True:
+                ano = input("Digite o ano do relatório (ENTER para todo o histórico): ").strip()
+                if not ano or ano_valido(ano):
+                    break
+                print("Ano inválido. Digite um ano entre 1 e 9999 (ex.: 2025).")
+            relatorio_ocupacao(colecao("agendamentos"), colecao("horarios"), int(ano) if ano else None)
+            input("\nPressione Enter para continuar...")
+        elif escolha == "4":
+            limpa_tela()
+            menu_integridade(colecao("pacientes"), colecao("agendamentos"), colecao("horarios"))
+            _aviso_integridade["total"] = 0
+            input("\nPressione Enter para continuar...")
+        elif escolha == "5":
+            limpa_tela()
+            gerenciar_recursos()
+            input("\nPressione Enter para continuar...")
+
+#======LINHA DE COMANDO===================================================================
+"""
+Executa um comando passado pela linha de comando, sem abrir os menus interativos.
+Comandos disponíveis:
+    relatorio [ano]                    exibe o relatório de ocupação (de um ano ou de todo o histórico)
+    exportar [--completo] [pasta]      exporta os dados em formato colunar e CSV (só os novos registros, por padrão)
+    importar arquivo [erros.csv] [--codificacao=cp1252]
+                                       importa pacientes em massa de um arquivo CSV ou JSONL (codificação detectada, por padrão)
+    verificar [--reparar]              verifica a consistência entre os arquivos (e corrige, com --reparar)
+    calendarios [--completo] [pasta]   gera os calendários .ics por paciente e por dia (só os que mudaram, por padrão)
+
+Args:
+    argumentos (list[str]): Argumentos recebidos (sys.argv sem o nome do programa).
+"""
+def executa_comando(argumentos: list[str]) -> None:
+    comando, parametros = argumentos[0], argumentos[1:]
+    if comando == "relatorio":
+        agendamentos = carrega_dados("agendamentos.json", "agendamentos")
+        horarios_disponiveis = carrega_horarios("horarios.json")
+        if parametros and not ano_valido(parametros[0]):
+            print(f"Ano inválido: {parametros[0]}. Use um ano entre 1 e 9999 (ex.: python main.py relatorio 2025).")
+            return
+        relatorio_ocupacao(agendamentos, horarios_disponiveis, int(parametros[0]) if parametros else None)
+    elif comando == "exportar":
+        pacientes = carrega_dados("pacientes.json", "pacientes")
+        agendamentos = carrega_dados("agendamentos.json", "agendamentos")
+        horarios_disponiveis = carrega_horarios("horarios.json")
+        completo = "--completo" in parametros
+        pastas = [p for p in parametros if p != "--completo"]
+        exportados = exporta_dados(pacientes, agendamentos, horarios_disponiveis,
+                                   pastas[0] if pastas else "exportacao", incremental=not completo)
+        for colecao, quantidade in exportados.items():
+            print(f"{colecao}: {quantidade} registros exportados")
+    elif comando == "importar" and any(not p.startswith("--codificacao=") for p in parametros):
+        pacientes = carrega_dados("pacientes.json", "pacientes")
+        codificacoes = [p.split("=", 1)[1] for p in parametros if p.startswith("--codificacao=")]
+        arquivos = [p for p in parametros if not p.startswith("--codificacao=")]
+        arquivo_erros = arquivos[1] if len(arquivos) > 1 else "erros_importacao.csv"
+        importados, rejeitados = importa_pacientes(arquivos[0], pacientes, arquivo_erros,
+                                                   codificacoes[0] if codificacoes else None)
+        print(f"{importados} pacientes importados, {rejeitados} linhas rejeitadas.")
+        if rejeitados:
+            print(f"Veja os motivos em '{arquivo_erros}'.")
+    elif comando == "verificar":
+        pacientes = carrega_dados("pacientes.json", "pacientes")
+        agendamentos = carrega_dados("agendamentos.json", "agendamentos")
+        horarios_disponiveis = carrega_horarios("horarios.json")
+        problemas = verifica_integridade(pacientes, agendamentos, horarios_disponiveis)
+        exibe_integridade(problemas, agendamentos)
+        if "--reparar" in parametros and any(problemas.values()):
+            correcoes = repara_integridade(problemas, agendamentos, horarios_disponiveis)
+            print(f"\n{correcoes} correções feitas.")
+    elif comando == "calendarios":
+        agendamentos = carrega_dados("agendamentos.json", "agendamentos")
+        pastas = [p for p in parametros if p != "--completo"]
+        pasta = pastas[0] if pastas else PASTA_CALENDARIOS
+        if "--completo" in parametros:
+            gerados = reconstroi_calendarios(agendamentos, pasta)
+            print(f"{gerados['pacientes']} calendários de pacientes e {gerados['dias']} calendários diários gerados.")
+        else:
+            gerados = atualiza_calendarios(agendamentos, pasta)
+            print(f"{gerados['pacientes']} calendários de pacientes e {gerados['dias']} calendários diários atualizados, "
+                  f"{gerados['removidos']} removidos.")
+    else:
+        print(f"Comando desconhecido: {' '.join(argumentos)}")
+        print("Comandos disponíveis: relatorio [ano], exportar [--completo] [pasta], importar arquivo [erros.csv] [--codificacao=cp1252], "
+              "verificar [--reparar], calendarios [--completo] [pasta]")
@@ -1,42 +1,63 @@
 import os
+import sys
 import biblioteca as _b
 
-_b.limpa_tela()
+# Os processos auxiliares (reconstrução paralela dos calendários) importam este arquivo; só o processo principal abre os menus
+if __name__ == "__main__":
+    # Executa um comando direto pela linha de comando (ex.: python main.py relatorio 2025), sem abrir os menus
+    if len(sys.argv) > 1:
+        _b.executa_comando(sys.argv[1:])
+        sys.exit()
 
-print("Bem-vindo ao sistema de ajuda IMREA HC pelo Whatsapp!")
-
-# Carrega os dados dos arquivos JSON para variáveis, permitindo que o programa os manipule
-pacientes = _b.carrega_dados("pacientes.json", "pacientes")
-agendamentos = _b.carrega_dados("agendamentos.json", "agendamentos")
-horarios_disponiveis = _b.carrega_horarios("horarios.json")
-faq_lista = _b.carrega_faq()
-
-while True:
-    print("\n=== IMREA HC - Whatsapp ===")
-    print("1. Menu Paciente")
-    print("2. Menu Administrador")
-    print("0. Sair")
-
-    escolha = _b.entrada_valida("Escolha: ", ["0", "1", "2"])
     _b.limpa_tela()
 
-    #encerra o programa
-    if escolha == "0":
-        print("Saindo do sistema...")
-        break
-
-    # Abre o menu do paciente, permitindo cadastro, agendamento, consulta de agendamentos, verificação de lembretes e acesso ao FAQ; retorna listas atualizadas
-    elif escolha == "1":
-        pacientes, agendamentos, horarios_disponiveis = _b.menu_paciente(pacientes, agendamentos, horarios_disponiveis)
+    print("Bem-vindo ao sistema de ajuda IMREA HC pelo Whatsapp!")
+
+    # Os arquivos JSON são lidos em segundo plano (veja _b.colecao), então o menu aparece na hora, qualquer que seja
+    # o tamanho dos dados; a consistência entre os arquivos é verificada em seguida, na mesma thread.
+    # Com IMREA_PREFETCH=0, nada é lido antes de algum menu precisar (e a verificação fica só no Menu Administrador)
+    if os.environ.get("IMREA_PREFETCH") != "0":
+        _b.prefetch_colecoes(verificar=True)
+
+    # Retoma as conversas (agendamentos e lembretes) interrompidas na última execução
+    _b.obter_sessoes()
+
+    while True:
+        # Avisa (uma vez) os arquivos ausentes/corrompidos e os problemas de integridade achados em segundo plano;
+        # os problemas podem ser corrigidos pelo Menu Administrador
+        for aviso in _b.avisos_carregamento():
+            print(aviso)
+        aviso = _b.aviso_integridade()
+        if aviso:
+            print(aviso)
+
+        print("\n=== IMREA HC - Whatsapp ===")
+        print("1. Menu Paciente")
+        print("2. Menu Administrador")
+        print("0. Sair")
+
+        escolha = _b.entrada_valida("Escolha: ", ["0", "1", "2"])
+        _b.limpa_tela()
+
+        #encerra o programa
+        if escolha == "0":
+            print("Saindo do sistema...")
+            break
+
+        # Abre o menu do paciente, permitindo cadastro, agendamento, consulta de agendamentos, verificação de lembretes e acesso ao FAQ
+        elif escolha == "1":
+            _b.menu_paciente()
     
-    # Abre o menu do administrador, permitindo gerenciamento de horários e FAQ; retorna listas atualizadas
-    elif escolha == "2":
-        horarios_disponiveis, faq_lista = _b.menu_administrador(pacientes, agendamentos, horarios_disponiveis, faq_lista)
+        # Abre o menu do administrador, permitindo gerenciamento de horários e FAQ
+        elif escolha == "2":
+            _b.menu_administrador()
 
-# Salva os dados atualizados de pacientes, agendamentos e horários
-_b.salva_dados("pacientes.json", "pacientes", pacientes)
-_b.salva_dados("agendamentos.json", "agendamentos", agendamentos)
-_b.salva_horarios(horarios_disponiveis)
+    # Salva os dados atualizados de pacientes, agendamentos e horários (só os que foram carregados nesta execução)
+    # e regrava os calendários .ics só dos pacientes e dias cujos agendamentos mudaram (lidos do registro de eventos)
+    if "agendamentos" in _b.salva_colecoes():
+        _b.atualiza_calendarios_alterados(_b.colecao("agendamentos"))
 
-print("Dados salvos. Sistema finalizado com sucesso!")
+    # Grava as conversas em andamento para serem retomadas na próxima execução
+    _b.encerra_sessoes()
 
+    print("Dados salvos. Sistema finalizado com sucesso!")